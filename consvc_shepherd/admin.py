@@ -7,8 +7,9 @@ from django.contrib import admin, messages
 from django.db.models import Subquery
 from django.utils import dateformat, timezone
 from django.utils.translation import gettext_lazy as _
-from jsonschema import exceptions, validate
+from jsonschema import exceptions
 
+from consvc_shepherd import lookups, schemas
 from consvc_shepherd.forms import AllocationSettingForm, AllocationSettingFormset
 from consvc_shepherd.models import (
     Advertiser,
@@ -46,10 +47,8 @@ def publish_snapshot(modeladmin, request, queryset):
             snapshot.launched_by = request.user
             snapshot.launched_date = timezone.now()
             content = json.dumps(snapshot.json_settings, indent=2)
-            with open("./schema/adm_filter.schema.json", "r") as f:
-                settings_schema = json.load(f)
             try:
-                validate(snapshot.json_settings, schema=settings_schema)
+                schemas.validate("adm_filter", snapshot.json_settings)
                 metrics.incr("filters.snapshot.schema.validation.success")
                 send_to_storage(content, settings.GS_BUCKET_FILE_NAME)
                 snapshot.save()
@@ -77,24 +76,22 @@ def publish_allocation(modeladmin, request, queryset) -> None:
             )
         case [snapshot]:
             json_settings = snapshot.json_settings
-            with open("./schema/allocation.schema.json", "r") as f:
-                allocation_schema = json.load(f)
-                try:
-                    validate(json_settings, schema=allocation_schema)
-                    metrics.incr("allocation.schema.validation.success")
-                    allocation_json = json.dumps(json_settings, indent=2)
-                    send_to_storage(allocation_json, settings.ALLOCATION_FILE_NAME)
-                    snapshot.launched_date = timezone.now()
-                    snapshot.save()
-                    metrics.incr("allocation.upload.success")
-                    messages.info(request, "Allocation setting has been published.")
-                except exceptions.ValidationError:
-                    metrics.incr("allocation.schema.validation.fail")
-                    messages.error(
-                        request,
-                        "JSON generated is different from the expected allocation schema. "
-                        "Ensure that there are two allocation settings selected",
-                    )
+            try:
+                schemas.validate("allocation", json_settings)
+                metrics.incr("allocation.schema.validation.success")
+                allocation_json = json.dumps(json_settings, indent=2)
+                send_to_storage(allocation_json, settings.ALLOCATION_FILE_NAME)
+                snapshot.launched_date = timezone.now()
+                snapshot.save()
+                metrics.incr("allocation.upload.success")
+                messages.info(request, "Allocation setting has been published.")
+            except exceptions.ValidationError:
+                metrics.incr("allocation.schema.validation.fail")
+                messages.error(
+                    request,
+                    "JSON generated is different from the expected allocation schema. "
+                    "Ensure that there are two allocation settings selected",
+                )
         case _:
             messages.error(request, "Only 1 snapshot can be published at the same time")
 
@@ -295,8 +292,7 @@ class MonthFilter(admin.SimpleListFilter):
 
     def lookups(self, request, model_admin):
         """Return a list of distinct months for the filter options."""
-        months = BoostrDealProduct.objects.values_list("month", flat=True).distinct()
-        return [(month, month) for month in months]
+        return [(month, month) for month in lookups.get_months(request)]
 
     def queryset(self, request, queryset):
         """Filter the queryset based on the selected month."""
@@ -318,10 +314,7 @@ class PlacementFilter(admin.SimpleListFilter):
 
     def lookups(self, request, model_admin):
         """Return a list of distinct placements for the filter options."""
-        placements = BoostrProduct.objects.values_list(
-            "full_name", flat=True
-        ).distinct()
-        return [(placement, placement) for placement in placements]
+        return [(placement, placement) for placement in lookups.get_placements(request)]
 
     def queryset(self, request, queryset):
         """Filter the queryset based on the selected placement."""
@@ -344,8 +337,7 @@ class CountryFilter(admin.SimpleListFilter):
 
     def lookups(self, request, model_admin):
         """Return a list of distinct countries for the filter options."""
-        countries = BoostrProduct.objects.values_list("country", flat=True).distinct()
-        return [(country, country) for country in countries]
+        return [(country, country) for country in lookups.get_countries(request)]
 
     def queryset(self, request, queryset):
         """Filter the queryset based on the selected country."""
@@ -375,6 +367,10 @@ class CampaignAdmin(admin.ModelAdmin):
         "net_ecpm",
     ]
 
+    def get_queryset(self, request):
+        """Fetch each campaign's deal and latest flight along with the campaigns"""
+        return super().get_queryset(request).select_related("deal").with_latest_flight()
+
     list_display = [
         "ad_ops_person",
         "notes",
@@ -395,6 +391,10 @@ class CampaignSummaryAdmin(admin.ModelAdmin):
 
     model = CampaignSummary
 
+    def get_queryset(self, request):
+        """Compute the summaries' derived metrics in the database"""
+        return super().get_queryset(request).with_metrics()
+
     list_display = [
         "advertiser",
         "advertiser_id",
@@ -0,0 +1,35 @@
+"""Conditional GET support for the json API that drives the ad-ops-dashboard"""
+
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from consvc_shepherd.models import DataGeneration
+
+
+def conditional_on_data_generation(view_func):
+    """Tag the responses of a view with the current DataGeneration, and answer requests whose
+    If-None-Match or If-Modified-Since is still current with a 304 without running the view
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        data_generation = DataGeneration.for_request(request)
+        etag = f'W/"{data_generation.generation}"'
+        last_modified = int(data_generation.updated_on.timestamp())
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.headers["ETag"] = etag
+            response.headers["Last-Modified"] = http_date(last_modified)
+            # Make browsers revalidate with the ETag instead of guessing how long the response stays fresh
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapper
@@ -16,11 +16,42 @@ class CampaignSummaryFilter(filters.FilterSet):
     placement = filters.CharFilter(label="Placement", method="filter_placement")
     country = filters.CharFilter(label="Country", method="filter_country")
 
+    # The derived metrics are annotated by CampaignSummaryQuerySet.with_metrics
+    net_ecpm__gte = filters.NumberFilter(field_name="net_ecpm", lookup_expr="gte")
+    net_ecpm__lte = filters.NumberFilter(field_name="net_ecpm", lookup_expr="lte")
+    ctr__gte = filters.NumberFilter(field_name="ctr", lookup_expr="gte")
+    ctr__lte = filters.NumberFilter(field_name="ctr", lookup_expr="lte")
+    impressions_remaining__gte = filters.NumberFilter(
+        field_name="impressions_remaining", lookup_expr="gte"
+    )
+    impressions_remaining__lte = filters.NumberFilter(
+        field_name="impressions_remaining", lookup_expr="lte"
+    )
+    revenue__gte = filters.NumberFilter(field_name="revenue", lookup_expr="gte")
+    revenue__lte = filters.NumberFilter(field_name="revenue", lookup_expr="lte")
+    live = filters.ChoiceFilter(
+        label="Live", field_name="live", choices=[("Yes", "Yes"), ("No", "No")]
+    )
+
     class Meta:
         """Meta class to specify the model and fields for the filter."""
 
         model = CampaignSummary
-        fields = ["advertiser", "month", "placement", "country"]
+        fields = [
+            "advertiser",
+            "month",
+            "placement",
+            "country",
+            "net_ecpm__gte",
+            "net_ecpm__lte",
+            "ctr__gte",
+            "ctr__lte",
+            "impressions_remaining__gte",
+            "impressions_remaining__lte",
+            "revenue__gte",
+            "revenue__lte",
+            "live",
+        ]
 
     def filter_month(self, queryset, name, value):
         """Filter queryset by month using BoostrDealProduct."""
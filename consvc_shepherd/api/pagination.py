@@ -0,0 +1,18 @@
+"""Pagination classes for the json API that drives the ad-ops-dashboard"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class CampaignSummaryCursorPagination(CursorPagination):
+    """Cursor pagination for campaign summaries, keyed on their unique deal_id"""
+
+    ordering = "deal_id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """Page through the summaries by deal_id whatever the ordering filter asks for, since its fields
+        may be neither unique nor non-null
+        """
+        return (self.ordering,)
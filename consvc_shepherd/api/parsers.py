@@ -0,0 +1,49 @@
+"""Parsers for the campaign import formats of the json API that drives the ad-ops-dashboard"""
+
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class CSVParser(BaseParser):
+    """Parse a CSV file with a header row into a list of dicts, leaving out empty cells"""
+
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the CSV rows of the request body"""
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        reader = csv.DictReader(codecs.getreader(encoding)(stream))
+        try:
+            return [
+                {column: value for column, value in row.items() if value != ""}
+                for row in reader
+            ]
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ParseError(f"CSV parse error on line {reader.line_num}: {e}")
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline delimited JSON, one object per line, into a list of dicts"""
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the JSON lines of the request body"""
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        rows = []
+        for line_num, line in enumerate(codecs.getreader(encoding)(stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ParseError(f"JSON parse error on line {line_num}: {e}")
+            if not isinstance(row, dict):
+                raise ParseError(f"Line {line_num} is not a JSON object.")
+            rows.append(row)
+        return rows
@@ -1,5 +1,10 @@
 """Serializers for the json API that drives the ad-ops-dashboard"""
 
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
 from rest_framework import serializers
 
 from consvc_shepherd.models import (
@@ -7,8 +12,38 @@ from consvc_shepherd.models import (
     BoostrProduct,
     Campaign,
     CampaignSummary,
+    DataGeneration,
     Flight,
 )
+from consvc_shepherd.signals import bulk_write
+
+# The Campaign fields that splits and imports write in bulk
+BULK_CAMPAIGN_FIELDS = [
+    "notes",
+    "ad_ops_person",
+    "impressions_sold",
+    "net_spend",
+    "deal",
+    "start_date",
+    "end_date",
+    "seller",
+    "updated_on",
+]
+# The columns of campaign imports and exports
+CAMPAIGN_IMPORT_FIELDS = [
+    "id",
+    "deal",
+    "notes",
+    "ad_ops_person",
+    "kevel_flight_id",
+    "impressions_sold",
+    "net_spend",
+    "start_date",
+    "end_date",
+    "seller",
+]
+# Number of imported campaigns written at a time
+IMPORT_CHUNK_SIZE = 1000
 
 
 class BoostrProductSerializer(serializers.ModelSerializer):
@@ -38,8 +73,7 @@ class CampaignSerializer(serializers.ModelSerializer):
     # To do: This code will be updated once we have the UI to assign multiple flights to a campaign.
     def get_kevel_flight_id(self, obj):
         """Retrieve the most recent flight ID related to the campaign."""
-        flight = obj.flights.last()
-        return flight.kevel_flight_id if flight else None
+        return obj.kevel_flight_id
 
     def validate(self, data):
         """Validate campaign data, ensuring the deal exists and total net spend matches the deal amount."""
@@ -92,6 +126,8 @@ class CampaignSerializer(serializers.ModelSerializer):
             Flight.objects.update_or_create(
                 campaign=instance, defaults={"kevel_flight_id": kevel_flight_id}
             )
+        # The flights changed, so the annotation from CampaignQuerySet.with_latest_flight is stale
+        instance.__dict__.pop("latest_kevel_flight_id", None)
 
         self._update_existing_campaigns(campaign_fields_data)
 
@@ -201,35 +237,64 @@ class SplitCampaignSerializer(serializers.Serializer):
         return data
 
     def create(self, validated_data: dict) -> list:
-        """Create new campaigns and update existing ones."""
+        """Create new campaigns and update existing ones.
+
+        Every referenced campaign is locked and loaded in one query, and the campaigns and their flights are
+        written in bulk in one transaction, so the number of queries doesn't depend on the number of campaigns.
+        """
         campaigns = validated_data.pop("campaigns", [])
         deal = validated_data.pop("deal_instance")
 
-        created_campaigns = []
-        for campaign in campaigns:
-            campaign_id = campaign.get("id")
-            if campaign_id:
-                created_campaigns.append(
-                    self._update_existing_campaign(campaign_id, campaign, deal)
-                )
-            else:
-                created_campaigns.append(self._create_new_campaign(campaign, deal))
+        with transaction.atomic():
+            existing_campaigns = Campaign.objects.select_for_update().in_bulk(
+                [campaign["id"] for campaign in campaigns if campaign.get("id")]
+            )
+            # The deals the updated campaigns belonged to before the split also need their summaries refreshed
+            deal_ids = {deal.pk} | {
+                existing_campaign.deal_id
+                for existing_campaign in existing_campaigns.values()
+            }
+
+            split_campaigns = []
+            for campaign in campaigns:
+                kevel_flight_id = campaign.pop("kevel_flight_id", None)
+                campaign_id = campaign.get("id")
+                if campaign_id:
+                    split_campaign = self._update_existing_campaign(
+                        existing_campaigns, campaign_id, campaign, deal
+                    )
+                else:
+                    campaign["deal"] = deal
+                    split_campaign = Campaign(**campaign)
+                # Stands in for the annotation from CampaignQuerySet.with_latest_flight, so serializing the
+                # split campaigns doesn't query their flights
+                split_campaign.latest_kevel_flight_id = kevel_flight_id
+                split_campaigns.append(split_campaign)
+
+            Campaign.objects.bulk_update(
+                [c for c in split_campaigns if c.pk], BULK_CAMPAIGN_FIELDS
+            )
+            Campaign.objects.bulk_create([c for c in split_campaigns if not c.pk])
+            write_campaign_flights(split_campaigns, set(existing_campaigns))
 
-        return created_campaigns
+            # The split's campaigns were written in bulk, so refresh_campaign_summary and
+            # bump_data_generation didn't run for them
+            CampaignSummary.refresh(deal_ids)
+            DataGeneration.bump()
+
+        return split_campaigns
 
     def _update_existing_campaign(
-        self, campaign_id: int, campaign: dict, deal
+        self,
+        existing_campaigns: dict[int, Campaign],
+        campaign_id: int,
+        campaign: dict,
+        deal,
     ) -> Campaign:
-        """Update an existing campaign."""
+        """Apply the split's changes to an existing campaign."""
         try:
-            kevel_flight_id = campaign.pop("kevel_flight_id", None)
-            existing_campaign = Campaign.objects.get(id=campaign_id)
-            if kevel_flight_id is None:
-                Flight.objects.filter(campaign=campaign_id).delete()
-            else:
-                self._create_or_update_flight(existing_campaign, kevel_flight_id)
-
-        except Campaign.DoesNotExist:
+            existing_campaign = existing_campaigns[campaign_id]
+        except KeyError:
             raise serializers.ValidationError(
                 f"Campaign with ID {campaign_id} does not exist."
             )
@@ -237,34 +302,147 @@ class SplitCampaignSerializer(serializers.Serializer):
         for attr, value in campaign.items():
             if attr != "id":
                 setattr(existing_campaign, attr, deal if attr == "deal" else value)
-
-        existing_campaign.save()
+        # bulk_update doesn't set auto_now fields like save() does
+        existing_campaign.updated_on = timezone.now()
         return existing_campaign
 
-    def _create_new_campaign(self, campaign: dict, deal) -> Campaign:
-        """Create a new campaign."""
-        kevel_flight_id = campaign.pop("kevel_flight_id", None)
-        campaign["deal"] = deal
-        new_campaign = Campaign.objects.create(**campaign)
-        self._create_or_update_flight(new_campaign, kevel_flight_id)
-        return new_campaign
 
-    def _create_or_update_flight(self, campaign: Campaign, kevel_flight_id: int):
-        """Create or update flight id for campaign."""
-        if kevel_flight_id is not None:
-            Flight.objects.update_or_create(
-                campaign=campaign, defaults={"kevel_flight_id": kevel_flight_id}
+class CampaignImportSerializer(serializers.Serializer):
+    """Serializer for bulk imports of campaigns, which creates the campaigns without an id and updates the rest."""
+
+    campaigns = NestedCampaignSerializer(many=True, write_only=True)
+
+    def validate(self, data: dict) -> dict:
+        """Validate the imported campaigns together, checking that every deal they belong to ends up with
+        campaigns whose total net spend equals the deal amount.
+        """
+        campaigns = data.get("campaigns", [])
+        if not campaigns:
+            raise serializers.ValidationError("No campaign data was provided.")
+
+        ids = [campaign["id"] for campaign in campaigns if campaign.get("id")]
+        duplicate_ids = sorted(
+            campaign_id for campaign_id, count in Counter(ids).items() if count > 1
+        )
+        if duplicate_ids:
+            raise serializers.ValidationError(
+                f"Campaigns with IDs {duplicate_ids} are imported more than once."
             )
+        # The deals the updated campaigns belong to before the import, which campaigns may move away from
+        current_deal_ids = dict(
+            Campaign.objects.filter(pk__in=ids).values_list("pk", "deal_id")
+        )
+        missing_ids = set(ids) - set(current_deal_ids)
+        if missing_ids:
+            raise serializers.ValidationError(
+                f"Campaigns with IDs {sorted(missing_ids)} do not exist."
+            )
+
+        imported_deal_ids = {campaign["deal"] for campaign in campaigns}
+        deals = BoostrDeal.objects.in_bulk(
+            imported_deal_ids | set(current_deal_ids.values())
+        )
+        missing_deal_ids = imported_deal_ids - set(deals)
+        if missing_deal_ids:
+            raise serializers.ValidationError(
+                f"Deals with IDs {sorted(missing_deal_ids)} do not exist."
+            )
+
+        # The net spend of each deal's campaigns that aren't part of the import, in one aggregate query
+        total_net_spends = Counter(
+            dict(
+                Campaign.objects.filter(deal_id__in=deals)
+                .exclude(pk__in=ids)
+                .values("deal_id")
+                .annotate(net_spend=Sum("net_spend"))
+                .values_list("deal_id", "net_spend")
+            )
+        )
+        for campaign in campaigns:
+            total_net_spends[campaign["deal"]] += campaign["net_spend"]
+        errors = [
+            f"Total net spend ({total_net_spends[deal_id]}) from the campaigns of deal {deal_id} must equal "
+            f"the deal amount ({deal.amount})."
+            for deal_id, deal in sorted(deals.items())
+            if total_net_spends[deal_id] != deal.amount
+        ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return data
+
+    def create(self, validated_data: dict) -> dict:
+        """Create and update the imported campaigns IMPORT_CHUNK_SIZE at a time, in one transaction."""
+        campaigns = validated_data["campaigns"]
+        created = updated = 0
+
+        with transaction.atomic():
+            deal_ids = {campaign["deal"] for campaign in campaigns}
+            updated_on = timezone.now()
+            for start in range(0, len(campaigns), IMPORT_CHUNK_SIZE):
+                chunk_end = start + IMPORT_CHUNK_SIZE
+                chunk = campaigns[start:chunk_end]
+                ids = [campaign["id"] for campaign in chunk if campaign.get("id")]
+                existing_campaigns = Campaign.objects.select_for_update().in_bulk(ids)
+                # Campaigns deleted since validate() ran; raising rolls back the chunks already written
+                missing_ids = set(ids) - set(existing_campaigns)
+                if missing_ids:
+                    raise serializers.ValidationError(
+                        f"Campaigns with IDs {sorted(missing_ids)} do not exist."
+                    )
+                # The deals the updated campaigns belonged to before the import also need their summaries
+                # refreshed
+                deal_ids.update(c.deal_id for c in existing_campaigns.values())
+
+                imported_campaigns = []
+                # Only the rows with a kevel_flight_id, even a null one, change their campaign's flights; rows
+                # without one, like CSV rows with an empty cell, leave them as they are
+                flight_campaigns = []
+                for campaign in chunk:
+                    has_kevel_flight_id = "kevel_flight_id" in campaign
+                    kevel_flight_id = campaign.pop("kevel_flight_id", None)
+                    campaign["deal_id"] = campaign.pop("deal")
+                    campaign_id = campaign.pop("id", None)
+                    if campaign_id:
+                        imported_campaign = existing_campaigns[campaign_id]
+                        for attr, value in campaign.items():
+                            setattr(imported_campaign, attr, value)
+                        imported_campaign.updated_on = updated_on
+                    else:
+                        imported_campaign = Campaign(**campaign)
+                    if has_kevel_flight_id:
+                        imported_campaign.latest_kevel_flight_id = kevel_flight_id
+                        flight_campaigns.append(imported_campaign)
+                    imported_campaigns.append(imported_campaign)
+
+                to_update = [c for c in imported_campaigns if c.pk]
+                to_create = [c for c in imported_campaigns if not c.pk]
+                Campaign.objects.bulk_update(to_update, BULK_CAMPAIGN_FIELDS)
+                Campaign.objects.bulk_create(to_create)
+                write_campaign_flights(flight_campaigns, set(existing_campaigns))
+                created += len(to_create)
+                updated += len(to_update)
+
+            # Once after all the chunks, since their bulk writes didn't send the Campaign signals that would
+            # have done this per campaign
+            CampaignSummary.refresh(deal_ids)
+            DataGeneration.bump()
+
+        return {"created": created, "updated": updated}
 
 
 class CampaignSummarySerializer(serializers.ModelSerializer):
-    """Serializer for the CampaignSummary model with additional computed fields."""
+    """Serializer for the CampaignSummary model with additional computed fields.
+
+    The computed fields are read straight off the summaries, so they are computed in SQL for querysets
+    annotated by CampaignSummaryQuerySet.with_metrics.
+    """
 
-    net_ecpm = serializers.SerializerMethodField()
-    ctr = serializers.SerializerMethodField()
-    impressions_remaining = serializers.SerializerMethodField()
-    live = serializers.SerializerMethodField()
-    revenue = serializers.SerializerMethodField()
+    net_ecpm = serializers.ReadOnlyField()
+    ctr = serializers.ReadOnlyField()
+    impressions_remaining = serializers.ReadOnlyField()
+    live = serializers.ReadOnlyField()
+    revenue = serializers.ReadOnlyField()
 
     class Meta:
         """Meta class to specify the model and fields for the serializer."""
@@ -272,22 +450,43 @@ class CampaignSummarySerializer(serializers.ModelSerializer):
         model = CampaignSummary
         fields = "__all__"
 
-    def get_net_ecpm(self, obj):
-        """Return the net eCPM value."""
-        return obj.net_ecpm
-
-    def get_ctr(self, obj):
-        """Return the CTR value."""
-        return obj.ctr
 
-    def get_impressions_remaining(self, obj):
-        """Return the number of impressions remaining."""
-        return obj.impressions_remaining
-
-    def get_live(self, obj):
-        """Return the live status of the campaign."""
-        return obj.live
-
-    def get_revenue(self, obj):
-        """Return the revenue generated by the campaign."""
-        return obj.revenue
+def write_campaign_flights(campaigns: list[Campaign], existing_ids: set[int]):
+    """Point the flights of bulk written campaigns at their latest_kevel_flight_ids, deleting the flights of
+    the existing campaigns that no longer have one.
+
+    The flights are written in bulk and deleted inside bulk_write(), so none of Flight's per-row signal
+    receivers run, and callers refresh the CampaignSummaries and bump the DataGeneration themselves once all
+    of their bulk writes are done.
+    """
+    flightless_ids = [
+        c.pk
+        for c in campaigns
+        if c.pk in existing_ids and c.latest_kevel_flight_id is None
+    ]
+    if flightless_ids:
+        with bulk_write():
+            Flight.objects.filter(campaign_id__in=flightless_ids).delete()
+
+    kevel_flight_ids = {
+        c.pk: c.latest_kevel_flight_id
+        for c in campaigns
+        if c.latest_kevel_flight_id is not None
+    }
+    flights = list(
+        Flight.objects.select_for_update().filter(
+            campaign_id__in=[pk for pk in kevel_flight_ids if pk in existing_ids]
+        )
+    )
+    for flight in flights:
+        flight.kevel_flight_id = kevel_flight_ids[flight.campaign_id]
+    Flight.objects.bulk_update(flights, ["kevel_flight_id"])
+
+    campaign_ids_with_flights = {flight.campaign_id for flight in flights}
+    Flight.objects.bulk_create(
+        [
+            Flight(campaign_id=campaign_id, kevel_flight_id=kevel_flight_id)
+            for campaign_id, kevel_flight_id in kevel_flight_ids.items()
+            if campaign_id not in campaign_ids_with_flights
+        ]
+    )
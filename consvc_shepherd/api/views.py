@@ -1,14 +1,29 @@
 """Dashboard API views that produce json data"""
 
+import csv
+import io
+import json
+from typing import Iterator
+
+from django.db.models import F, QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from consvc_shepherd import lookups
+from consvc_shepherd.api.conditional import conditional_on_data_generation
+from consvc_shepherd.api.pagination import CampaignSummaryCursorPagination
+from consvc_shepherd.api.parsers import CSVParser, NDJSONParser
 from consvc_shepherd.api.serializers import (
+    CAMPAIGN_IMPORT_FIELDS,
     BoostrDealSerializer,
     BoostrProductSerializer,
+    CampaignImportSerializer,
     CampaignSerializer,
     CampaignSummarySerializer,
     SplitCampaignSerializer,
@@ -17,7 +32,16 @@ from consvc_shepherd.models import BoostrDeal, BoostrProduct, Campaign, Campaign
 
 from .filters import CampaignSummaryFilter
 
+# Number of campaign summaries or campaigns fetched from the DB cursor and written out at a time by the exports
+EXPORT_CHUNK_SIZE = 500
+CAMPAIGN_EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
 
+
+@method_decorator(conditional_on_data_generation, name="list")
+@method_decorator(conditional_on_data_generation, name="retrieve")
 class ProductViewSet(ReadOnlyModelViewSet):
     """Fetch all BoostrProducts"""
 
@@ -25,6 +49,7 @@ class ProductViewSet(ReadOnlyModelViewSet):
     serializer_class = BoostrProductSerializer
 
     @action(detail=False, methods=["get"], url_path="countries")
+    @method_decorator(conditional_on_data_generation)
     def get_countries(self, request):
         """Return a list of countries with their codes and names."""
         countries = [
@@ -34,13 +59,32 @@ class ProductViewSet(ReadOnlyModelViewSet):
         return Response(countries, status=status.HTTP_200_OK)
 
 
+@method_decorator(conditional_on_data_generation, name="list")
+@method_decorator(conditional_on_data_generation, name="retrieve")
 class CampaignSummaryViewSet(ReadOnlyModelViewSet):
     """Fetch all Campaign Summaries"""
 
-    queryset = CampaignSummary.objects.all()
+    queryset = CampaignSummary.objects.with_metrics().order_by("advertiser", "deal_id")
     serializer_class = CampaignSummarySerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [
+        filters.SearchFilter,
+        DjangoFilterBackend,
+        filters.OrderingFilter,
+    ]
     filterset_class = CampaignSummaryFilter
+    pagination_class = CampaignSummaryCursorPagination
+    ordering_fields = [
+        "advertiser",
+        "net_spend",
+        "impressions_sold",
+        "clicks_delivered",
+        "impressions_delivered",
+        "net_ecpm",
+        "ctr",
+        "impressions_remaining",
+        "live",
+        "revenue",
+    ]
     search_fields = [
         "advertiser",
         "net_spend",
@@ -49,19 +93,129 @@ class CampaignSummaryViewSet(ReadOnlyModelViewSet):
         "impressions_delivered",
     ]
 
+    def paginate_queryset(self, queryset):
+        """Paginate only when the client opts in by passing a cursor or a page size."""
+        paginator = self.paginator
+        if not (
+            paginator.cursor_query_param in self.request.query_params
+            or paginator.page_size_query_param in self.request.query_params
+        ):
+            return None
+        return super().paginate_queryset(queryset)
+
     def list(self, request, *args, **kwargs):
-        """Return all campaign summaries."""
+        """Return all campaign summaries, or a page of them ordered by deal_id if pagination was requested."""
         filtered_summaries = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(filtered_summaries)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(filtered_summaries, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"], url_path="export")
+    @method_decorator(conditional_on_data_generation)
+    def export(self, request):
+        """Stream all the filtered campaign summaries as a JSON array, reading them through a server-side
+        cursor so memory use stays flat however many there are.
+        """
+        filtered_summaries = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            self.stream_json(filtered_summaries), content_type="application/json"
+        )
+
+    def stream_json(self, summaries: QuerySet) -> Iterator[str]:
+        """Yield the JSON array of the serialized summaries, EXPORT_CHUNK_SIZE summaries at a time"""
+        serializer = self.get_serializer()
+        yield "["
+        separator = ""
+        chunk = []
+        for summary in summaries.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            chunk.append(
+                json.dumps(serializer.to_representation(summary), cls=JSONEncoder)
+            )
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                yield separator + ",".join(chunk)
+                separator = ","
+                chunk = []
+        if chunk:
+            yield separator + ",".join(chunk)
+        yield "]"
+
 
 class CampaignViewSet(ModelViewSet):
     """Fetch all Campaigns"""
 
-    queryset = Campaign.objects.all()
+    queryset = Campaign.objects.with_latest_flight()
     serializer_class = CampaignSerializer
 
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[CSVParser, NDJSONParser],
+    )
+    def import_campaigns(self, request):
+        """Create and update campaigns in bulk from a CSV or NDJSON file with the CAMPAIGN_IMPORT_FIELDS columns.
+        Rows with an id update that campaign, and the rest are created. Rows without a kevel_flight_id, including
+        CSV rows with an empty one, keep their campaign's flights, while NDJSON rows with a null one remove them.
+        """
+        serializer = CampaignImportSerializer(data={"campaigns": request.data})
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export_campaigns(self, request):
+        """Stream every campaign as CSV or NDJSON, depending on the file_format query parameter, in the format
+        the import accepts
+        """
+        file_format = request.query_params.get("file_format", "ndjson")
+        if file_format not in CAMPAIGN_EXPORT_CONTENT_TYPES:
+            return Response(
+                {
+                    "file_format": f"Must be one of {sorted(CAMPAIGN_EXPORT_CONTENT_TYPES)}."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows = (
+            self.get_queryset()
+            .order_by("pk")
+            .values(
+                *[
+                    field
+                    for field in CAMPAIGN_IMPORT_FIELDS
+                    if field != "kevel_flight_id"
+                ],
+                kevel_flight_id=F("latest_kevel_flight_id"),
+            )
+        )
+        response = StreamingHttpResponse(
+            self.stream_rows(rows, file_format),
+            content_type=CAMPAIGN_EXPORT_CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="campaigns.{file_format}"'
+        )
+        return response
+
+    def stream_rows(self, rows: QuerySet, file_format: str) -> Iterator[str]:
+        """Yield the campaign rows in the given file format, EXPORT_CHUNK_SIZE rows at a time"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CAMPAIGN_IMPORT_FIELDS)
+        if file_format == "csv":
+            writer.writeheader()
+        for row_num, row in enumerate(rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
+            if file_format == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row, cls=JSONEncoder) + "\n")
+            if row_num % EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
     @action(detail=False, methods=["post"], url_path="split")
     def split_campaigns(self, request):
         """Handle split creation and updates of Campaigns."""
@@ -74,6 +228,8 @@ class CampaignViewSet(ModelViewSet):
         )
 
 
+@method_decorator(conditional_on_data_generation, name="list")
+@method_decorator(conditional_on_data_generation, name="retrieve")
 class BoostrDealViewSet(ReadOnlyModelViewSet):
     """Fetch all BoostrDeal"""
 
@@ -81,10 +237,11 @@ class BoostrDealViewSet(ReadOnlyModelViewSet):
     serializer_class = BoostrDealSerializer
 
     @action(detail=False, methods=["get"], url_path="advertisers")
+    @method_decorator(conditional_on_data_generation)
     def get_advertisers(self, request):
         """Return a list of unique advertisers in the deals table."""
-        advertisers = BoostrDeal.objects.values_list("advertiser", flat=True).distinct()
         advertiser_list = [
-            {"value": advertiser, "label": advertiser} for advertiser in advertisers
+            {"value": advertiser, "label": advertiser}
+            for advertiser in lookups.get_advertisers(request)
         ]
         return Response(advertiser_list, status=status.HTTP_200_OK)
@@ -0,0 +1,13 @@
+"""App configuration for consvc_shepherd."""
+
+from django.apps import AppConfig
+
+
+class ConsvcShepherdConfig(AppConfig):
+    """App configuration for consvc_shepherd, connecting its signal handlers once the app is ready."""
+
+    name = "consvc_shepherd"
+
+    def ready(self):
+        """Connect the signal handlers."""
+        from consvc_shepherd import signals  # noqa: F401
@@ -1,6 +1,5 @@
 """Forms module for consvc_shepherd."""
 
-import json
 from typing import Any, Dict
 
 from django import forms
@@ -9,8 +8,9 @@ from django.core.exceptions import ValidationError
 from django.forms import BaseInlineFormSet
 from django.forms.models import inlineformset_factory
 from django.utils import dateformat, timezone
-from jsonschema import exceptions, validate
+from jsonschema import exceptions
 
+from consvc_shepherd import schemas
 from consvc_shepherd.models import (
     AllocationSetting,
     AllocationSettingsSnapshot,
@@ -99,17 +99,15 @@ class AllocationSettingsSnapshotForm(forms.ModelForm):
         """Validate json generated."""
         cd = super(AllocationSettingsSnapshotForm, self).clean()
         cd["json_settings"] = self.get_json_settings()
-        with open("./schema/allocation.schema.json", "r") as f:
-            settings_schema = json.load(f)
-            try:
-                validate(cd["json_settings"], schema=settings_schema)
-                metrics.incr("allocation.snapshot.schema.validation.success")
-            except exceptions.ValidationError as e:
-                metrics.incr("allocation.snapshot.schema.validation.fail")
-                raise ValidationError(
-                    message=f"JSON generated is different from the expected allocation schema. "
-                    f"Ensure that there are two allocation settings: {e}",
-                )
+        try:
+            schemas.validate("allocation", cd["json_settings"])
+            metrics.incr("allocation.snapshot.schema.validation.success")
+        except exceptions.ValidationError as e:
+            metrics.incr("allocation.snapshot.schema.validation.fail")
+            raise ValidationError(
+                message=f"JSON generated is different from the expected allocation schema. "
+                f"Ensure that there are two allocation settings: {e}",
+            )
         return cd
 
     def get_json_settings(self) -> Dict[str, Any]:
@@ -0,0 +1,82 @@
+"""Cached lookup lists behind the dashboard's and the admin's filters.
+
+The lists are cached under the current DataGeneration, which every save and every sync run bumps, so a
+change made in any process stops the other processes' cached lists from being read. Passing the request
+reads the DataGeneration once for all the lookups made while answering it.
+"""
+
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from consvc_shepherd.models import (
+    BoostrDeal,
+    BoostrDealProduct,
+    BoostrProduct,
+    DataGeneration,
+)
+from consvc_shepherd.utils import ShepherdMetrics
+
+metrics: ShepherdMetrics = ShepherdMetrics("shepherd")
+
+LOOKUP_CACHE_KEY_PREFIX = "lookups"
+
+
+def get_advertisers(request: HttpRequest | None = None) -> list[str]:
+    """Return the distinct advertisers of the Boostr deals"""
+    return cached_lookup(
+        "advertisers",
+        lambda: BoostrDeal.objects.values_list("advertiser", flat=True).distinct(),
+        request,
+    )
+
+
+def get_months(request: HttpRequest | None = None) -> list[str]:
+    """Return the distinct months of the Boostr deal products"""
+    return cached_lookup(
+        "months",
+        lambda: BoostrDealProduct.objects.values_list("month", flat=True).distinct(),
+        request,
+    )
+
+
+def get_placements(request: HttpRequest | None = None) -> list[str]:
+    """Return the distinct full names of the Boostr products"""
+    return cached_lookup(
+        "placements",
+        lambda: BoostrProduct.objects.values_list("full_name", flat=True).distinct(),
+        request,
+    )
+
+
+def get_countries(request: HttpRequest | None = None) -> list[str]:
+    """Return the distinct countries of the Boostr products"""
+    return cached_lookup(
+        "countries",
+        lambda: BoostrProduct.objects.values_list("country", flat=True).distinct(),
+        request,
+    )
+
+
+def cached_lookup(
+    name: str, query: Callable[[], Any], request: HttpRequest | None = None
+) -> list:
+    """Return the cached lookup list with the given name, running its query to fill the cache on a miss"""
+    data_generation = (
+        DataGeneration.current()
+        if request is None
+        else DataGeneration.for_request(request)
+    )
+    generation = data_generation.generation
+    key = f"{LOOKUP_CACHE_KEY_PREFIX}.{generation}.{name}"
+    values: list | None = cache.get(key)
+    if values is not None:
+        metrics.incr(f"lookups.{name}.cache.hit")
+        return values
+
+    metrics.incr(f"lookups.{name}.cache.miss")
+    values = list(query())
+    cache.set(key, values, settings.LOOKUP_CACHE_TIMEOUT)
+    return values
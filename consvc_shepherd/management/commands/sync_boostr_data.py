@@ -2,8 +2,12 @@
 
 import logging
 import math
+import queue
+import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -11,6 +15,7 @@ from typing import Any
 import environ
 import requests
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from consvc_shepherd.models import (
@@ -20,7 +25,9 @@ from consvc_shepherd.models import (
     BoostrProduct,
     BoostrSyncStatus,
     Campaign,
+    CampaignSummary,
 )
+from consvc_shepherd.signals import bulk_write
 
 FULL_SYNC = False
 MAX_DEAL_PAGES_DEFAULT = 50
@@ -28,10 +35,30 @@ DEFAULT_RETRY_INTERVAL = 60
 SYNC_STATUS_SUCCESS = "success"
 SYNC_STATUS_FAILURE = "failure"
 HTTP_TOO_MANY_REQUESTS = 429
+CONCURRENCY_DEFAULT = 4
+REQUESTS_PER_SECOND = 10
+DEAL_PAGES_PREFETCH = 2
+QUEUE_PUT_TIMEOUT = 0.1
+BOOSTR_DEAL_UPDATE_FIELDS = [
+    "name",
+    "advertiser",
+    "advertiser_id",
+    "currency",
+    "amount",
+    "stage",
+    "sales_representatives",
+    "start_date",
+    "end_date",
+    "updated_on",
+]
 DEFAULT_OPTIONS = {
     "max_deal_pages": MAX_DEAL_PAGES_DEFAULT,
+    "concurrency": CONCURRENCY_DEFAULT,
 }
 
+# A page number and its deals, the exception that stopped fetching, or None once all pages are fetched
+DealPageQueue = queue.Queue[tuple[int, list[dict[str, Any]]] | Exception | None]
+
 
 class Command(BaseCommand):
     """Django admin custom command for fetching and saving Deal and Product data from Boostr to Shepherd"""
@@ -60,6 +87,14 @@ class Command(BaseCommand):
             help="""Used to force a full sync of the Boostr data. This means the script
             does not start from the last successful sync timestamp""",
         )
+        parser.add_argument(
+            "--concurrency",
+            default=CONCURRENCY_DEFAULT,
+            type=int,
+            help=f"""The number of deals whose deal_products are fetched from Boostr in parallel. All workers
+                share one rate limit budget of {REQUESTS_PER_SECOND} requests per second. Defaults to
+                {CONCURRENCY_DEFAULT}.""",
+        )
 
     def handle(self, *args, **options):
         """Handle running the command"""
@@ -103,11 +138,60 @@ class BoostrApiMaxRetriesError(Exception):
     pass
 
 
+class RateLimiter:
+    """Token bucket shared by every thread making requests to Boostr.
+
+    Tokens refill at `rate` per second and up to `burst` unused tokens can be saved up. Rather than polling for
+    tokens, each caller reserves the next slot on the schedule and sleeps until it comes around. While a caller holds
+    `pause()`, e.g. while honoring a Retry-After header, every other caller blocks in `acquire()`.
+    """
+
+    rate: float
+    burst: int
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int | None = None):
+        self.rate = rate
+        self.burst = burst or math.ceil(rate)
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._pauses = 0
+
+    def acquire(self) -> None:
+        """Block until the caller is allowed to make a request"""
+        self._resumed.wait()
+        with self._lock:
+            now = time.monotonic()
+            # The time this request would go out if requests were spaced evenly, callers may run ahead of it
+            # by however many tokens are saved up in the bucket
+            next_slot = max(self._next_slot, now)
+            self._next_slot = next_slot + 1 / self.rate
+            start = next_slot - (self.burst - 1) / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def pause(self):
+        """Stop every other caller from making requests until the context exits"""
+        with self._lock:
+            self._pauses += 1
+            self._resumed.clear()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pauses -= 1
+                if not self._pauses:
+                    self._resumed.set()
+
+
 class BoostrApi:
     """Wrap up interactions with the Boostr API into a convenient class that handles the session, rate limits, etc"""
 
     base_url: str
     session: requests.Session
+    limiter: RateLimiter
     log: logging.Logger
 
     def __init__(
@@ -115,7 +199,17 @@ class BoostrApi:
     ):
         self.log = logging.getLogger("sync_boostr_data")
         self.base_url = base_url
+        self.limiter = RateLimiter()
         self.setup_session(email, password)
+        # Keep a pooled connection around for each worker fetching in parallel
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=max(
+                options.get("concurrency", CONCURRENCY_DEFAULT),
+                requests.adapters.DEFAULT_POOLSIZE,
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def setup_session(self, email: str, password: str) -> None:
         """Authenticate with the boostr api and create and store a session on the instance"""
@@ -165,10 +259,14 @@ class BoostrApi:
         return json
 
     def get(self, path: str, params=None, headers=None, max_retry=5):
-        """Make GET requests to Boostr, handling retries and rate limits."""
+        """Make GET requests to Boostr, handling retries and rate limits.
+
+        Safe to call from multiple threads, a 429 response pauses all callers until Retry-After has passed.
+        """
         current_retry = 0
 
         while current_retry < max_retry:
+            self.limiter.acquire()
             try:
                 response = self.session.get(
                     f"{self.base_url}/{path}",
@@ -193,7 +291,8 @@ class BoostrApi:
                     f"Current retry: {current_retry}"
                 )
                 current_retry += 1
-                self._sleep(retry_after)
+                with self.limiter.pause():
+                    self._sleep(retry_after)
                 continue
 
             if response.ok:
@@ -218,6 +317,8 @@ class BoostrLoader:
     log: logging.Logger
     max_deal_pages: int
     full_sync: bool
+    concurrency: int
+    product_ids: dict[int, int]
 
     def __init__(
         self, base_url: str, email: str, password: str, options=DEFAULT_OPTIONS
@@ -226,6 +327,8 @@ class BoostrLoader:
         self.boostr = BoostrApi(base_url, email, password, options)
         self.max_deal_pages = options.get("max_deal_pages", MAX_DEAL_PAGES_DEFAULT)
         self.full_sync = options.get("full_sync", FULL_SYNC)
+        self.concurrency = options.get("concurrency", CONCURRENCY_DEFAULT)
+        self.product_ids = {}
         self.latest_synced_on = (
             self.get_latest_sync_status() if not self.full_sync else None
         )
@@ -249,18 +352,72 @@ class BoostrLoader:
         self.log.info(f"Fetched {(len(products))} products")
 
         for product in products:
-            BoostrProduct.objects.update_or_create(
-                boostr_id=product["id"],
-                defaults={
-                    "full_name": product["full_name"],
-                    "country": get_country(product["full_name"]),
-                    "campaign_type": get_campaign_type(product["full_name"]),
-                },
-            )
+            self.upsert_product(product)
         self.log.info(f"Upserted {(len(products))} products")
 
+        # Every deal_product refers to one of these, so resolve them from memory for the rest of the sync
+        self.product_ids = dict(BoostrProduct.objects.values_list("boostr_id", "id"))
+        self.log.info(f"Loaded {len(self.product_ids)} product ids")
+
+    def upsert_product(self, product: dict[str, Any]) -> BoostrProduct:
+        """Upsert a single Boostr product to Shepherd DB"""
+        boostr_product: BoostrProduct
+        boostr_product, _ = BoostrProduct.objects.update_or_create(
+            boostr_id=product["id"],
+            defaults={
+                "full_name": product["full_name"],
+                "country": get_country(product["full_name"]),
+                "campaign_type": get_campaign_type(product["full_name"]),
+            },
+        )
+        return boostr_product
+
+    def get_product_id(self, boostr_id: int) -> int:
+        """Return the Shepherd DB id of a Boostr product, looking it up (and fetching it from Boostr if we've
+        never seen it) only the first time it isn't in product_ids
+        """
+        if boostr_id not in self.product_ids:
+            product = BoostrProduct.objects.filter(boostr_id=boostr_id).first()
+            if product is None:
+                self.log.info(f"Product {boostr_id} not found, fetching it from Boostr")
+                product = self.upsert_product(self.boostr.get(f"products/{boostr_id}"))
+            self.product_ids[boostr_id] = product.pk
+        return self.product_ids[boostr_id]
+
     def upsert_deals(self) -> None:
-        """Fetch watched Boostr deals (Closed Won, Verbal, Renewal) and upsert them to Shepherd DB"""
+        """Fetch watched Boostr deals (Closed Won, Verbal, Renewal) and upsert them to Shepherd DB
+
+        Pages of deals are fetched by a background thread and handed over through a bounded queue, so the next
+        pages are already on their way while the current one is written to the DB.
+        """
+        deal_pages: DealPageQueue = queue.Queue(maxsize=DEAL_PAGES_PREFETCH)
+        stop_fetching = threading.Event()
+        fetcher = threading.Thread(
+            target=self.fetch_deal_pages,
+            args=(deal_pages, stop_fetching),
+            name="boostr_deal_pages",
+            daemon=True,
+        )
+        fetcher.start()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="boostr_deal_products"
+            ) as executor:
+                while (deal_page := deal_pages.get()) is not None:
+                    if isinstance(deal_page, Exception):
+                        raise deal_page
+                    page, deals = deal_page
+                    self.upsert_deal_page(page, deals, executor)
+        finally:
+            stop_fetching.set()
+            fetcher.join()
+
+    def fetch_deal_pages(
+        self, deal_pages: DealPageQueue, stop_fetching: threading.Event
+    ) -> None:
+        """Fetch pages of deals from Boostr onto the deal_pages queue until we get an empty page or hit
+        max_deal_pages. Puts None on the queue when done, or the exception if fetching failed.
+        """
         page = 0
         deals_params = {
             "per": "300",
@@ -274,57 +431,133 @@ class BoostrLoader:
                     "updated_at_condition": ">=",
                 }
             )
-        while page < self.max_deal_pages:
-            page += 1
-            deals_params["page"] = str(page)
-
-            deals = self.boostr.get("deals", params=deals_params)
-            self.log.info(f"Fetched {len(deals)} deals for page {page}")
-
-            # Paged through all available records and are getting an empty list back
-            if len(deals) == 0:
-                self.log.info(f"Done. Fetched all the deals in {page - 1} pages")
-                break
-
-            watched_deals = [
-                d
-                for d in deals
-                if (d["stage_name"] in ["Closed Won", "Verbal", "Renewal"])
-            ]
-            for deal in watched_deals:
-                advertiser, advertiser_created = Advertiser.objects.update_or_create(
-                    name=deal["advertiser_name"],
-                )
+        try:
+            while page < self.max_deal_pages and not stop_fetching.is_set():
+                page += 1
+                deals_params["page"] = str(page)
+
+                deals = self.boostr.get("deals", params=deals_params)
+                self.log.info(f"Fetched {len(deals)} deals for page {page}")
+
+                # Paged through all available records and are getting an empty list back
+                if len(deals) == 0:
+                    self.log.info(f"Done. Fetched all the deals in {page - 1} pages")
+                    break
+
+                put_unless_stopped(deal_pages, (page, deals), stop_fetching)
+                # If this is the last iteration of the loop due to the max page limit, log that we stopped
+                if page >= self.max_deal_pages:
+                    self.log.info(
+                        f"Done. Stopped fetching deals after hitting max_page_limit of {page} pages."
+                    )
+        except Exception as e:
+            put_unless_stopped(deal_pages, e, stop_fetching)
+            return
+        put_unless_stopped(deal_pages, None, stop_fetching)
+
+    def upsert_deal_page(
+        self, page: int, deals: list[dict[str, Any]], executor: ThreadPoolExecutor
+    ) -> None:
+        """Upsert a page of deals and their deal_products, fetching the deal_products on the executor"""
+        watched_deals = [
+            d for d in deals if (d["stage_name"] in ["Closed Won", "Verbal", "Renewal"])
+        ]
+        advertisers, created_advertisers = self.upsert_advertisers(watched_deals)
+        boostr_deals, created_deal_ids = self.bulk_upsert_deals(
+            watched_deals, advertisers
+        )
+        self.log.info(f"Upserted {len(boostr_deals)} deals for page {page}")
+
+        # A campaign is only created for the first deal of a new advertiser, and only if that deal is new too
+        first_deal_ids: dict[str, int] = {}
+        for deal in watched_deals:
+            first_deal_ids.setdefault(deal["advertiser_name"], deal["id"])
+        campaign_deal_ids = created_deal_ids & {
+            first_deal_ids[name] for name in created_advertisers
+        }
 
-                boostr_deal, boostr_deal_created = BoostrDeal.objects.update_or_create(
-                    boostr_id=deal["id"],
-                    defaults={
-                        "name": deal["name"],
-                        "advertiser": deal["advertiser_name"],
-                        "advertiser_id": advertiser,
-                        "currency": deal["currency"],
-                        "amount": math.floor(float(deal["budget"])),
-                        "stage": get_stage(deal["stage_name"]),
-                        "sales_representatives": ",".join(
-                            str(d["email"]) for d in deal["deal_members"]
-                        ),
-                        "start_date": deal["start_date"],
-                        "end_date": deal["end_date"],
-                    },
-                )
+        # deal_products are fetched by the worker pool while this thread writes each deal's results
+        fetched_deal_products = executor.map(self.fetch_deal_products, boostr_deals)
+        for boostr_deal, deal_products in zip(boostr_deals, fetched_deal_products):
+            if boostr_deal.boostr_id in campaign_deal_ids:
+                self.create_campaign(boostr_deal)
+                self.log.debug(f"Created campaign for deal: {boostr_deal.boostr_id}")
+
+            self.upsert_deal_products(boostr_deal, deal_products)
+            self.log.info(
+                f"Upserted products and budgets for deal: {boostr_deal.boostr_id}"
+            )
 
-                self.log.debug(f"Upserted deal: {deal['id']}")
-                if boostr_deal_created and advertiser_created:
-                    self.create_campaign(boostr_deal)
-                    self.log.debug(f"Created campaign for deal: {deal['id']}")
+        CampaignSummary.refresh(boostr_deal.pk for boostr_deal in boostr_deals)
 
-                self.upsert_deal_products(boostr_deal)
-                self.log.info(f"Upserted products and budgets for deal: {deal['id']}")
-            # If this is the last iteration of the loop due to the max page limit, log that we stopped
-            if page >= self.max_deal_pages:
-                self.log.info(
-                    f"Done. Stopped fetching deals after hitting max_page_limit of {page} pages."
+    def upsert_advertisers(
+        self, deals: list[dict[str, Any]]
+    ) -> tuple[dict[str, Advertiser], set[str]]:
+        """Insert any advertisers from a page of deals that we haven't seen before, ignoring existing ones.
+
+        Returns a mapping of advertiser name to Advertiser and the set of names that were newly created.
+        """
+        names = {deal["advertiser_name"] for deal in deals}
+        if not names:
+            return {}, set()
+
+        existing_names = set(
+            Advertiser.objects.filter(name__in=names).values_list("name", flat=True)
+        )
+        created_names = names - existing_names
+        Advertiser.objects.bulk_create(
+            [Advertiser(name=name) for name in created_names],
+            ignore_conflicts=True,
+        )
+        advertisers = {
+            advertiser.name: advertiser
+            for advertiser in Advertiser.objects.filter(name__in=names)
+        }
+        return advertisers, created_names
+
+    def bulk_upsert_deals(
+        self, deals: list[dict[str, Any]], advertisers: dict[str, Advertiser]
+    ) -> tuple[list[BoostrDeal], set[int]]:
+        """Upsert a page of deals in a single statement keyed on boostr_id.
+
+        Returns the saved BoostrDeals and the set of boostr_ids that were newly created.
+        """
+        # A deal can only be written once per INSERT ... ON CONFLICT statement, keep the last copy
+        deals_by_id = {deal["id"]: deal for deal in deals}
+        if not deals_by_id:
+            return [], set()
+
+        existing_ids = set(
+            BoostrDeal.objects.filter(boostr_id__in=deals_by_id).values_list(
+                "boostr_id", flat=True
+            )
+        )
+        BoostrDeal.objects.bulk_create(
+            [
+                BoostrDeal(
+                    boostr_id=deal["id"],
+                    name=deal["name"],
+                    advertiser=deal["advertiser_name"],
+                    advertiser_id=advertisers[deal["advertiser_name"]],
+                    currency=deal["currency"],
+                    amount=math.floor(float(deal["budget"])),
+                    stage=get_stage(deal["stage_name"]),
+                    sales_representatives=",".join(
+                        str(d["email"]) for d in deal["deal_members"]
+                    ),
+                    start_date=deal["start_date"],
+                    end_date=deal["end_date"],
                 )
+                for deal in deals_by_id.values()
+            ],
+            update_conflicts=True,
+            unique_fields=["boostr_id"],
+            update_fields=BOOSTR_DEAL_UPDATE_FIELDS,
+        )
+        boostr_deals = list(
+            BoostrDeal.objects.filter(boostr_id__in=deals_by_id).order_by("boostr_id")
+        )
+        return boostr_deals, set(deals_by_id) - existing_ids
 
     def create_campaign(self, deal: BoostrDeal) -> None:
         """Create campaign if a boostr deal is created. Returns True if successful, False otherwise."""
@@ -337,8 +570,8 @@ class BoostrLoader:
             end_date=deal.end_date,
         )
 
-    def upsert_deal_products(self, deal: BoostrDeal) -> None:
-        """Fetch the deal_products for a particular deal and store them in our DB with their monthly budgets"""
+    def fetch_deal_products(self, deal: BoostrDeal) -> list[dict[str, Any]]:
+        """Fetch the deal_products for a particular deal. Safe to call from the worker pool, it doesn't touch the DB"""
         deal_products_params = (
             {
                 "updated_at": self.latest_synced_on,
@@ -348,28 +581,84 @@ class BoostrLoader:
             else {}
         )
 
-        deal_products = self.boostr.get(
+        deal_products: list[dict[str, Any]] = self.boostr.get(
             f"deals/{deal.boostr_id}/deal_products", params=deal_products_params
         )
 
         self.log.debug(
             f"Fetched {len(deal_products)} deal_products for deal: {deal.boostr_id}"
         )
+        return deal_products
+
+    def upsert_deal_products(
+        self, deal: BoostrDeal, deal_products: list[dict[str, Any]] | None = None
+    ) -> None:
+        """Store the deal_products for a particular deal in our DB with their monthly budgets, fetching them
+        from Boostr first if they weren't passed in
+        """
+        if deal_products is None:
+            deal_products = self.fetch_deal_products(deal)
 
+        budgets: dict[tuple[int, str], int] = {}
         for deal_product in deal_products:
-            product = BoostrProduct.objects.get(boostr_id=deal_product["product"]["id"])
+            product_id = self.get_product_id(deal_product["product"]["id"])
             for budget in deal_product["deal_product_budgets"]:
-                BoostrDealProduct.objects.update_or_create(
-                    boostr_deal=deal,
-                    boostr_product=product,
-                    month=budget["month"],
-                    budget=budget["budget"],
+                budgets[(product_id, budget["month"])] = math.floor(
+                    float(budget["budget"])
                 )
-            self.log.debug(
-                f'Upserted {len(deal_product["deal_product_budgets"])} months of budget for product: '
-                f"{product.boostr_id} to deal: {deal.boostr_id}"
+        self.reconcile_deal_product_budgets(deal, budgets)
+
+    def reconcile_deal_product_budgets(
+        self, deal: BoostrDeal, budgets: dict[tuple[int, str], int]
+    ) -> None:
+        """Make the deal's BoostrDealProducts match the given (product id, month) -> budget mapping, reading the
+        existing rows in one query and applying the inserts, updates and deletes in bulk
+        """
+        existing_deal_products = BoostrDealProduct.objects.filter(boostr_deal=deal)
+        if self.latest_synced_on:
+            # Incremental syncs only return the deal_products that changed, leave the deal's other products alone
+            existing_deal_products = existing_deal_products.filter(
+                boostr_product_id__in={product_id for product_id, _ in budgets}
             )
 
+        to_create = dict(budgets)
+        to_update: list[BoostrDealProduct] = []
+        to_delete: list[int] = []
+        unchanged = 0
+        for deal_product in existing_deal_products:
+            key = (deal_product.boostr_product_id, deal_product.month)
+            if key not in to_create:
+                to_delete.append(deal_product.pk)
+                continue
+            budget = to_create.pop(key)
+            if deal_product.budget != budget:
+                deal_product.budget = budget
+                to_update.append(deal_product)
+            else:
+                unchanged += 1
+
+        with transaction.atomic():
+            if to_delete:
+                BoostrDealProduct.objects.filter(pk__in=to_delete).delete()
+            if to_update:
+                BoostrDealProduct.objects.bulk_update(to_update, ["budget"])
+            if to_create:
+                BoostrDealProduct.objects.bulk_create(
+                    [
+                        BoostrDealProduct(
+                            boostr_deal=deal,
+                            boostr_product_id=product_id,
+                            month=month,
+                            budget=budget,
+                        )
+                        for (product_id, month), budget in to_create.items()
+                    ]
+                )
+        self.log.debug(
+            f"Reconciled budgets for deal: {deal.boostr_id}. Created: {len(to_create)}, updated: {len(to_update)}, "
+            f"deleted: {len(to_delete)}, unchanged: {unchanged}"
+        )
+
     @classmethod
     def update_sync_status(self, status: str, synced_on: datetime, message: str):
         """Update the BoostrSyncStatus table given the status and the message"""
@@ -400,13 +689,25 @@ class BoostrLoader:
         self.log.info(
             f"Starting Boostr sync at {sync_start_time} retrieving records >= {self.latest_synced_on}"
         )
-        self.upsert_products()
-        self.upsert_deals()
+        # Each page refreshes its deals' summaries, and saving the sync status below bumps the DataGeneration
+        with bulk_write():
+            self.upsert_products()
+            self.upsert_deals()
         BoostrLoader.update_sync_status(
             SYNC_STATUS_SUCCESS, sync_start_time, "Boostr sync success"
         )
 
 
+def put_unless_stopped(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    """Put an item on a bounded queue, giving up if the stop event is set while waiting for room"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=QUEUE_PUT_TIMEOUT)
+            return
+        except queue.Full:
+            continue
+
+
 def get_campaign_type(product_full_name: str) -> str:
     """Infer a campaign type from a product's full name"""
     if "CPC" in product_full_name:
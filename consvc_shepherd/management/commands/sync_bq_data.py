@@ -3,18 +3,42 @@
 import logging
 import os
 import traceback
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Iterable, Mapping
 
-import pandas
 from django.core.management import CommandError
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from django.utils import timezone
 from google.cloud import bigquery
+from google.cloud.bigquery.table import RowIterator
 
-from consvc_shepherd.models import BQSyncStatus, DeliveredFlight
+from consvc_shepherd.models import (
+    BQSyncStatus,
+    CampaignSummary,
+    DeliveredFlight,
+    DeliveredFlightRollup,
+    Flight,
+)
 
 SYNC_STATUS_SUCCESS = "success"
 SYNC_STATUS_FAILURE = "failure"
+# Number of days of a date range that are queried from BigQuery at the same time
+CONCURRENCY_DEFAULT = 4
+# Keeps each INSERT well under Postgres' limit of 65535 bind parameters
+UPSERT_BATCH_SIZE = 1000
+DELIVERED_FLIGHT_COLUMNS = [
+    "submission_date",
+    "campaign_id",
+    "campaign_name",
+    "flight_id",
+    "flight_name",
+    "provider",
+    "clicks_delivered",
+    "impressions_delivered",
+]
+DELIVERED_FLIGHT_KEY = ["submission_date", "campaign_id", "flight_id", "provider"]
 
 
 class Command(BaseCommand):
@@ -30,6 +54,22 @@ class Command(BaseCommand):
             type=str,
             help="The date we want to capture metrics for, e.g. 2024-09-18. By default, it will use today's date.",
         )
+        parser.add_argument(
+            "--start-date",
+            type=str,
+            help="The first date of a range of dates to backfill metrics for, e.g. 2024-09-01. Requires --end-date.",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=str,
+            help="The last date (inclusive) of a range of dates to backfill metrics for. Requires --start-date.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            default=CONCURRENCY_DEFAULT,
+            type=int,
+            help="The number of days in a date range that are queried from BigQuery in parallel",
+        )
 
     def handle(self, *args, **options):
         """Handle running the command"""
@@ -37,27 +77,60 @@ class Command(BaseCommand):
         if not project_id:
             raise CommandError("PROJECT_ID environment variable not set.")
 
-        try:
-            datetime.strptime(options["date"], "%Y-%m-%d")
-        except ValueError:
-            raise CommandError("Invalid date format. Please use YYYY-MM-DD")
+        if options["start_date"] or options["end_date"]:
+            if not (options["start_date"] and options["end_date"]):
+                raise CommandError("--start-date and --end-date must be used together")
+            start_date = parse_date(options["start_date"])
+            end_date = parse_date(options["end_date"])
+            if start_date > end_date:
+                raise CommandError("--start-date must not be after --end-date")
+            if options["concurrency"] < 1:
+                raise CommandError("--concurrency must be at least 1")
+        else:
+            start_date = end_date = parse_date(options["date"])
 
         try:
-            bigquery.Client(project=project_id)
+            client = bigquery.Client(project=project_id)
         except Exception as e:
             raise CommandError(f"Invalid project ID: {project_id}. Error: {e}")
 
-        syncer = BQSyncer(project_id, options["date"])
-
-        try:
-            self.stdout.write(
-                f"Starting BigQuery sync from project '{project_id}' for date {options['date']}"
+        if start_date == end_date:
+            sync_date = start_date.strftime("%Y-%m-%d")
+            syncer = BQSyncer(project_id, sync_date, client)
+            try:
+                self.stdout.write(
+                    f"Starting BigQuery sync from project '{project_id}' for date {sync_date}"
+                )
+                syncer.sync_data()
+            except Exception as e:
+                raise CommandError(f"{e}")
+
+            self.stdout.write(f"BigQuery sync completed for date {sync_date}")
+            return
+
+        range_syncer = BQRangeSyncer(
+            project_id, start_date, end_date, client, options["concurrency"]
+        )
+        self.stdout.write(
+            f"Starting BigQuery sync from project '{project_id}' for dates {start_date} to {end_date}"
+        )
+        failed_dates = range_syncer.sync_data()
+        if failed_dates:
+            raise CommandError(
+                f"BigQuery sync failed for dates: {', '.join(failed_dates)}"
             )
-            syncer.sync_data()
-        except Exception as e:
-            raise CommandError(f"{e}")
 
-        self.stdout.write(f"BigQuery sync completed for date {options['date']}")
+        self.stdout.write(
+            f"BigQuery sync completed for dates {start_date} to {end_date}"
+        )
+
+
+def parse_date(value: str) -> date:
+    """Parse a YYYY-MM-DD command line date, raising a CommandError if it's malformed"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError("Invalid date format. Please use YYYY-MM-DD")
 
 
 class NoDataReturnedError(Exception):
@@ -74,13 +147,19 @@ class BQSyncer:
     log: logging.Logger
     project_id: str
     date: str
+    client: bigquery.Client | None
+    flight_ids: set[int]
 
-    def __init__(self, project_id: str, date: str):
+    def __init__(
+        self, project_id: str, date: str, client: bigquery.Client | None = None
+    ):
         self.log = logging.getLogger("sync_bigquery_ads_data")
         self.project_id = project_id
         self.date = date
+        self.client = client
+        self.flight_ids = set()
 
-    def query_bq(self) -> pandas.DataFrame:
+    def query_bq(self) -> RowIterator:
         """Create SQL query, send query BQ through its client"""
         query = """
             SELECT
@@ -107,7 +186,7 @@ class BQSyncer:
                 provider
         """
 
-        client = bigquery.Client(project=self.project_id)
+        client = self.client or bigquery.Client(project=self.project_id)
 
         job_config = bigquery.QueryJobConfig(
             query_parameters=[
@@ -122,48 +201,171 @@ class BQSyncer:
             if results.total_rows == 0:
                 raise NoDataReturnedError(self.date)
 
-            df = results.to_dataframe()
-
-            self.log.info(f"BQ data pulled successfully for date {self.date}")
-            return df
+            self.log.info(
+                f"BQ query returned {results.total_rows} rows for date {self.date}"
+            )
+            return results
         except Exception as e:
             self.log.error(f"An error occurred while querying BigQuery: {e}")
             raise  # Re-raise the exception to propagate it further
 
-    def upsert_data(self, df):
-        """Upsert data queried from BigQuery into Shepherd DB"""
-        for _, row in df.iterrows():
-            submission_date = row["submission_date"]
-            campaign_id = row["campaign_id"]
-            campaign_name = row["campaign_name"]
-            flight_id = row["flight_id"]
-            flight_name = row["flight_name"]
-            provider = row["provider"]
-            clicks = row["clicks"]
-            impressions = row["impressions"]
-
-            defaults = {
-                "clicks_delivered": clicks,
-                "impressions_delivered": impressions,
-            }
+    def upsert_data(self, rows: RowIterator) -> None:
+        """Upsert data queried from BigQuery into Shepherd DB, streaming it one result page at a time"""
+        created = updated = 0
+        for page_number, page in enumerate(rows.pages, start=1):
+            page_created, page_updated = self.upsert_page(page)
+            created += page_created
+            updated += page_updated
+            self.log.info(
+                f"Upserted page {page_number} of DeliveredFlights: {page_created} created, {page_updated} updated"
+            )
+        self.log.info(
+            f"Upserted DeliveredFlights for date {self.date}: {created} created, {updated} updated"
+        )
 
-            if campaign_name:
-                defaults["campaign_name"] = campaign_name
-            if flight_name:
-                defaults["flight_name"] = flight_name
-
-            delivered_flight, created = DeliveredFlight.objects.update_or_create(
-                submission_date=submission_date,
-                campaign_id=campaign_id,
-                flight_id=flight_id,
-                provider=provider,
-                defaults=defaults,
+    def upsert_page(self, page: Iterable[Mapping[str, Any]]) -> tuple[int, int]:
+        """Upsert a page of BigQuery rows in batches, returning the (created, updated) counts"""
+        # A row can only be written once per statement, the last copy of a flight wins like it did row by row
+        flights: dict[tuple, dict[str, Any]] = {}
+        for row in page:
+            flight = {
+                "submission_date": row["submission_date"],
+                "campaign_id": row["campaign_id"],
+                "campaign_name": row["campaign_name"] or None,
+                "flight_id": row["flight_id"],
+                "flight_name": row["flight_name"] or None,
+                "provider": row["provider"],
+                "clicks_delivered": row["clicks"],
+                "impressions_delivered": row["impressions"],
+            }
+            self.flight_ids.add(flight["flight_id"])
+            flights[delivered_flight_key(flight)] = flight
+
+        values = list(flights.values())
+        created = 0
+        with transaction.atomic():
+            lock_submission_dates({flight["submission_date"] for flight in values})
+            for start in range(0, len(values), UPSERT_BATCH_SIZE):
+                end = start + UPSERT_BATCH_SIZE
+                created += self.upsert_batch(values[start:end])
+        return created, len(values) - created
+
+    def upsert_batch(self, flights: list[dict[str, Any]]) -> int:
+        """Upsert a batch of DeliveredFlights with INSERT ... ON CONFLICT and add the change in their clicks and
+        impressions to the flights' DeliveredFlightRollups. Returns how many DeliveredFlights were created.
+        """
+        # Lock the rows we're about to overwrite, so the previous values the rollup deltas are based on can't change.
+        # Rows that don't exist yet can't be locked, which is why upsert_page also locks their submission_dates.
+        previous = {
+            delivered_flight_key(flight): flight
+            for flight in DeliveredFlight.objects.select_for_update()
+            .filter(
+                submission_date__in={flight["submission_date"] for flight in flights},
+                flight_id__in={flight["flight_id"] for flight in flights},
+            )
+            .values("id", *DELIVERED_FLIGHT_COLUMNS)
+        }
+
+        # NULLs never conflict in unique_delivered_flight, so ON CONFLICT can't find flights without a provider
+        with_provider = [flight for flight in flights if flight["provider"] is not None]
+        created = 0
+        if with_provider:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    upsert_delivered_flights_sql(len(with_provider)),
+                    [
+                        flight[column]
+                        for flight in with_provider
+                        for column in DELIVERED_FLIGHT_COLUMNS
+                    ],
+                )
+                created += sum(1 for (inserted,) in cursor.fetchall() if inserted)
+        providerless = [flight for flight in flights if flight["provider"] is None]
+        if providerless:
+            created += self.upsert_providerless(providerless, previous)
+
+        self.update_rollups(flights, previous)
+        return created
+
+    def upsert_providerless(
+        self, flights: list[dict[str, Any]], previous: dict[tuple, dict[str, Any]]
+    ) -> int:
+        """Upsert DeliveredFlights without a provider by matching them against the previous rows, the same way
+        the INSERT ... ON CONFLICT does for the others. Returns how many were created.
+        """
+        to_update = []
+        to_create = []
+        for flight in flights:
+            old = previous.get(delivered_flight_key(flight))
+            if old is None:
+                to_create.append(DeliveredFlight(**flight))
+                continue
+            to_update.append(
+                DeliveredFlight(
+                    **dict(
+                        flight,
+                        id=old["id"],
+                        campaign_name=flight["campaign_name"] or old["campaign_name"],
+                        flight_name=flight["flight_name"] or old["flight_name"],
+                    )
+                )
+            )
+        DeliveredFlight.objects.bulk_update(
+            to_update,
+            [
+                "campaign_name",
+                "flight_name",
+                "clicks_delivered",
+                "impressions_delivered",
+            ],
+        )
+        DeliveredFlight.objects.bulk_create(to_create)
+        return len(to_create)
+
+    def update_rollups(
+        self, flights: list[dict[str, Any]], previous: dict[tuple, dict[str, Any]]
+    ) -> None:
+        """Apply the difference between the upserted DeliveredFlights and their previous values to the flights'
+        DeliveredFlightRollups
+        """
+        rollups: dict[int, dict[str, Any]] = {}
+        for flight in flights:
+            old = previous.get(delivered_flight_key(flight), {})
+            submission_date = flight["submission_date"]
+            rollup = rollups.setdefault(
+                flight["flight_id"],
+                {
+                    "clicks_delivered": 0,
+                    "impressions_delivered": 0,
+                    "first_seen": submission_date,
+                    "last_seen": submission_date,
+                },
+            )
+            for metric in ["clicks_delivered", "impressions_delivered"]:
+                rollup[metric] += flight[metric] - old.get(metric, 0)
+            rollup["first_seen"] = min(rollup["first_seen"], submission_date)
+            rollup["last_seen"] = max(rollup["last_seen"], submission_date)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                upsert_rollups_sql(len(rollups)),
+                [
+                    value
+                    for flight_id, rollup in rollups.items()
+                    for value in [flight_id, *rollup.values()]
+                ],
             )
 
-            if created:
-                self.log.info(f"Created new DeliveredFlight: {delivered_flight}")
-            else:
-                self.log.info(f"Updated DeliveredFlight: {delivered_flight}")
+    def refresh_campaign_summaries(self) -> None:
+        """Refresh the CampaignSummaries of the deals whose flights were synced"""
+        deal_ids = (
+            Flight.objects.filter(
+                kevel_flight_id__in=self.flight_ids, campaign__isnull=False
+            )
+            .values_list("campaign__deal_id", flat=True)
+            .distinct()
+        )
+        CampaignSummary.refresh(deal_ids)
 
     def update_sync_status(self, status: str, message: str):
         """Update the BQSyncStatus table given the status and the message"""
@@ -176,13 +378,12 @@ class BQSyncer:
             query_date=query_date,
         )
 
-    def sync_data(self):
-        """BQ Syncer entrypoint"""
+    def sync_data(self, query: Callable[[], RowIterator] | None = None):
+        """BQ Syncer entrypoint. query returns the rows to upsert, and defaults to running query_bq."""
         try:
-            df = self.query_bq()
-
-            if not df.empty:
-                self.upsert_data(df)
+            rows = (query or self.query_bq)()
+            self.upsert_data(rows)
+            self.refresh_campaign_summaries()
 
             self.log.info(
                 "BigQuery sync process has completed successfully. Updating sync_status"
@@ -198,3 +399,105 @@ class BQSyncer:
             )
             self.update_sync_status(SYNC_STATUS_FAILURE, error)
             raise e
+
+
+class BQRangeSyncer:
+    """Sync a range of dates from BigQuery, querying several days at once through one shared client"""
+
+    log: logging.Logger
+    syncers: list[BQSyncer]
+    concurrency: int
+
+    def __init__(
+        self,
+        project_id: str,
+        start_date: date,
+        end_date: date,
+        client: bigquery.Client,
+        concurrency: int = CONCURRENCY_DEFAULT,
+    ):
+        self.log = logging.getLogger("sync_bigquery_ads_data")
+        days = (end_date - start_date).days + 1
+        self.syncers = [
+            BQSyncer(
+                project_id,
+                (start_date + timedelta(days=day)).strftime("%Y-%m-%d"),
+                client,
+            )
+            for day in range(days)
+        ]
+        self.concurrency = concurrency
+
+    def sync_data(self) -> list[str]:
+        """Sync every date in the range, returning the dates that failed.
+
+        BigQuery queries run in worker threads while the results are upserted from this thread, in date order, so
+        each day still gets its own BQSyncStatus row.
+        """
+        failed_dates = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            queries = [executor.submit(syncer.query_bq) for syncer in self.syncers]
+            for syncer, query in zip(self.syncers, queries):
+                try:
+                    syncer.sync_data(query.result)
+                except Exception as e:
+                    self.log.error(f"BigQuery sync failed for date {syncer.date}: {e}")
+                    failed_dates.append(syncer.date)
+        return failed_dates
+
+
+def lock_submission_dates(submission_dates: Iterable[date]) -> None:
+    """Take a transaction level advisory lock on each submission_date, in order so overlapping syncs can't
+    deadlock. Two syncs of the same date then can't both take a DeliveredFlight to be new and add it to the
+    rollups twice.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT pg_advisory_xact_lock(hashtext('sync_bq_data.' || submission_date))
+            FROM (SELECT unnest(%s::text[]) AS submission_date ORDER BY 1) AS submission_dates
+            """,
+            [sorted(str(submission_date) for submission_date in submission_dates)],
+        )
+
+
+def delivered_flight_key(flight: Mapping[str, Any]) -> tuple:
+    """Return the unique_delivered_flight key of a DeliveredFlight's values"""
+    return tuple(flight[column] for column in DELIVERED_FLIGHT_KEY)
+
+
+def upsert_delivered_flights_sql(row_count: int) -> str:
+    """Build the INSERT ... ON CONFLICT statement for row_count DeliveredFlights, keyed on the
+    unique_delivered_flight constraint. Names are only overwritten when BigQuery has one. Returns whether each
+    row was inserted (rather than updated).
+    """
+    table = DeliveredFlight._meta.db_table
+    row_placeholder = f"({', '.join(['%s'] * len(DELIVERED_FLIGHT_COLUMNS))})"
+    # Only placeholders and our own table and column names are interpolated into the SQL
+    return f"""
+        INSERT INTO {table} ({", ".join(DELIVERED_FLIGHT_COLUMNS)})
+        VALUES {", ".join([row_placeholder] * row_count)}
+        ON CONFLICT ({", ".join(DELIVERED_FLIGHT_KEY)}) DO UPDATE SET
+            campaign_name = COALESCE(EXCLUDED.campaign_name, {table}.campaign_name),
+            flight_name = COALESCE(EXCLUDED.flight_name, {table}.flight_name),
+            clicks_delivered = EXCLUDED.clicks_delivered,
+            impressions_delivered = EXCLUDED.impressions_delivered
+        RETURNING xmax = 0
+    """  # nosec B608
+
+
+def upsert_rollups_sql(row_count: int) -> str:
+    """Build the statement that adds the (flight_id, clicks, impressions, first_seen, last_seen) changes of
+    row_count flights to their DeliveredFlightRollups, creating the rollups of new flights
+    """
+    table = DeliveredFlightRollup._meta.db_table
+    # Only placeholders and our own table name are interpolated into the SQL
+    return f"""
+        INSERT INTO {table} (flight_id, clicks_delivered, impressions_delivered, first_seen, last_seen)
+        VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * row_count)}
+        ON CONFLICT (flight_id) DO UPDATE SET
+            clicks_delivered = {table}.clicks_delivered + EXCLUDED.clicks_delivered,
+            impressions_delivered = {table}.impressions_delivered + EXCLUDED.impressions_delivered,
+            first_seen = LEAST({table}.first_seen, EXCLUDED.first_seen),
+            last_seen = GREATEST({table}.last_seen, EXCLUDED.last_seen)
+    """  # nosec B608
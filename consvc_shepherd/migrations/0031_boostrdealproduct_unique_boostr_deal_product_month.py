@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-17 22:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consvc_shepherd", "0030_alter_boostrdeal_stage"),
+    ]
+
+    operations = [
+        # Budget changes used to insert a new row instead of updating the old one, keep the newest row for
+        # each deal, product and month before adding the constraint
+        migrations.RunSQL(
+            """
+            DELETE FROM consvc_shepherd_boostrdealproduct stale
+            USING consvc_shepherd_boostrdealproduct newer
+            WHERE stale.boostr_deal_id = newer.boostr_deal_id
+                AND stale.boostr_product_id = newer.boostr_product_id
+                AND stale.month = newer.month
+                AND stale.id < newer.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="boostrdealproduct",
+            constraint=models.UniqueConstraint(
+                fields=("boostr_deal", "boostr_product", "month"),
+                name="unique_boostr_deal_product_month",
+            ),
+        ),
+    ]
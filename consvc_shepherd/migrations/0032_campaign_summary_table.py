@@ -0,0 +1,54 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consvc_shepherd", "0031_boostrdealproduct_unique_boostr_deal_product_month"),
+    ]
+
+    operations = [
+        # campaign_summary_view stays as the definition of a summary, campaign_summary stores its rows so
+        # reads don't re-aggregate every DeliveredFlight. CampaignSummary.refresh keeps the two in sync.
+        migrations.RunSQL(
+            """
+            CREATE TABLE campaign_summary (
+                deal_id bigint PRIMARY KEY
+                    REFERENCES consvc_shepherd_boostrdeal (id) ON DELETE CASCADE,
+                advertiser varchar NOT NULL,
+                net_spend double precision NOT NULL,
+                impressions_sold double precision NOT NULL,
+                impressions_delivered bigint NOT NULL,
+                clicks_delivered bigint NOT NULL,
+                advertiser_id_id bigint NULL
+                    REFERENCES consvc_shepherd_advertiser (id) ON DELETE SET NULL
+            );
+            CREATE INDEX campaign_summary_advertiser_idx ON campaign_summary (advertiser);
+            INSERT INTO campaign_summary (
+                deal_id,
+                advertiser,
+                net_spend,
+                impressions_sold,
+                impressions_delivered,
+                clicks_delivered,
+                advertiser_id_id
+            )
+            SELECT
+                deal_id,
+                advertiser,
+                net_spend,
+                impressions_sold,
+                impressions_delivered,
+                clicks_delivered,
+                advertiser_id_id
+            FROM campaign_summary_view;
+            """,
+            reverse_sql="DROP TABLE IF EXISTS campaign_summary;",
+        ),
+        migrations.AlterModelTable(
+            name="campaignsummary",
+            table="campaign_summary",
+        ),
+    ]
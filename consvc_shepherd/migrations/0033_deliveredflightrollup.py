@@ -0,0 +1,139 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consvc_shepherd", "0032_campaign_summary_table"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeliveredFlightRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("flight_id", models.IntegerField(unique=True)),
+                ("clicks_delivered", models.BigIntegerField(default=0)),
+                ("impressions_delivered", models.BigIntegerField(default=0)),
+                ("first_seen", models.DateField()),
+                ("last_seen", models.DateField()),
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO consvc_shepherd_deliveredflightrollup
+                (flight_id, clicks_delivered, impressions_delivered, first_seen, last_seen)
+            SELECT
+                flight_id,
+                SUM(clicks_delivered),
+                SUM(impressions_delivered),
+                MIN(submission_date),
+                MAX(submission_date)
+            FROM consvc_shepherd_deliveredflight
+            GROUP BY flight_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Join one rollup row per flight instead of every daily DeliveredFlight row, and re-fill the stored
+        # summaries from the new view. The sums are cast back to bigint to keep the view's column types.
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE VIEW campaign_summary_view AS
+            SELECT
+                d.id AS deal_id,
+                d.advertiser AS advertiser,
+                SUM(c.net_spend) AS net_spend,
+                SUM(c.impressions_sold) AS impressions_sold,
+                COALESCE(SUM(r.impressions_delivered), 0)::bigint AS impressions_delivered,
+                COALESCE(SUM(r.clicks_delivered), 0)::bigint AS clicks_delivered,
+                a.id AS advertiser_id_id
+            FROM consvc_shepherd_boostrdeal d
+            LEFT JOIN consvc_shepherd_campaign c
+                ON c.deal_id = d.id
+            LEFT JOIN consvc_shepherd_flight f
+                ON f.campaign_id = c.id
+            LEFT JOIN consvc_shepherd_deliveredflightrollup r
+                ON f.kevel_flight_id = r.flight_id
+            LEFT JOIN consvc_shepherd_advertiser a
+                ON d.advertiser_id_id = a.id
+            GROUP BY d.id, d.advertiser, a.id
+            HAVING
+                SUM(c.net_spend) IS NOT NULL
+                AND SUM(c.impressions_sold) IS NOT NULL
+            ORDER BY d.advertiser;
+            DELETE FROM campaign_summary;
+            INSERT INTO campaign_summary (
+                deal_id,
+                advertiser,
+                net_spend,
+                impressions_sold,
+                impressions_delivered,
+                clicks_delivered,
+                advertiser_id_id
+            )
+            SELECT
+                deal_id,
+                advertiser,
+                net_spend,
+                impressions_sold,
+                impressions_delivered,
+                clicks_delivered,
+                advertiser_id_id
+            FROM campaign_summary_view;
+            """,
+            reverse_sql="""
+            CREATE OR REPLACE VIEW campaign_summary_view AS
+            SELECT
+                d.id AS deal_id,
+                d.advertiser AS advertiser,
+                SUM(c.net_spend) AS net_spend,
+                SUM(c.impressions_sold) AS impressions_sold,
+                COALESCE(SUM(df.impressions_delivered), 0) AS impressions_delivered,
+                COALESCE(SUM(df.clicks_delivered), 0) AS clicks_delivered,
+                a.id AS advertiser_id_id
+            FROM consvc_shepherd_boostrdeal d
+            LEFT JOIN consvc_shepherd_campaign c
+                ON c.deal_id = d.id
+            LEFT JOIN consvc_shepherd_flight f
+                ON f.campaign_id = c.id
+            LEFT JOIN consvc_shepherd_deliveredflight df
+                ON f.kevel_flight_id = df.flight_id
+            LEFT JOIN consvc_shepherd_advertiser a
+                ON d.advertiser_id_id = a.id
+            GROUP BY d.id, d.advertiser, a.id
+            HAVING
+                SUM(c.net_spend) IS NOT NULL
+                AND SUM(c.impressions_sold) IS NOT NULL
+            ORDER BY d.advertiser;
+            DELETE FROM campaign_summary;
+            INSERT INTO campaign_summary (
+                deal_id,
+                advertiser,
+                net_spend,
+                impressions_sold,
+                impressions_delivered,
+                clicks_delivered,
+                advertiser_id_id
+            )
+            SELECT
+                deal_id,
+                advertiser,
+                net_spend,
+                impressions_sold,
+                impressions_delivered,
+                clicks_delivered,
+                advertiser_id_id
+            FROM campaign_summary_view;
+            """,
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consvc_shepherd", "0033_deliveredflightrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="boostrdealproduct",
+            index=models.Index(
+                fields=["month", "boostr_deal"], name="dealproduct_month_deal_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deliveredflight",
+            index=models.Index(
+                fields=["flight_id"],
+                include=(
+                    "submission_date",
+                    "clicks_delivered",
+                    "impressions_delivered",
+                ),
+                name="deliveredflight_flight_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["kevel_flight_id"], name="flight_kevel_flight_id_idx"
+            ),
+        ),
+    ]
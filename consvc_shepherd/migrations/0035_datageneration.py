@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consvc_shepherd", "0034_summary_join_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataGeneration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("generation", models.BigIntegerField(default=0)),
+                ("updated_on", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
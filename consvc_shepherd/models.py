@@ -1,11 +1,12 @@
 """Models module for consvc_shepherd."""
 
 import json
-from typing import Any
+from typing import Any, Iterable
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connection, models, transaction
 from django.db.models import (
+    BigIntegerField,
     CharField,
     DateField,
     DateTimeField,
@@ -15,6 +16,9 @@ from django.db.models import (
     JSONField,
     ManyToManyField,
 )
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 from contile.models import Partner
 
@@ -374,6 +378,22 @@ class BoostrDealProduct(models.Model):
     budget: IntegerField = models.IntegerField()
     month: CharField = models.CharField()
 
+    class Meta:
+        """Metadata for the BoostrDealProduct model."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["boostr_deal", "boostr_product", "month"],
+                name="unique_boostr_deal_product_month",
+            ),
+        ]
+        indexes = [
+            # Covers the month filter of the campaign summaries, which only needs the deal ids
+            models.Index(
+                fields=["month", "boostr_deal"], name="dealproduct_month_deal_idx"
+            ),
+        ]
+
 
 class BoostrSyncStatus(models.Model):
     """Table for capturing the status of a Booster sync process execution
@@ -438,6 +458,24 @@ class BQSyncStatus(models.Model):
     message: CharField = models.CharField()
 
 
+class CampaignQuerySet(models.QuerySet):
+    """QuerySet for Campaigns"""
+
+    def with_latest_flight(self) -> "CampaignQuerySet":
+        """Annotate each campaign with the kevel_flight_id of its most recent flight, so reading
+        Campaign.kevel_flight_id doesn't need a query per campaign
+        """
+        latest_flight = Flight.objects.filter(campaign=models.OuterRef("pk")).order_by(
+            "-pk"
+        )
+        annotated: CampaignQuerySet = self.annotate(
+            latest_kevel_flight_id=models.Subquery(
+                latest_flight.values("kevel_flight_id")[:1]
+            )
+        )
+        return annotated
+
+
 class Campaign(models.Model):
     """Representation of AdOps CampaignOverview
 
@@ -482,6 +520,8 @@ class Campaign(models.Model):
     created_on: DateTimeField = models.DateTimeField(auto_now_add=True)
     updated_on: DateTimeField = models.DateTimeField(auto_now=True)
 
+    objects = CampaignQuerySet.as_manager()
+
     @property
     def net_ecpm(self):
         """Calculate and return the net eCPM."""
@@ -493,6 +533,9 @@ class Campaign(models.Model):
     @property
     def kevel_flight_id(self):
         """Retrieve the most recent flight ID related to the campaign."""
+        if hasattr(self, "latest_kevel_flight_id"):
+            # Annotated by CampaignQuerySet.with_latest_flight
+            return self.latest_kevel_flight_id
         flight = self.flights.last()
         return flight.kevel_flight_id if flight else None
 
@@ -507,9 +550,84 @@ class Campaign(models.Model):
         return f"Campaign {self.kevel_flight_id} - {self.ad_ops_person}"
 
 
+CAMPAIGN_SUMMARY_COLUMNS = [
+    "deal_id",
+    "advertiser",
+    "net_spend",
+    "impressions_sold",
+    "impressions_delivered",
+    "clicks_delivered",
+    "advertiser_id_id",
+]
+
+
+class RoundToCents(models.Func):
+    """Round a float expression to 2 decimal places in Postgres, which only rounds numerics to a precision"""
+
+    template = "ROUND((%(expressions)s)::numeric, 2)::double precision"
+    output_field = FloatField()
+
+
+class CampaignSummaryQuerySet(models.QuerySet):
+    """QuerySet for CampaignSummaries"""
+
+    def with_metrics(self) -> "CampaignSummaryQuerySet":
+        """Annotate each summary with its derived metrics computed in SQL, so they can be filtered and
+        ordered on, and reading them doesn't compute them in Python
+        """
+        clicks_delivered = Cast("clicks_delivered", FloatField())
+        annotated: CampaignSummaryQuerySet = self.annotate(
+            net_ecpm=models.Case(
+                models.When(
+                    impressions_sold__gt=0,
+                    then=RoundToCents(
+                        models.F("net_spend") / models.F("impressions_sold") * 1000
+                    ),
+                ),
+                output_field=FloatField(),
+            ),
+            ctr=models.Case(
+                models.When(
+                    ~models.Q(clicks_delivered=0)
+                    & models.Q(impressions_delivered__gt=0),
+                    then=RoundToCents(
+                        clicks_delivered / models.F("impressions_delivered") * 100
+                    ),
+                ),
+                output_field=FloatField(),
+            ),
+            impressions_remaining=models.Case(
+                models.When(
+                    impressions_sold__gt=0,
+                    then=models.F("impressions_sold")
+                    - models.F("impressions_delivered"),
+                ),
+                default=models.Value(0.0),
+                output_field=FloatField(),
+            ),
+            live=models.Case(
+                models.When(impressions_delivered__gt=0, then=models.Value("Yes")),
+                default=models.Value("No"),
+                output_field=CharField(),
+            ),
+            revenue=models.Case(
+                models.When(
+                    ~models.Q(impressions_delivered=0) & ~models.Q(net_ecpm=0),
+                    then=models.F("impressions_delivered") * models.F("net_ecpm"),
+                ),
+                output_field=FloatField(),
+            ),
+        )
+        return annotated
+
+
 class CampaignSummary(models.Model):
     """Model representing a summary of campaign metrics including data from Boostr and BigQuery
 
+    The summaries are stored in the campaign_summary table, a materialized copy of campaign_summary_view that
+    is kept up to date with refresh() whenever the deals, campaigns, flights or delivered flights it
+    aggregates change.
+
     deal_id : IntegerField
         Boostr deal ID
     advertiser : CharField
@@ -537,7 +655,12 @@ class CampaignSummary(models.Model):
     clicks_delivered: IntegerField = models.IntegerField()
     impressions_delivered: IntegerField = models.IntegerField()
 
-    @property
+    objects = CampaignSummaryQuerySet.as_manager()
+
+    # The derived metrics are cached properties rather than properties, so that the values annotated by
+    # CampaignSummaryQuerySet.with_metrics take their place
+
+    @cached_property
     def net_ecpm(self):
         """Calculate and return the net eCPM."""
         if self.impressions_sold and self.impressions_sold > 0:
@@ -545,7 +668,7 @@ class CampaignSummary(models.Model):
             return round(net_epcm_value, 2)
         return None
 
-    @property
+    @cached_property
     def ctr(self):
         """Click-through rate = clicks_delivered / impressions_delivered"""
         if self.clicks_delivered and self.impressions_delivered > 0:
@@ -553,32 +676,68 @@ class CampaignSummary(models.Model):
             return round(ctr_value, 2)
         return None
 
-    @property
+    @cached_property
     def impressions_remaining(self):
         """Impressions_remaining = impressions_sold - impressions_delivered"""
         if self.impressions_sold > 0:
             return self.impressions_sold - self.impressions_delivered
         return 0
 
-    @property
+    @cached_property
     def live(self):
         """Whether the campaign is active"""
         if self.impressions_delivered and self.impressions_delivered > 0:
             return "Yes"
         return "No"
 
-    @property
+    @cached_property
     def revenue(self):
         """Calculate revenue based on impressions delivered and net eCPM."""
         if self.impressions_delivered and self.net_ecpm:
             return self.impressions_delivered * self.net_ecpm
         return None
 
+    @classmethod
+    def refresh(cls, deal_ids: Iterable[int]) -> None:
+        """Recompute the stored summaries of the given BoostrDeal ids from campaign_summary_view
+
+        Summaries are upserted and only the ones the view no longer has are deleted, so refreshes of the
+        same deal running at the same time (e.g. a BigQuery sync and an admin save) don't both insert it.
+        """
+        deal_ids = list(set(deal_ids))
+        if not deal_ids:
+            return
+        columns = ", ".join(CAMPAIGN_SUMMARY_COLUMNS)
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in CAMPAIGN_SUMMARY_COLUMNS
+            if column != "deal_id"
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Only our own table and column names are interpolated into the SQL
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} ({columns})
+                SELECT {columns} FROM campaign_summary_view WHERE deal_id = ANY(%s)
+                ON CONFLICT (deal_id) DO UPDATE SET {updates}
+                """,  # nosec B608
+                [deal_ids],
+            )
+            cursor.execute(
+                f"""
+                DELETE FROM {cls._meta.db_table} AS summary
+                WHERE summary.deal_id = ANY(%s) AND NOT EXISTS (
+                    SELECT 1 FROM campaign_summary_view WHERE campaign_summary_view.deal_id = summary.deal_id
+                )
+                """,  # nosec B608
+                [deal_ids],
+            )
+
     class Meta:
         """Metadata for the CampaignSummary model."""
 
         managed = False
-        db_table = "campaign_summary_view"
+        db_table = "campaign_summary"
         verbose_name = "Campaign"
         verbose_name_plural = "Campaign Summaries"
 
@@ -635,12 +794,93 @@ class DeliveredFlight(models.Model):
                 name="unique_delivered_flight",
             ),
         ]
+        indexes = [
+            # Lets a flight's totals be summed from the index alone, e.g. when rebuilding its rollup
+            models.Index(
+                fields=["flight_id"],
+                include=[
+                    "submission_date",
+                    "clicks_delivered",
+                    "impressions_delivered",
+                ],
+                name="deliveredflight_flight_idx",
+            ),
+        ]
 
     def __str__(self):
         """Return the string representation for flight ids and associated number of clicks and impressions"""
         return f"{self.flight_id} : {self.clicks_delivered} clicks and {self.impressions_delivered} impressions"
 
 
+class DeliveredFlightRollup(models.Model):
+    """Lifetime delivery totals of a flight, summed over all of its DeliveredFlight rows
+
+    BQSyncer keeps the rollups up to date by applying the change in each DeliveredFlight it upserts, and
+    other changes to DeliveredFlights rebuild the rollup of their flight from scratch.
+
+    Attributes
+    ----------
+    flight_id : IntegerField
+        Kevel flight ID
+    clicks_delivered : BigIntegerField
+        The number of clicks delivered over the life of the flight
+    impressions_delivered : BigIntegerField
+        The number of impressions delivered over the life of the flight
+    first_seen : DateField
+        The earliest submission_date of the flight's DeliveredFlights
+    last_seen : DateField
+        The latest submission_date of the flight's DeliveredFlights
+
+    Methods
+    -------
+    rebuild(cls, flight_ids)
+        Recompute the rollups of the given flights from their DeliveredFlights
+    __str__(self)
+        Return the string representation for a Delivered Flight rollup
+
+    """
+
+    flight_id: IntegerField = models.IntegerField(unique=True)
+    clicks_delivered: BigIntegerField = models.BigIntegerField(default=0)
+    impressions_delivered: BigIntegerField = models.BigIntegerField(default=0)
+    first_seen: DateField = models.DateField()
+    last_seen: DateField = models.DateField()
+
+    @classmethod
+    def rebuild(cls, flight_ids: Iterable[int] | None = None) -> None:
+        """Recompute the rollups of the given flight ids from their DeliveredFlights, or of every flight if None"""
+        if flight_ids is not None:
+            flight_ids = list(set(flight_ids))
+            if not flight_ids:
+                return
+        where = "" if flight_ids is None else "WHERE flight_id = ANY(%s)"
+        params = [] if flight_ids is None else [flight_ids]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Only our own table names and a fixed WHERE clause are interpolated into the SQL
+            delete_sql = f"DELETE FROM {cls._meta.db_table} {where}"  # nosec B608
+            cursor.execute(delete_sql, params)
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table}
+                    (flight_id, clicks_delivered, impressions_delivered, first_seen, last_seen)
+                SELECT
+                    flight_id,
+                    SUM(clicks_delivered),
+                    SUM(impressions_delivered),
+                    MIN(submission_date),
+                    MAX(submission_date)
+                FROM {DeliveredFlight._meta.db_table}
+                {where}
+                GROUP BY flight_id
+                """,  # nosec B608
+                params,
+            )
+
+    def __str__(self):
+        """Return the string representation for a flight's lifetime clicks and impressions"""
+        return f"{self.flight_id} : {self.clicks_delivered} clicks and {self.impressions_delivered} impressions"
+
+
 class Flight(models.Model):
     """Model representing a Flight associated with a Campaign."""
 
@@ -658,3 +898,55 @@ class Flight(models.Model):
 
         verbose_name = "Flight"
         verbose_name_plural = "Flights"
+        indexes = [
+            # Delivered flights and their rollups are joined to flights by their Kevel flight id
+            models.Index(fields=["kevel_flight_id"], name="flight_kevel_flight_id_idx"),
+        ]
+
+
+class DataGeneration(models.Model):
+    """Single row counter that is bumped whenever the dashboard's data changes, so the API can answer
+    conditional GETs without querying the data itself
+
+    Attributes
+    ----------
+    generation : BigIntegerField
+        Number of changes made to the data so far
+    updated_on : DateTimeField
+        When the data last changed
+    """
+
+    ROW_ID = 1
+
+    generation: BigIntegerField = models.BigIntegerField(default=0)
+    updated_on: DateTimeField = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def current(cls) -> "DataGeneration":
+        """Return the current data generation, creating the counter if it doesn't exist yet"""
+        data_generation: DataGeneration
+        data_generation, _ = cls.objects.get_or_create(pk=cls.ROW_ID)
+        return data_generation
+
+    @classmethod
+    def for_request(cls, request) -> "DataGeneration":
+        """Return the current data generation, read once per request and reused for the rest of it"""
+        data_generation: DataGeneration | None = getattr(
+            request, "_data_generation", None
+        )
+        if data_generation is None:
+            data_generation = request._data_generation = cls.current()
+        return data_generation
+
+    @classmethod
+    def bump(cls) -> None:
+        """Record that the data changed"""
+        updated = cls.objects.filter(pk=cls.ROW_ID).update(
+            generation=models.F("generation") + 1, updated_on=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(pk=cls.ROW_ID, defaults={"generation": 1})
+
+    def __str__(self):
+        """Return the string representation for the data generation"""
+        return f"Generation {self.generation} ({self.updated_on})"
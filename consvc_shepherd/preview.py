@@ -2,14 +2,27 @@
 
 import json
 import logging
+import threading
+import time
 import traceback
 import uuid
-from dataclasses import dataclass
-from typing import TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypedDict
 from urllib.parse import SplitResult, quote, urlunsplit
 
 import requests
+from django.conf import settings
+from django.core.cache import cache
 from django.views.generic import TemplateView
+from requests.adapters import HTTPAdapter
+
+from consvc_shepherd.utils import ShepherdMetrics
+
+logger = logging.getLogger("shepherd")
+metrics: ShepherdMetrics = ShepherdMetrics("shepherd")
+
+PREVIEW_CACHE_KEY_PREFIX = "preview"
 
 # Localized strings from https://hg.mozilla.org/l10n-central/
 #
@@ -57,6 +70,21 @@ LOCALIZATIONS = {
 DIRECT_SOLD_TILE_AD_TYPES = [3120]
 SPOC_AD_TYPES = [2401, 3617]
 
+# Per-request timeouts in seconds for each MARS call
+AMP_TILES_TIMEOUT = 30
+SPOCS_TIMEOUT = 30
+UNIFIED_TIMEOUT = 30
+
+# Keep-alive connections kept per MARS host, and threads shared by concurrent MARS calls
+MARS_POOL_SIZE = 10
+MARS_FETCH_WORKERS = 10
+
+# Cells of the preview grid fetched at once. Each cell makes up to two MARS calls on the
+# shared pool above, so this keeps a full grid's calls within MARS_FETCH_WORKERS.
+GRID_MAX_CONCURRENCY = 5
+# Seconds a grid cell may take before it's reported as timed out
+GRID_CELL_TIMEOUT = 15
+
 
 class Region(TypedDict):
     """Represents a supported country or region within a country
@@ -130,6 +158,18 @@ class Ads:
     spocs: list[Spoc]
     rectangles: list[Rectangle]
     is_mobile: bool
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class GridCell:
+    """The ads loaded for one country and form factor in the preview grid"""
+
+    country: Region
+    form_factor: FormFactor
+    ads: Ads | None
+    error: str | None
+    latency_ms: int
 
 
 # Ad environments. Note that these differ from MARS or Shepherd environments.
@@ -246,9 +286,31 @@ def load_regions() -> dict[str, list[Region]]:
 
 REGIONS = load_regions()
 
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_executor = ThreadPoolExecutor(
+    max_workers=MARS_FETCH_WORKERS, thread_name_prefix="mars-preview"
+)
+
+
+def get_session(mars_url: str) -> requests.Session:
+    """Return the pooled keep-alive session shared by requests to a MARS host"""
+    with _sessions_lock:
+        if (session := _sessions.get(mars_url)) is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MARS_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[mars_url] = session
+        return session
+
 
 def get_spocs_and_direct_sold_tiles(
-    env: Environment, country: str, region: str, is_mobile: bool
+    env: Environment,
+    country: str,
+    region: str,
+    is_mobile: bool,
+    timeout: float = SPOCS_TIMEOUT,
 ) -> tuple[list[Tile], list[Spoc]]:
     """Load SPOCs and direct sold tiles from MARS for given country and region"""
     # Generate a unique pocket ID per request to avoid frequency capping
@@ -278,7 +340,9 @@ def get_spocs_and_direct_sold_tiles(
         ],
     }
 
-    r = requests.post(f"{env.mars_url}/spocs", json=body, timeout=30)
+    r = get_session(env.mars_url).post(
+        f"{env.mars_url}/spocs", json=body, timeout=timeout
+    )
     json = r.json()
 
     tiles = [
@@ -308,7 +372,11 @@ def get_spocs_and_direct_sold_tiles(
 
 
 def get_amp_tiles(
-    env: Environment, country: str, region: str, user_agent: str
+    env: Environment,
+    country: str,
+    region: str,
+    user_agent: str,
+    timeout: float = AMP_TILES_TIMEOUT,
 ) -> list[Tile]:
     """Load Sponsored Tiles from MARS for given country and region"""
     params = {
@@ -320,8 +388,11 @@ def get_amp_tiles(
         "User-Agent": user_agent,
     }
 
-    r = requests.get(
-        f"{env.mars_url}/v1/tiles", params=params, headers=headers, timeout=30
+    r = get_session(env.mars_url).get(
+        f"{env.mars_url}/v1/tiles",
+        params=params,
+        headers=headers,
+        timeout=timeout,
     )
 
     if r.status_code == 204:
@@ -338,7 +409,12 @@ def get_amp_tiles(
     ]
 
 
-def get_unified(env: Environment, country: str, is_mobile: bool = False) -> Ads:
+def get_unified(
+    env: Environment,
+    country: str,
+    is_mobile: bool = False,
+    timeout: float = UNIFIED_TIMEOUT,
+) -> Ads:
     """Load Ads from MARS unified api"""
     context_id = uuid.uuid4()
 
@@ -362,7 +438,9 @@ def get_unified(env: Environment, country: str, is_mobile: bool = False) -> Ads:
         ],
     }
 
-    r = requests.post(f"{env.mars_url}/v1/ads", json=body, timeout=30)
+    r = get_session(env.mars_url).post(
+        f"{env.mars_url}/v1/ads", json=body, timeout=timeout
+    )
     r_json = r.json()
 
     tiles_responses = (
@@ -410,24 +488,193 @@ def get_unified(env: Environment, country: str, is_mobile: bool = False) -> Ads:
     )
 
 
+def describe_error(e: Exception) -> str:
+    """Describe a failed MARS request, naming errors such as timeouts that have no message"""
+    return str(e) or type(e).__name__
+
+
+def cached_mars_call(
+    name: str,
+    key: tuple[str, ...],
+    fetch: Callable[..., Any],
+    *args: Any,
+    use_cache: bool = True,
+) -> Any:
+    """Return the cached ads for a MARS call, making the call to fill the cache on a miss
+
+    With use_cache=False the cached ads are ignored, but the fresh ones still replace them.
+    """
+    cache_key = ".".join((PREVIEW_CACHE_KEY_PREFIX, name, *key))
+    if use_cache and settings.PREVIEW_CACHE_TIMEOUT:
+        ads = cache.get(cache_key)
+        if ads is not None:
+            metrics.incr(f"preview.{name}.cache.hit")
+            return ads
+        metrics.incr(f"preview.{name}.cache.miss")
+
+    start = time.monotonic()
+    ads = fetch(*args)
+    metrics.histogram(
+        f"preview.{name}.mars.latency", round((time.monotonic() - start) * 1000)
+    )
+    if settings.PREVIEW_CACHE_TIMEOUT:
+        cache.set(cache_key, ads, settings.PREVIEW_CACHE_TIMEOUT)
+    return ads
+
+
 def get_ads(
-    env: Environment, country: str, region: str, form_factor: FormFactor
+    env: Environment,
+    country: str,
+    region: str,
+    form_factor: FormFactor,
+    timeout: float | None = None,
+    use_cache: bool = True,
 ) -> Ads:
-    """Based on Environment, either load spocs & tiles individually or from a single request"""
+    """Based on Environment, either load spocs & tiles individually or from a single request
+
+    The individual requests are made concurrently. If one of them fails, the ads from the
+    other are still returned, with the failure recorded in Ads.errors. With a timeout, any
+    request still running after that many seconds counts as failed, and the requests are sent
+    with that timeout too, so ones given up on don't hold _executor's workers much longer.
+    Responses are cached by environment, country, region and form factor for
+    PREVIEW_CACHE_TIMEOUT seconds, unless use_cache is False.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def remaining() -> float | None:
+        return None if deadline is None else max(0, deadline - time.monotonic())
+
+    def fetch_args(*args: Any, default_timeout: float) -> tuple[Any, ...]:
+        return args if timeout is None else (*args, min(timeout, default_timeout))
+
+    key = (env.code, country, region, form_factor.code)
+
     if env.code.startswith("unified_"):
-        return get_unified(env, country, form_factor.is_mobile)
+        unified_args = fetch_args(
+            get_unified,
+            env,
+            country,
+            form_factor.is_mobile,
+            default_timeout=UNIFIED_TIMEOUT,
+        )
+        ads: Ads
+        if timeout is None:
+            ads = cached_mars_call("unified", key, *unified_args, use_cache=use_cache)
+        else:
+            ads = _executor.submit(
+                cached_mars_call, "unified", key, *unified_args, use_cache=use_cache
+            ).result(timeout=remaining())
+        return ads
     else:
-        amp_tiles = get_amp_tiles(env, country, region, form_factor.user_agent)
-        spocs_and_direct_sold_tiles = get_spocs_and_direct_sold_tiles(
-            env, country, region, form_factor.is_mobile
+        amp_tiles_future = _executor.submit(
+            cached_mars_call,
+            "amp_tiles",
+            key,
+            *fetch_args(
+                get_amp_tiles,
+                env,
+                country,
+                region,
+                form_factor.user_agent,
+                default_timeout=AMP_TILES_TIMEOUT,
+            ),
+            use_cache=use_cache,
+        )
+        spocs_future = _executor.submit(
+            cached_mars_call,
+            "spocs",
+            key,
+            *fetch_args(
+                get_spocs_and_direct_sold_tiles,
+                env,
+                country,
+                region,
+                form_factor.is_mobile,
+                default_timeout=SPOCS_TIMEOUT,
+            ),
+            use_cache=use_cache,
         )
 
+        errors = []
+        amp_tiles: list[Tile] = []
+        direct_sold_tiles: list[Tile] = []
+        spocs: list[Spoc] = []
+        try:
+            amp_tiles = amp_tiles_future.result(timeout=remaining())
+        except Exception as e:
+            logger.exception("Failed to load AMP tiles from MARS")
+            errors.append(f"AMP tiles: {describe_error(e)}")
+        try:
+            direct_sold_tiles, spocs = spocs_future.result(timeout=remaining())
+        except Exception as e:
+            logger.exception("Failed to load SPOCs and direct sold tiles from MARS")
+            errors.append(f"SPOCs and direct sold tiles: {describe_error(e)}")
+
         return Ads(
-            tiles=amp_tiles + spocs_and_direct_sold_tiles[0],
-            spocs=spocs_and_direct_sold_tiles[1],
+            tiles=amp_tiles + direct_sold_tiles,
+            spocs=spocs,
             rectangles=[],  # Rectangles are only supported by Unified API
             is_mobile=form_factor.is_mobile,
+            errors=errors,
+        )
+
+
+def get_grid_cell(
+    env: Environment,
+    country: Region,
+    form_factor: FormFactor,
+    timeout: float,
+    use_cache: bool = True,
+) -> GridCell:
+    """Load the ads for one cell of the preview grid, timing how long that took"""
+    start = time.monotonic()
+    ads, error = None, None
+    try:
+        # Cells target whole countries, so no region is sent
+        ads = get_ads(
+            env,
+            country["code"],
+            "",
+            form_factor,
+            timeout=timeout,
+            use_cache=use_cache,
         )
+    except Exception as e:
+        logger.exception("Failed to load preview grid cell from MARS")
+        error = describe_error(e)
+    return GridCell(
+        country=country,
+        form_factor=form_factor,
+        ads=ads,
+        error=error,
+        latency_ms=round((time.monotonic() - start) * 1000),
+    )
+
+
+def get_grid(
+    env: Environment,
+    countries: list[Region],
+    form_factors: list[FormFactor],
+    max_concurrency: int = GRID_MAX_CONCURRENCY,
+    cell_timeout: float = GRID_CELL_TIMEOUT,
+    use_cache: bool = True,
+) -> list[list[GridCell]]:
+    """Load ads for every country and form factor, returning a row of cells per country"""
+    if not countries or not form_factors:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="mars-preview-grid"
+    ) as executor:
+        rows = [
+            [
+                executor.submit(
+                    get_grid_cell, env, country, form_factor, cell_timeout, use_cache
+                )
+                for form_factor in form_factors
+            ]
+            for country in countries
+        ]
+        return [[future.result() for future in row] for row in rows]
 
 
 def localized_sponsor(
@@ -491,6 +738,7 @@ class PreviewView(TemplateView):
         country = request.GET.get("country", "US")
         region = request.GET.get("region", "CA")
         form_factor_code = request.GET.get("form_factor", FORM_FACTORS[0].code)
+        nocache = request.GET.get("nocache") == "1"
 
         env = find_env_by_code(env_code)
         form_factor = find_form_factor_by_code(form_factor_code)
@@ -498,8 +746,11 @@ class PreviewView(TemplateView):
         mobileMsg = " &#x1F4F1; " if form_factor.is_mobile else ""
         debugMsg = f"{mobileMsg}country: {country}, region: {region}<br>env: {env}<br>{form_factor}"
         try:
-            ads = get_ads(env, country, region, form_factor)
-            debugMsg += "<br>&#x2705;ok"
+            ads = get_ads(env, country, region, form_factor, use_cache=not nocache)
+            if ads.errors:
+                debugMsg += "".join(f"<br>&#x1F480; {error}" for error in ads.errors)
+            else:
+                debugMsg += "<br>&#x2705;ok"
         except Exception as e:
             ads = {}
             debugMsg += f"<br>&#x1F480;&#x1F480;&#x1F480; <br> {e}, <br> {traceback.format_exc()}"
@@ -514,7 +765,55 @@ class PreviewView(TemplateView):
             "form_factors": FORM_FACTORS,
             "form_factor": form_factor_code,
             "ads": ads,
+            "nocache": nocache,
             "debugMsg": debugMsg,
         }
 
         return self.render_to_response(context)
+
+
+class PreviewGridView(TemplateView):
+    """View class for /preview/grid, comparing ads across countries and form factors"""
+
+    template_name = "preview_grid.html"
+
+    def get(self, request, *args, **kwargs):
+        """Render a grid of ad previews"""
+        env_code = request.GET.get("env", "production")
+        country_codes = request.GET.getlist("country")
+        form_factor_codes = request.GET.getlist("form_factor")
+        nocache = request.GET.get("nocache") == "1"
+
+        env = find_env_by_code(env_code)
+        # COUNTRIES lists some countries twice, so select by unique code. Until a country is selected only the
+        # form is rendered, since a grid of every country would make a MARS request per country and form factor
+        countries = list(
+            {
+                country["code"]: country
+                for country in COUNTRIES
+                if country["code"] in country_codes
+            }.values()
+        )
+        form_factors = [
+            form_factor
+            for form_factor in FORM_FACTORS
+            if not form_factor_codes or form_factor.code in form_factor_codes
+        ]
+
+        start = time.monotonic()
+        grid = get_grid(env, countries, form_factors, use_cache=not nocache)
+
+        context = {
+            "environments": ENVIRONMENTS,
+            "countries": list({c["code"]: c for c in COUNTRIES}.values()),
+            "form_factors": FORM_FACTORS,
+            "environment": env_code,
+            "selected_countries": [country["code"] for country in countries],
+            "selected_form_factors": [ff.code for ff in form_factors],
+            "grid_form_factors": form_factors,
+            "grid": grid,
+            "nocache": nocache,
+            "latency_ms": round((time.monotonic() - start) * 1000),
+        }
+
+        return self.render_to_response(context)
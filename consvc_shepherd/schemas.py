@@ -0,0 +1,76 @@
+"""Registry of the JSON schemas that published snapshots and allocations are validated against."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import best_match
+from jsonschema.protocols import Validator
+from jsonschema.validators import validator_for
+
+SCHEMA_DIR: Path = settings.BASE_DIR / "schema"
+SCHEMA_FILES: dict[str, str] = {
+    "adm_filter": "adm_filter.schema.json",
+    "allocation": "allocation.schema.json",
+}
+
+
+class SchemaRegistry:
+    """Load and compile each schema once per process, reloading it when its file's mtime changes.
+
+    Attributes
+    ----------
+    schema_dir : Path
+        Directory the schema files are in
+    schema_files : dict
+        Schema file names by the kind of document they validate
+    """
+
+    def __init__(self, schema_dir: Path, schema_files: dict[str, str]) -> None:
+        self.schema_dir = schema_dir
+        self.schema_files = schema_files
+        self._validators: dict[str, tuple[int, Validator]] = {}
+        self._lock = threading.Lock()
+
+    def get_validator(self, kind: str) -> Validator:
+        """Return the compiled validator for the given kind of document."""
+        if kind not in self.schema_files:
+            raise ValueError(f"Unknown schema kind: {kind}")
+        path = self.schema_dir / self.schema_files[kind]
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._validators.get(kind)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with self._lock:
+            with open(path, "r") as f:
+                schema = json.load(f)
+            validator_class = validator_for(schema, default=Draft202012Validator)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+            self._validators[kind] = (mtime, validator)
+        return validator
+
+    def validate(self, kind: str, doc: Any) -> None:
+        """Validate a document against the schema for its kind.
+
+        Raises
+        ------
+        jsonschema.exceptions.ValidationError
+            The most relevant validation error, like jsonschema.validate raises.
+        """
+        error = best_match(self.get_validator(kind).iter_errors(doc))
+        if error is not None:
+            raise error
+
+
+registry: SchemaRegistry = SchemaRegistry(SCHEMA_DIR, SCHEMA_FILES)
+
+
+def validate(kind: str, doc: Any) -> None:
+    """Validate a document against the schema for its kind with the process wide registry."""
+    registry.validate(kind, doc)
@@ -30,6 +30,9 @@ DEV_USER_EMAIL = "dev@example.com"
 OPENIDC_HEADER = env("OPENIDC_HEADER", default=None)
 OPENIDC_HEADER_PREFIX = env("OPENIDC_HEADER_PREFIX", default=None)
 IAP_AUDIENCE = env("IAP_AUDIENCE", default=None)
+# Seconds OpenIDCAuthMiddleware keeps a user in memory. A user's groups or permissions changed in
+# another web process, e.g. from that process' admin, only take effect here once this runs out.
+OPENIDC_USER_CACHE_TTL: int = env("OPENIDC_USER_CACHE_TTL", default=60, cast=int)
 ALLOWED_HOSTS: list[str] = ["*"]
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
@@ -140,6 +143,19 @@ DATABASES: dict[str, Any] = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES: dict[str, Any] = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://"),
+}
+# Seconds the lookup lists in consvc_shepherd/lookups.py are cached for. They're keyed on the DataGeneration,
+# so changes never serve stale lists; this only bounds how long lists of past generations take up the cache.
+LOOKUP_CACHE_TIMEOUT: int = env("LOOKUP_CACHE_TIMEOUT", default=300, cast=int)
+# Seconds the ads loaded from MARS for /preview are cached for, so refreshes don't spend Kevel impressions.
+# Set to 0 to always load fresh ads; ?nocache=1 does the same for a single page load.
+PREVIEW_CACHE_TIMEOUT: int = env("PREVIEW_CACHE_TIMEOUT", default=30, cast=int)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -174,6 +190,17 @@ STORAGES: dict[str, Any] = {
     },
 }
 
+# Backend that send_to_storage publishes adM filter and allocation settings with, see consvc_shepherd/storage.py.
+# consvc_shepherd.storage.FileSystemPublisher with a "location" option writes them to a local directory instead.
+SNAPSHOT_PUBLISHER: dict[str, Any] = {
+    "BACKEND": env(
+        "SNAPSHOT_PUBLISHER_BACKEND", default="consvc_shepherd.storage.GCSPublisher"
+    ),
+    "OPTIONS": {
+        "compress": env("SNAPSHOT_PUBLISHER_GZIP", default=True, cast=bool),
+    },
+}
+
 GS_BUCKET_FILE_NAME = env("GS_BUCKET_FILE_NAME", default="settings_from_shepherd")
 ALLOCATION_FILE_NAME: str = env("ALLOCATION_FILE_NAME", default="allocation_file")
 CUSTOM_LOCAL_LOGGER_ENABLED: bool = env("CUSTOM_LOCAL_LOGGER_ENABLED", default=False)
@@ -0,0 +1,157 @@
+"""Signal handlers for consvc_shepherd models."""
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from consvc_shepherd.models import (
+    Advertiser,
+    BoostrDeal,
+    BoostrDealProduct,
+    BoostrProduct,
+    BoostrSyncStatus,
+    BQSyncStatus,
+    Campaign,
+    CampaignSummary,
+    DataGeneration,
+    DeliveredFlight,
+    DeliveredFlightRollup,
+    Flight,
+)
+
+_bulk_write = threading.local()
+
+
+@contextmanager
+def bulk_write():
+    """Skip the receivers below that refresh CampaignSummaries, rebuild DeliveredFlightRollups and bump the
+    DataGeneration for every saved or deleted row. Like after bulk_create and bulk_update, whoever makes the
+    writes refreshes and bumps once they're done.
+    """
+    depth = getattr(_bulk_write, "depth", 0)
+    _bulk_write.depth = depth + 1
+    try:
+        yield
+    finally:
+        _bulk_write.depth = depth
+
+
+def in_bulk_write() -> bool:
+    """Return whether this thread's writes are inside bulk_write()"""
+    return getattr(_bulk_write, "depth", 0) > 0
+
+
+@receiver(post_save, sender=BoostrDeal)
+def refresh_deal_summary(sender, instance: BoostrDeal, **kwargs):
+    """Refresh the CampaignSummary of a deal that was saved."""
+    if in_bulk_write():
+        return
+    CampaignSummary.refresh([instance.pk])
+
+
+# The field each model is moved between parents with, e.g. a campaign between deals
+PARENT_ID_FIELDS = {
+    Campaign: "deal_id",
+    Flight: "campaign_id",
+    DeliveredFlight: "flight_id",
+}
+
+
+@receiver(pre_save, sender=Campaign)
+@receiver(pre_save, sender=Flight)
+@receiver(pre_save, sender=DeliveredFlight)
+def remember_previous_parent(sender, instance, **kwargs):
+    """Remember the parent an existing campaign, flight or delivered flight had before it's saved, so the
+    post_save receivers below also refresh the parent it's moved away from.
+    """
+    if in_bulk_write():
+        return
+    field = PARENT_ID_FIELDS[sender]
+    instance._previous_parent_id = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+def parent_ids(instance) -> set[int]:
+    """Return the parent ids of a saved or deleted instance, before and after the save"""
+    ids = {
+        getattr(instance, PARENT_ID_FIELDS[type(instance)]),
+        getattr(instance, "_previous_parent_id", None),
+    }
+    return {parent_id for parent_id in ids if parent_id is not None}
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+def refresh_campaign_summary(sender, instance: Campaign, **kwargs):
+    """Refresh the CampaignSummaries of the deals a saved or deleted campaign belongs and belonged to."""
+    if in_bulk_write():
+        return
+    CampaignSummary.refresh(parent_ids(instance))
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def refresh_flight_summary(sender, instance: Flight, **kwargs):
+    """Refresh the CampaignSummaries of the deals a saved or deleted flight's campaigns belong to, the one
+    it's in and the one it was moved from.
+    """
+    if in_bulk_write():
+        return
+    campaign_ids = parent_ids(instance)
+    if not campaign_ids:
+        return
+    CampaignSummary.refresh(
+        Campaign.objects.filter(pk__in=campaign_ids).values_list("deal_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=DeliveredFlight)
+@receiver(post_delete, sender=DeliveredFlight)
+def rebuild_delivered_flight_rollup(sender, instance: DeliveredFlight, **kwargs):
+    """Rebuild the DeliveredFlightRollups of a saved or deleted DeliveredFlight's flights, and then refresh
+    the CampaignSummaries of the deals those flights belong to.
+
+    BQSyncer writes DeliveredFlights in bulk, which doesn't send signals, and updates the rollups and
+    summaries itself.
+    """
+    if in_bulk_write():
+        return
+    flight_ids = parent_ids(instance)
+    DeliveredFlightRollup.rebuild(flight_ids)
+    CampaignSummary.refresh(
+        Flight.objects.filter(kevel_flight_id__in=flight_ids, campaign__isnull=False)
+        .values_list("campaign__deal_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(post_save, sender=Advertiser)
+@receiver(post_save, sender=BoostrDealProduct)
+@receiver(post_save, sender=BoostrSyncStatus)
+@receiver(post_save, sender=BQSyncStatus)
+@receiver(post_save, sender=BoostrProduct)
+@receiver(post_delete, sender=BoostrProduct)
+@receiver(post_save, sender=BoostrDeal)
+@receiver(post_delete, sender=BoostrDeal)
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+@receiver(post_save, sender=DeliveredFlight)
+@receiver(post_delete, sender=DeliveredFlight)
+def bump_data_generation(sender, **kwargs):
+    """Bump the DataGeneration whenever the data behind the dashboard API changes.
+
+    The BigQuery and Boostr syncs write in bulk, which doesn't send signals or happens inside bulk_write(),
+    so that they don't bump once per row and queue up on the DataGeneration row's lock, but every run ends
+    by saving its sync status. BoostrDealProduct deletes aren't listened to, since a post_delete receiver would make
+    the Boostr sync's bulk delete fetch and signal every row; only the sync deletes them.
+    """
+    if in_bulk_write():
+        return
+    DataGeneration.bump()
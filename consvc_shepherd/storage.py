@@ -1,25 +1,121 @@
 """Module to save data to GCS storage."""
 
+import gzip
 import logging
+import shutil
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
 
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.utils import timezone
+from django.utils.module_loading import import_string
 
+from consvc_shepherd.utils import ShepherdMetrics
 
-def send_to_storage(content: str, file_name: str) -> None:
-    """Send adM filter and allocation settings to GCS bucket."""
-    if settings.DEBUG:
-        logging.info(f"Sending to storage, name:{file_name}, content: {content}")
-    else:
+metrics: ShepherdMetrics = ShepherdMetrics("shepherd")
+
+CONTENT_TYPE = "application/json"
+
+
+class Publisher(ABC):
+    """Base class for the backends that publish adM filter and allocation settings.
+
+    A setting is published by uploading it once under a timestamped name and then copying it to its
+    _latest.json name. Subclasses implement upload() and copy().
+
+    Attributes
+    ----------
+    compress : bool
+        Whether the content is published gzip compressed, with a gzip content-encoding
+    """
+
+    def __init__(self, compress: bool = True) -> None:
+        self.compress = compress
+
+    def publish(self, content: str, file_name: str) -> None:
+        """Publish the content as file_name's timestamped and latest files."""
         current_time_string: str = timezone.now().strftime("%Y%m%d%H%M%S")
         latest_file_name: str = f"{file_name}_latest.json"
         date_file_name: str = f"{file_name}_{current_time_string}.json"
 
-        date_file = default_storage.open(date_file_name, "w")
-        date_file.write(content)
-        date_file.close()
+        data = content.encode()
+        if self.compress:
+            data = gzip.compress(data)
+
+        start = time.perf_counter()
+        self.upload(date_file_name, data)
+        upload_end = time.perf_counter()
+        self.copy(date_file_name, latest_file_name)
+        copy_end = time.perf_counter()
+
+        metrics.histogram("storage.upload.latency", to_ms(upload_end - start))
+        metrics.histogram("storage.copy.latency", to_ms(copy_end - upload_end))
+
+    @abstractmethod
+    def upload(self, name: str, data: bytes) -> None:
+        """Upload the data under the given name."""
+
+    @abstractmethod
+    def copy(self, source_name: str, destination_name: str) -> None:
+        """Copy the already uploaded source to the destination name."""
+
+
+class GCSPublisher(Publisher):
+    """Publish to the GCS bucket of the default storage, copying to _latest.json on the server side."""
 
-        latest_file = default_storage.open(latest_file_name, "w")
-        latest_file.write(content)
-        latest_file.close()
+    def upload(self, name: str, data: bytes) -> None:
+        """Upload the data as a blob with a JSON content-type."""
+        blob = default_storage.bucket.blob(name)
+        if self.compress:
+            blob.content_encoding = "gzip"
+        blob.upload_from_string(data, content_type=CONTENT_TYPE)
+
+    def copy(self, source_name: str, destination_name: str) -> None:
+        """Copy the blob within the bucket, keeping its content-type and content-encoding."""
+        bucket = default_storage.bucket
+        bucket.copy_blob(bucket.blob(source_name), bucket, destination_name)
+
+
+class FileSystemPublisher(Publisher):
+    """Publish to a local directory, as a stand-in for GCS in development and tests.
+
+    Attributes
+    ----------
+    location : Path
+        The directory the files are written to
+    """
+
+    def __init__(self, location: str, compress: bool = True) -> None:
+        super().__init__(compress=compress)
+        self.location = Path(location)
+
+    def upload(self, name: str, data: bytes) -> None:
+        """Write the data to a file in the location."""
+        self.location.mkdir(parents=True, exist_ok=True)
+        (self.location / name).write_bytes(data)
+
+    def copy(self, source_name: str, destination_name: str) -> None:
+        """Copy the file within the location."""
+        shutil.copyfile(self.location / source_name, self.location / destination_name)
+
+
+def get_publisher() -> Publisher:
+    """Return the publisher configured by the SNAPSHOT_PUBLISHER setting."""
+    backend = import_string(settings.SNAPSHOT_PUBLISHER["BACKEND"])
+    publisher: Publisher = backend(**settings.SNAPSHOT_PUBLISHER.get("OPTIONS", {}))
+    return publisher
+
+
+def to_ms(seconds: float) -> int:
+    """Convert a duration in seconds to whole milliseconds."""
+    return int(seconds * 1000)
+
+
+def send_to_storage(content: str, file_name: str) -> None:
+    """Send adM filter and allocation settings to GCS bucket."""
+    if settings.DEBUG:
+        logging.info(f"Sending to storage, name:{file_name}, content: {content}")
+    else:
+        get_publisher().publish(content, file_name)
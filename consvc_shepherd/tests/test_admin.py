@@ -1,6 +1,9 @@
 """Admin test module for consvc_shepherd."""
 
 import json
+import os
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 from typing import Any
 
@@ -8,7 +11,9 @@ import mock
 import pytz
 from dateutil.relativedelta import relativedelta
 from django.contrib.admin.sites import AdminSite
+from django.db import connection
 from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from jsonschema import validate
@@ -37,6 +42,21 @@ from consvc_shepherd.tests.factories import AdminUserFactory, UserFactory
 from contile.models import Advertiser, AdvertiserUrl
 
 
+def use_file_system_publisher(test_case: TestCase) -> str:
+    """Publish settings to a temporary directory for the rest of the test, and return the directory."""
+    publish_dir = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, publish_dir)
+    publisher_settings = override_settings(
+        SNAPSHOT_PUBLISHER={
+            "BACKEND": "consvc_shepherd.storage.FileSystemPublisher",
+            "OPTIONS": {"location": publish_dir},
+        }
+    )
+    publisher_settings.enable()
+    test_case.addCleanup(publisher_settings.disable)
+    return publish_dir
+
+
 class SettingsSnapshotAdminTest(TestCase):
     """Test class for SettingsSnapshot."""
 
@@ -62,11 +82,7 @@ class SettingsSnapshotAdminTest(TestCase):
             matching=True,
         )
         self.partner = Partner.objects.get(name="Partner1")
-        mock_storage_open = mock.patch(
-            "django.core.files.storage.default_storage." "open"
-        )
-        self.mock_storage_open = mock_storage_open.start()
-        self.addCleanup(self.mock_storage_open.stop)
+        self.publish_dir = use_file_system_publisher(self)
 
     def test_get_read_only_fields_when_obj_exists(self) -> None:
         """Test that expected read only fields are returned when object created."""
@@ -273,11 +289,7 @@ class AllocationSettingsSnapshotAdminTest(TestCase):
             allocation_position=position2_alloc, partner=moz_partner, percentage=15
         )
 
-        mock_storage_open = mock.patch(
-            "django.core.files.storage.default_storage." "open"
-        )
-        self.mock_storage_open = mock_storage_open.start()
-        self.addCleanup(self.mock_storage_open.stop)
+        self.publish_dir = use_file_system_publisher(self)
 
     def test_save_model_generates_json(self) -> None:
         """Test that snapshot value matches expected json object."""
@@ -332,7 +344,7 @@ class AllocationSettingsSnapshotAdminTest(TestCase):
         )
         request = mock.Mock()
         publish_allocation(None, request, AllocationSettingsSnapshot.objects.all())
-        self.mock_storage_open.assert_called()
+        self.assertEqual(len(os.listdir(self.publish_dir)), 2)
 
     def test_insufficient_positions_results_in_no_publish(self) -> None:
         """Test that publish action with insufficient allocation
@@ -347,7 +359,7 @@ class AllocationSettingsSnapshotAdminTest(TestCase):
         )
         request = mock.Mock()
         publish_allocation(None, request, AllocationSettingsSnapshot.objects.all())
-        self.mock_storage_open.assert_not_called()
+        self.assertEqual(os.listdir(self.publish_dir), [])
 
     @override_settings(STATSD_ENABLED=True)
     def test_publish_allocation_metrics(self) -> None:
@@ -503,6 +515,35 @@ class CampaignAdminTests(TestCase):
         self.assertContains(response, "AdOps Person 1")
         self.assertNotContains(response, "AdOps Person 2")
 
+    def test_changelist_query_count(self):
+        """Test that the changelist shows each campaign's flight without a query per campaign."""
+        url = reverse("admin:consvc_shepherd_campaign_changelist")
+        headers = {"settings.OPENIDC_HEADER": "dev@example.com"}
+        # Warm up first, so neither measured page load includes logging in a new user
+        self.client.get(url, **headers)
+        with CaptureQueriesContext(connection) as two_campaigns:
+            response = self.client.get(url, **headers)
+        self.assertContains(response, "1001")
+        self.assertContains(response, "1002")
+        two_campaigns_queries = len(two_campaigns)
+
+        for i in range(10):
+            campaign = Campaign.objects.create(
+                deal=self.deal2,
+                ad_ops_person=f"AdOps Person {i + 3}",
+                net_spend=100,
+                impressions_sold=100,
+                start_date="2023-01-01",
+                end_date="2023-01-05",
+            )
+            Flight.objects.create(campaign=campaign, kevel_flight_id=2000 + i)
+        # The new campaigns bumped the DataGeneration, so refill the lookup lists behind the filters
+        self.client.get(url, **headers)
+
+        with self.assertNumQueries(two_campaigns_queries):
+            response = self.client.get(url, **headers)
+        self.assertContains(response, "2009")
+
 
 @override_settings(DEBUG=True)
 class DeliveredFlightAdminTests(TestCase):
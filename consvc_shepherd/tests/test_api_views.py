@@ -1,6 +1,11 @@
 """Unit tests for the Campaign, Product, and Deal view sets in the consvc_shepherd API."""
 
+import json
+from unittest import mock
+
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -8,6 +13,7 @@ from rest_framework.test import APITestCase
 from consvc_shepherd.api.serializers import (
     BoostrDealSerializer,
     BoostrProductSerializer,
+    CampaignImportSerializer,
     CampaignSerializer,
     CampaignSummarySerializer,
 )
@@ -42,6 +48,27 @@ class ProductViewSetTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_conditional_get(self):
+        """Test products are answered with a 304 until the data generation changes."""
+        response = self.client.get(reverse("products-list"))
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("products-list"), HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(
+            any("consvc_shepherd_boostrproduct" in q["sql"] for q in queries)
+        )
+
+        self.product1.full_name = "Renamed Product1"
+        self.product1.save()
+        response = self.client.get(reverse("products-list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
 
 @override_settings(DEBUG=True)
 class BoostrDealViewSetTests(APITestCase):
@@ -149,6 +176,37 @@ class CampaignViewSetTests(APITestCase):
         serializer = CampaignSerializer(campaigns, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
+        self.assertEqual(
+            [campaign["kevel_flight_id"] for campaign in response.data], [123, 456]
+        )
+
+    def test_list_campaigns_query_count(self):
+        """Test that listing campaigns takes the same number of queries regardless of how many there are."""
+        # The first request also creates the dev user
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as two_campaigns:
+            self.client.get(self.url)
+
+        for i in range(10):
+            campaign = Campaign.objects.create(
+                impressions_sold=1,
+                net_spend=100,
+                deal=self.deal2,
+                start_date="2023-02-01",
+                end_date="2023-02-03",
+                seller="Sarah",
+            )
+            Flight.objects.create(campaign=campaign, kevel_flight_id=1000 + i)
+            Flight.objects.create(campaign=campaign, kevel_flight_id=2000 + i)
+
+        with self.assertNumQueries(len(two_campaigns)):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 12)
+        # The most recent flight of each campaign is the one reported
+        self.assertEqual(
+            sorted(campaign["kevel_flight_id"] for campaign in response.data)[2:],
+            [2000 + i for i in range(10)],
+        )
 
     def test_create_validate_campaign_success(self):
         """Test successful creation of a campaign when net_spend matches the deal's amount."""
@@ -204,6 +262,7 @@ class CampaignViewSetTests(APITestCase):
         self.campaign1.refresh_from_db()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.campaign1.notes, "New campaign updated")
+        self.assertEqual(response.data["kevel_flight_id"], 789)
 
     def test_delete_campaign(self):
         """Test deleting an existing campaign via DELETE request."""
@@ -250,6 +309,375 @@ class CampaignViewSetTests(APITestCase):
         self.campaign1.refresh_from_db()
         self.assertEqual(self.campaign1.notes, "Updated campaign")
 
+    def split_data(self, count, kevel_flight_id=None):
+        """Return a split of campaign1 into count campaigns, the first of which is campaign1 itself."""
+        return {
+            "deal": self.deal1.id,
+            "campaigns": [
+                {
+                    **({"id": self.campaign1.id} if i == 0 else {}),
+                    "notes": f"Split campaign {i}",
+                    "kevel_flight_id": kevel_flight_id if i == 0 else 1000 + i,
+                    "impressions_sold": 4 // count,
+                    "net_spend": 10000 // count,
+                    "deal": self.deal1.id,
+                    "start_date": "2023-03-01",
+                    "end_date": "2023-03-03",
+                    "seller": "Tom",
+                }
+                for i in range(count)
+            ],
+        }
+
+    def test_split_query_count(self):
+        """Test that a split takes the same number of queries regardless of how many campaigns it has, and
+        how many flights it removes.
+        """
+        campaign_split_url = reverse("campaigns-split-campaigns")
+        # Keep creating the dev user out of the measured split
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as two_campaigns:
+            response = self.client.post(
+                campaign_split_url, self.split_data(2, 123), format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Campaign.objects.filter(pk=self.campaign1.pk).update(
+            net_spend=10000, impressions_sold=4
+        )
+
+        with self.assertNumQueries(len(two_campaigns)):
+            response = self.client.post(
+                campaign_split_url, self.split_data(4, 321), format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [campaign["kevel_flight_id"] for campaign in response.data],
+            [321, 1001, 1002, 1003],
+        )
+        self.assertEqual(self.campaign1.flights.get().kevel_flight_id, 321)
+
+        # Splits that remove campaign1's flights, first its one flight and then ten of them
+        Campaign.objects.filter(pk=self.campaign1.pk).update(
+            net_spend=10000, impressions_sold=4
+        )
+        with CaptureQueriesContext(connection) as one_flight:
+            response = self.client.post(
+                campaign_split_url, self.split_data(2), format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        one_flight_queries = len(one_flight)
+        Campaign.objects.filter(pk=self.campaign1.pk).update(
+            net_spend=10000, impressions_sold=4
+        )
+        Flight.objects.bulk_create(
+            Flight(campaign=self.campaign1, kevel_flight_id=i) for i in range(10)
+        )
+
+        with self.assertNumQueries(one_flight_queries):
+            response = self.client.post(
+                campaign_split_url, self.split_data(4), format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.campaign1.flights.exists())
+
+    def test_split_removes_flight(self):
+        """Test that splitting an existing campaign without a kevel_flight_id deletes its flights."""
+        response = self.client.post(
+            reverse("campaigns-split-campaigns"), self.split_data(2), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.campaign1.flights.exists())
+        self.assertEqual(
+            [campaign["kevel_flight_id"] for campaign in response.data], [None, 1001]
+        )
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal1.id).net_spend, 10000
+        )
+
+    def test_split_unknown_campaign_writes_nothing(self):
+        """Test that a split referencing a campaign that doesn't exist leaves every campaign unchanged."""
+        data = self.split_data(2, 123)
+        data["campaigns"][1]["id"] = 99999
+
+        response = self.client.post(
+            reverse("campaigns-split-campaigns"), data, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.campaign1.refresh_from_db()
+        self.assertEqual(self.campaign1.notes, "Initial campaign")
+        self.assertEqual(Campaign.objects.count(), 2)
+
+    def test_import_csv(self):
+        """Test updating and creating campaigns from a CSV import."""
+        data = (
+            "id,deal,notes,kevel_flight_id,impressions_sold,net_spend,start_date,end_date,seller\n"
+            f"{self.campaign1.id},{self.deal1.id},Imported,,4,4000,2023-01-01,2023-01-03,Meredith\n"
+            f",{self.deal1.id},,789,2,6000,2023-01-01,2023-01-03,Tom\n"
+        )
+
+        response = self.client.post(
+            reverse("campaigns-import-campaigns"), data, content_type="text/csv"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 1, "updated": 1})
+        self.campaign1.refresh_from_db()
+        self.assertEqual(self.campaign1.notes, "Imported")
+        self.assertEqual(self.campaign1.flights.get().kevel_flight_id, 123)
+        new_campaign = Campaign.objects.get(seller="Tom")
+        self.assertEqual(new_campaign.flights.get().kevel_flight_id, 789)
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal1.id).net_spend, 10000
+        )
+
+    def test_import_only_changes_flights_of_rows_with_kevel_flight_id(self):
+        """Test an NDJSON import keeps the flights of rows without a kevel_flight_id and removes those of rows
+        with a null one.
+        """
+        row = {
+            "impressions_sold": 4,
+            "net_spend": 10000,
+            "start_date": "2023-01-01",
+            "end_date": "2023-01-03",
+            "seller": "Meredith",
+        }
+        data = (
+            json.dumps({**row, "id": self.campaign1.id, "deal": self.deal1.id})
+            + "\n"
+            + json.dumps(
+                {
+                    **row,
+                    "id": self.campaign2.id,
+                    "deal": self.deal2.id,
+                    "net_spend": 5000,
+                    "kevel_flight_id": None,
+                }
+            )
+            + "\n"
+        )
+
+        response = self.client.post(
+            reverse("campaigns-import-campaigns"),
+            data,
+            content_type="application/x-ndjson",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 0, "updated": 2})
+        self.assertEqual(self.campaign1.flights.get().kevel_flight_id, 123)
+        self.assertFalse(self.campaign2.flights.exists())
+
+    def test_import_net_spend_mismatch(self):
+        """Test an NDJSON import is rejected as a whole when a deal's net spend doesn't add up."""
+        rows = [
+            {
+                "id": self.campaign2.id,
+                "deal": self.deal2.id,
+                "impressions_sold": 2,
+                "net_spend": 4000,
+                "start_date": "2023-02-01",
+                "end_date": "2023-02-03",
+                "seller": "Sarah",
+            },
+            {
+                "deal": self.deal1.id,
+                "impressions_sold": 1,
+                "net_spend": 0,
+                "start_date": "2023-02-01",
+                "end_date": "2023-02-03",
+                "seller": "Sarah",
+            },
+        ]
+        data = "\n".join(json.dumps(row) for row in rows)
+
+        response = self.client.post(
+            reverse("campaigns-import-campaigns"),
+            data,
+            content_type="application/x-ndjson",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["non_field_errors"],
+            [
+                f"Total net spend (4000) from the campaigns of deal {self.deal2.id} must equal "
+                "the deal amount (5000)."
+            ],
+        )
+        self.assertEqual(Campaign.objects.count(), 2)
+
+    def test_import_net_spend_of_deal_moved_away_from(self):
+        """Test an import is rejected when moving a campaign leaves its old deal's net spend short."""
+        data = (
+            "id,deal,notes,kevel_flight_id,impressions_sold,net_spend,start_date,end_date,seller\n"
+            f"{self.campaign2.id},{self.deal1.id},,,2,0,2023-02-01,2023-02-03,Sarah\n"
+        )
+
+        response = self.client.post(
+            reverse("campaigns-import-campaigns"), data, content_type="text/csv"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["non_field_errors"],
+            [
+                f"Total net spend (0) from the campaigns of deal {self.deal2.id} must equal "
+                "the deal amount (5000)."
+            ],
+        )
+        self.campaign2.refresh_from_db()
+        self.assertEqual(self.campaign2.deal_id, self.deal2.id)
+
+    def test_import_campaign_deleted_after_validation(self):
+        """Test an import is rejected without writing anything when a campaign is deleted after validation."""
+        data = (
+            "id,deal,notes,kevel_flight_id,impressions_sold,net_spend,start_date,end_date,seller\n"
+            f",{self.deal1.id},,789,2,6000,2023-01-01,2023-01-03,Tom\n"
+            f"{self.campaign1.id},{self.deal1.id},Imported,,4,4000,2023-01-01,2023-01-03,Meredith\n"
+        )
+        validate = CampaignImportSerializer.validate
+
+        def validate_then_delete(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            Campaign.objects.filter(pk=self.campaign1.pk).delete()
+            return attrs
+
+        with mock.patch.object(
+            CampaignImportSerializer, "validate", validate_then_delete
+        ):
+            response = self.client.post(
+                reverse("campaigns-import-campaigns"), data, content_type="text/csv"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data, [f"Campaigns with IDs [{self.campaign1.id}] do not exist."]
+        )
+        self.assertFalse(Campaign.objects.filter(seller="Tom").exists())
+
+    def test_import_query_count(self):
+        """Test that an import takes the same number of queries regardless of how many campaigns it has."""
+
+        def rows(count):
+            return "".join(
+                json.dumps(
+                    {
+                        "deal": self.deal1.id,
+                        "kevel_flight_id": 1000 + i,
+                        "impressions_sold": 1,
+                        "net_spend": 0,
+                        "start_date": "2023-02-01",
+                        "end_date": "2023-02-03",
+                        "seller": "Sarah",
+                    }
+                )
+                + "\n"
+                for i in range(count)
+            )
+
+        import_url = reverse("campaigns-import-campaigns")
+        # Create the dev user before measuring, so both imports run as an existing user
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as two_campaigns:
+            self.client.post(import_url, rows(2), content_type="application/x-ndjson")
+
+        with self.assertNumQueries(len(two_campaigns)):
+            response = self.client.post(
+                import_url, rows(20), content_type="application/x-ndjson"
+            )
+        self.assertEqual(response.data, {"created": 20, "updated": 0})
+
+    def test_import_removing_flights_query_count(self):
+        """Test that an import removing existing campaigns' flights takes the same number of queries
+        regardless of how many campaigns it has.
+        """
+        campaigns = Campaign.objects.bulk_create(
+            Campaign(
+                deal=self.deal1,
+                impressions_sold=1,
+                net_spend=0,
+                start_date="2023-02-01",
+                end_date="2023-02-03",
+                seller="Sarah",
+            )
+            for _ in range(22)
+        )
+        Flight.objects.bulk_create(
+            Flight(campaign=campaign, kevel_flight_id=1000 + i)
+            for i, campaign in enumerate(campaigns)
+        )
+
+        def rows(campaigns):
+            return "".join(
+                json.dumps(
+                    {
+                        "id": campaign.pk,
+                        "deal": self.deal1.id,
+                        "kevel_flight_id": None,
+                        "impressions_sold": 1,
+                        "net_spend": 0,
+                        "start_date": "2023-02-01",
+                        "end_date": "2023-02-03",
+                        "seller": "Sarah",
+                    }
+                )
+                + "\n"
+                for campaign in campaigns
+            )
+
+        import_url = reverse("campaigns-import-campaigns")
+        # Create the dev user before measuring, so both imports run as an existing user
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as two_campaigns:
+            self.client.post(
+                import_url, rows(campaigns[:2]), content_type="application/x-ndjson"
+            )
+
+        with self.assertNumQueries(len(two_campaigns)):
+            response = self.client.post(
+                import_url, rows(campaigns[2:]), content_type="application/x-ndjson"
+            )
+        self.assertEqual(response.data, {"created": 0, "updated": 20})
+        self.assertFalse(Flight.objects.filter(campaign__in=campaigns).exists())
+
+    def test_export_round_trip(self):
+        """Test importing an export of the campaigns changes nothing, in either format."""
+        for file_format, content_type in [
+            ("csv", "text/csv"),
+            ("ndjson", "application/x-ndjson"),
+        ]:
+            with self.subTest(file_format=file_format):
+                before = list(Campaign.objects.order_by("pk").values())
+                response = self.client.get(
+                    reverse("campaigns-export-campaigns"), {"file_format": file_format}
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response["Content-Type"], content_type)
+                exported = b"".join(response.streaming_content)
+
+                response = self.client.post(
+                    reverse("campaigns-import-campaigns"),
+                    exported,
+                    content_type=content_type,
+                )
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data, {"created": 0, "updated": 2})
+                after = list(Campaign.objects.order_by("pk").values())
+                for campaign in before + after:
+                    campaign.pop("updated_on")
+                self.assertEqual(after, before)
+                self.assertEqual(
+                    list(
+                        Flight.objects.order_by("kevel_flight_id").values_list(
+                            "kevel_flight_id", flat=True
+                        )
+                    ),
+                    [123, 456],
+                )
+
 
 @override_settings(DEBUG=True)
 class CampaignSummaryViewSetTests(APITestCase):
@@ -345,3 +773,102 @@ class CampaignSummaryViewSetTests(APITestCase):
         response = self.client.get(self.url, {"advertiser": "Nonexistent Advertiser"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, [])
+
+    def test_order_by_revenue(self):
+        """Test ordering the summaries by a metric computed in the database."""
+        self.create_deals(2)
+        for deal_id, impressions in zip(
+            BoostrDeal.objects.order_by("id").values_list("id", flat=True), [1, 20, 30]
+        ):
+            CampaignSummary.objects.filter(deal_id=deal_id).update(
+                impressions_delivered=impressions
+            )
+
+        response = self.client.get(self.url, {"ordering": "-revenue"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        revenues = [summary["revenue"] for summary in response.data]
+        self.assertEqual(revenues, sorted(revenues, reverse=True))
+
+    def test_filter_by_metrics(self):
+        """Test filtering on metrics computed in the database."""
+        self.create_deals(2)
+        CampaignSummary.objects.filter(deal_id=self.deal.id).update(
+            clicks_delivered=5, impressions_delivered=10
+        )
+
+        response = self.client.get(self.url, {"ctr__gte": 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["ctr"], 50.0)
+
+        response = self.client.get(self.url, {"live": "No"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn("Test Advertiser", [s["advertiser"] for s in response.data])
+
+    def create_deals(self, count):
+        """Create count more deals, each with a campaign so that it has a summary."""
+        for boostr_id in range(2, count + 2):
+            deal = BoostrDeal.objects.create(
+                boostr_id=boostr_id,
+                name=f"Deal {boostr_id}",
+                advertiser=f"Advertiser {boostr_id}",
+                currency="$",
+                amount=1000,
+                sales_representatives="Rep1",
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+            )
+            Campaign.objects.create(
+                impressions_sold=100,
+                net_spend=1000,
+                deal=deal,
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+                seller="Test Seller",
+            )
+
+    def test_cursor_pagination(self):
+        """Test walking every summary page by page when a page size is passed."""
+        self.create_deals(4)
+
+        deal_ids = []
+        response = self.client.get(self.url, {"page_size": 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            deal_ids.extend(summary["deal_id"] for summary in response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(
+            deal_ids,
+            list(BoostrDeal.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def test_export_matches_list(self):
+        """Test the streamed export returns the same summaries as the unpaginated list."""
+        self.create_deals(3)
+
+        response = self.client.get(reverse("overview-export"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        exported = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(
+            exported, json.loads(json.dumps(self.client.get(self.url).data))
+        )
+
+    def test_export_filters(self):
+        """Test the streamed export applies the same filters as the list."""
+        self.create_deals(3)
+
+        response = self.client.get(
+            reverse("overview-export"), {"advertiser": "Test Advertiser"}
+        )
+
+        exported = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(exported), 1)
+        self.assertEqual(exported[0]["advertiser"], "Test Advertiser")
@@ -1,9 +1,21 @@
 """Unit tests for all the database views"""
 
+from datetime import date, timedelta
+
 from django.apps import apps
 from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
 
+from consvc_shepherd.models import (
+    BoostrDeal,
+    BoostrDealProduct,
+    BoostrProduct,
+    Campaign,
+    DeliveredFlight,
+    Flight,
+)
+
 
 class ViewModelAlignmentTest(TestCase):
     """Unit tests for each view. The views are automatically detected using apps.get_models()
@@ -50,3 +62,100 @@ class ViewModelAlignmentTest(TestCase):
         for model_class in unmanaged_models:
             with self.subTest(model=model_class.__name__):
                 self.assert_view_matches_model(model_class)
+
+
+class SummaryJoinIndexTest(TestCase):
+    """Unit tests checking that the planner uses our indexes for the query shapes behind the campaign summaries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed enough rows that an index beats a sequential scan, and refresh the planner's statistics"""
+        products = BoostrProduct.objects.bulk_create(
+            BoostrProduct(
+                boostr_id=i, full_name=f"Product {i}", campaign_type="CPM", country="US"
+            )
+            for i in range(5)
+        )
+        deals = BoostrDeal.objects.bulk_create(
+            BoostrDeal(
+                boostr_id=i,
+                name=f"Deal {i}",
+                advertiser=f"Advertiser {i}",
+                currency="$",
+                amount=1000,
+                sales_representatives="",
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+            )
+            for i in range(200)
+        )
+        BoostrDealProduct.objects.bulk_create(
+            BoostrDealProduct(
+                boostr_deal=deal,
+                boostr_product=product,
+                month=f"2024-{month:02}",
+                budget=100,
+            )
+            for deal in deals
+            for product in products
+            for month in range(1, 13)
+        )
+        campaigns = Campaign.objects.bulk_create(
+            Campaign(
+                net_spend=1000,
+                impressions_sold=1000,
+                seller="",
+                deal=deal,
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+            )
+            for deal in deals
+        )
+        Flight.objects.bulk_create(
+            Flight(campaign=campaign, kevel_flight_id=i * 10 + flight)
+            for i, campaign in enumerate(campaigns)
+            for flight in range(10)
+        )
+        DeliveredFlight.objects.bulk_create(
+            DeliveredFlight(
+                submission_date=date(2024, 1, 1) + timedelta(days=day),
+                campaign_id=flight_id // 10,
+                flight_id=flight_id,
+                provider="kevel",
+                clicks_delivered=1,
+                impressions_delivered=10,
+            )
+            for flight_id in range(2000)
+            for day in range(5)
+        )
+        with connection.cursor() as cursor:
+            for model in [BoostrDealProduct, Flight, DeliveredFlight]:
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def test_delivered_flight_totals_use_flight_index(self):
+        """Test that summing a flight's deliveries uses the covering flight_id index"""
+        plan = (
+            DeliveredFlight.objects.filter(flight_id__in=[10, 20])
+            .values("flight_id")
+            .annotate(clicks=Sum("clicks_delivered"))
+            .explain()
+        )
+        self.assertIn("deliveredflight_flight_idx", plan)
+
+    def test_month_filter_uses_month_deal_index(self):
+        """Test that the month filter's subquery of deal ids uses the (month, boostr_deal) index"""
+        plan = (
+            BoostrDealProduct.objects.filter(month="2024-03")
+            .values("boostr_deal_id")
+            .explain()
+        )
+        self.assertIn("dealproduct_month_deal_idx", plan)
+
+    def test_flight_lookup_uses_kevel_flight_id_index(self):
+        """Test that looking up the deals of synced flights uses the kevel_flight_id index"""
+        plan = (
+            Flight.objects.filter(kevel_flight_id__in=[10, 20])
+            .values("campaign__deal_id")
+            .explain()
+        )
+        self.assertIn("flight_kevel_flight_id_idx", plan)
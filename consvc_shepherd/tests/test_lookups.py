@@ -0,0 +1,113 @@
+"""Unit tests for the cached lookup lists."""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from consvc_shepherd import lookups
+from consvc_shepherd.models import (
+    BoostrDeal,
+    BoostrProduct,
+    BoostrSyncStatus,
+    DataGeneration,
+)
+
+
+class LookupsTestCase(TestCase):
+    """Test case for the cached lookup lists."""
+
+    def setUp(self):
+        """Start every test with an empty cache and a deal."""
+        cache.clear()
+        self.deal = BoostrDeal.objects.create(
+            boostr_id=1,
+            name="Test Deal",
+            advertiser="Test Advertiser",
+            currency="$",
+            amount=10000,
+            sales_representatives="Rep1",
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+
+    def test_cache_hit(self):
+        """Test a lookup is only queried on a cache miss, and that hits and misses are counted."""
+        with mock.patch.object(lookups, "metrics") as metrics:
+            # Both read the DataGeneration, only the miss queries the deals
+            with self.assertNumQueries(2):
+                self.assertEqual(lookups.get_advertisers(), ["Test Advertiser"])
+            with self.assertNumQueries(1):
+                self.assertEqual(lookups.get_advertisers(), ["Test Advertiser"])
+
+        self.assertEqual(
+            metrics.incr.call_args_list,
+            [
+                mock.call("lookups.advertisers.cache.miss"),
+                mock.call("lookups.advertisers.cache.hit"),
+            ],
+        )
+
+    def test_generation_read_once_per_request(self):
+        """Test the lookups made while answering one request share a single read of the DataGeneration."""
+        request = RequestFactory().get("/admin/")
+        # One DataGeneration read, then one query per missed lookup
+        with self.assertNumQueries(4):
+            lookups.get_months(request)
+            lookups.get_placements(request)
+            lookups.get_countries(request)
+        with self.assertNumQueries(0):
+            lookups.get_months(request)
+            lookups.get_placements(request)
+            lookups.get_countries(request)
+
+        DataGeneration.bump()
+        # The next request reads the bumped generation, so its lookups miss again
+        request = RequestFactory().get("/admin/")
+        with self.assertNumQueries(4):
+            lookups.get_months(request)
+            lookups.get_placements(request)
+            lookups.get_countries(request)
+
+    def test_invalidated_on_save(self):
+        """Test saving a deal or a product drops the cached lookups."""
+        self.assertEqual(lookups.get_advertisers(), ["Test Advertiser"])
+        self.assertEqual(lookups.get_countries(), [])
+
+        self.deal.advertiser = "Renamed Advertiser"
+        self.deal.save()
+        BoostrProduct.objects.create(
+            boostr_id=1, full_name="Test Product", campaign_type="CPC", country="US"
+        )
+
+        self.assertEqual(lookups.get_advertisers(), ["Renamed Advertiser"])
+        self.assertEqual(lookups.get_countries(), ["US"])
+        self.assertEqual(lookups.get_placements(), ["Test Product"])
+
+    def test_invalidated_by_boostr_sync(self):
+        """Test the lists cached before a Boostr sync's bulk writes are dropped once it saves its status."""
+        self.assertEqual(lookups.get_advertisers(), ["Test Advertiser"])
+
+        BoostrDeal.objects.filter(pk=self.deal.pk).update(
+            advertiser="Synced Advertiser"
+        )
+        BoostrSyncStatus.objects.create(
+            synced_on=timezone.now(),
+            status=BoostrSyncStatus.SyncStatus.success,
+            message="Boostr sync success",
+        )
+
+        self.assertEqual(lookups.get_advertisers(), ["Synced Advertiser"])
+
+    def test_invalidated_by_another_process(self):
+        """Test a DataGeneration bumped without this process' signals still drops its cached lists."""
+        self.assertEqual(lookups.get_advertisers(), ["Test Advertiser"])
+
+        BoostrDeal.objects.filter(pk=self.deal.pk).update(
+            advertiser="Renamed Advertiser"
+        )
+        self.assertEqual(lookups.get_advertisers(), ["Test Advertiser"])
+        DataGeneration.bump()
+
+        self.assertEqual(lookups.get_advertisers(), ["Renamed Advertiser"])
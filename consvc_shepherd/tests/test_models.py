@@ -1,5 +1,6 @@
 """Tests for consvc_shepherd Models."""
 
+from django.db import connection
 from django.test import TestCase
 from django.utils import timezone
 
@@ -8,7 +9,9 @@ from consvc_shepherd.models import (
     BoostrDeal,
     Campaign,
     CampaignSummary,
+    DataGeneration,
     DeliveredFlight,
+    DeliveredFlightRollup,
     Flight,
     Partner,
     PartnerAllocation,
@@ -157,6 +160,253 @@ class CampaignSummaryTestCase(TestCase):
         )  # 5100
         self.assertEqual(self.campaign_summary.live, "Yes")
 
+    def test_with_metrics_matches_properties(self):
+        """Test the metrics computed in SQL equal the ones computed in Python."""
+        for deal_id in [1, 2, 3]:
+            BoostrDeal.objects.create(
+                id=deal_id,
+                boostr_id=deal_id,
+                name=f"Deal {deal_id}",
+                advertiser="Test Advertiser",
+                currency="$",
+                amount=10000,
+                sales_representatives="Rep1",
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+            )
+        CampaignSummary.objects.bulk_create(
+            [
+                self.campaign_summary,
+                CampaignSummary(
+                    deal_id=2,
+                    advertiser="No Impressions Sold",
+                    net_spend=500,
+                    impressions_sold=0,
+                    clicks_delivered=5,
+                    impressions_delivered=50,
+                ),
+                CampaignSummary(
+                    deal_id=3,
+                    advertiser="Not Live",
+                    net_spend=300,
+                    impressions_sold=7000,
+                    clicks_delivered=0,
+                    impressions_delivered=0,
+                ),
+            ]
+        )
+        metrics = ["net_ecpm", "ctr", "impressions_remaining", "live", "revenue"]
+
+        for summary in CampaignSummary.objects.with_metrics():
+            expected = CampaignSummary.objects.get(deal_id=summary.deal_id)
+            for metric in metrics:
+                with self.subTest(deal_id=summary.deal_id, metric=metric):
+                    self.assertEqual(
+                        getattr(summary, metric), getattr(expected, metric)
+                    )
+
+
+class CampaignSummaryRefreshTestCase(TestCase):
+    """Test case for keeping the materialized CampaignSummary table up to date."""
+
+    def setUp(self):
+        """Set up a deal with a campaign and a flight."""
+        self.deal = BoostrDeal.objects.create(
+            boostr_id=1,
+            name="Test Deal",
+            advertiser="Test Advertiser",
+            currency="$",
+            amount=10000,
+            sales_representatives="Rep1",
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+        self.campaign = Campaign.objects.create(
+            net_spend=10000,
+            impressions_sold=6000,
+            seller="Seller",
+            deal=self.deal,
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+        Flight.objects.create(campaign=self.campaign, kevel_flight_id=100)
+
+    def test_campaign_changes_refresh_summary(self):
+        """Test that saving and deleting campaigns keeps the deal's summary up to date."""
+        summary = CampaignSummary.objects.get(deal_id=self.deal.id)
+        self.assertEqual(summary.advertiser, "Test Advertiser")
+        self.assertEqual(summary.net_spend, 10000)
+
+        self.campaign.net_spend = 12000
+        self.campaign.save()
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).net_spend, 12000
+        )
+
+        self.campaign.delete()
+        self.assertFalse(CampaignSummary.objects.filter(deal_id=self.deal.id).exists())
+
+    def test_deal_changes_refresh_summary(self):
+        """Test that renaming a deal's advertiser updates its summary, and deleting the deal removes it."""
+        self.deal.advertiser = "Renamed Advertiser"
+        self.deal.save()
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).advertiser,
+            "Renamed Advertiser",
+        )
+
+        self.deal.delete()
+        self.assertFalse(CampaignSummary.objects.exists())
+
+    def test_delivered_flight_changes_refresh_summary(self):
+        """Test that saving and deleting a DeliveredFlight updates the summary of its flight's deal."""
+        delivered_flight = DeliveredFlight.objects.create(
+            submission_date="2024-01-02",
+            campaign_id=1,
+            flight_id=100,
+            provider="kevel",
+            clicks_delivered=3,
+            impressions_delivered=30,
+        )
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).impressions_delivered, 30
+        )
+
+        delivered_flight.impressions_delivered = 40
+        delivered_flight.save()
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).impressions_delivered, 40
+        )
+
+        delivered_flight.delete()
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).impressions_delivered, 0
+        )
+
+    def test_moves_refresh_previous_deal(self):
+        """Test that moving a campaign to another deal, or a flight to another campaign, also refreshes the
+        summary of the deal it was moved away from.
+        """
+        DeliveredFlight.objects.create(
+            submission_date="2024-01-02",
+            campaign_id=1,
+            flight_id=100,
+            provider="kevel",
+            clicks_delivered=3,
+            impressions_delivered=30,
+        )
+        other_deal = BoostrDeal.objects.create(
+            boostr_id=2,
+            name="Other Deal",
+            advertiser="Other Advertiser",
+            currency="$",
+            amount=10000,
+            sales_representatives="Rep1",
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+        other_campaign = Campaign.objects.create(
+            net_spend=500,
+            impressions_sold=100,
+            seller="Seller",
+            deal=other_deal,
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+
+        flight = self.campaign.flights.get()
+        flight.campaign = other_campaign
+        flight.save()
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).impressions_delivered, 0
+        )
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=other_deal.id).impressions_delivered,
+            30,
+        )
+
+        other_campaign.deal = self.deal
+        other_campaign.save()
+        self.assertFalse(CampaignSummary.objects.filter(deal_id=other_deal.id).exists())
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).net_spend, 10500
+        )
+
+    def test_refresh_matches_view(self):
+        """Test that refresh only touches the given deals, and stores what campaign_summary_view computes."""
+        # Written in bulk like BQSyncer does, so no signal refreshes the summary
+        DeliveredFlight.objects.bulk_create(
+            [
+                DeliveredFlight(
+                    submission_date="2024-01-02",
+                    campaign_id=1,
+                    flight_id=100,
+                    provider="kevel",
+                    clicks_delivered=10,
+                    impressions_delivered=1000,
+                )
+            ]
+        )
+        DeliveredFlightRollup.rebuild([100])
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).impressions_delivered, 0
+        )
+
+        CampaignSummary.refresh([])
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).impressions_delivered, 0
+        )
+
+        CampaignSummary.refresh([self.deal.id])
+        summary = CampaignSummary.objects.get(deal_id=self.deal.id)
+        self.assertEqual(summary.impressions_delivered, 1000)
+        self.assertEqual(summary.clicks_delivered, 10)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT deal_id, net_spend, impressions_delivered FROM campaign_summary_view"
+            )
+            self.assertEqual(
+                cursor.fetchall(),
+                [(self.deal.id, 10000, summary.impressions_delivered)],
+            )
+
+    def test_refresh_upserts(self):
+        """Test that refresh updates summaries in place, inserts missing ones and deletes vanished ones."""
+        other_deal = BoostrDeal.objects.create(
+            boostr_id=2,
+            name="Other Deal",
+            advertiser="Other Advertiser",
+            currency="$",
+            amount=10000,
+            sales_representatives="Rep1",
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE campaign_summary SET net_spend = 1 WHERE deal_id = %s",
+                [self.deal.id],
+            )
+            # A summary for a deal without campaigns, which campaign_summary_view has no row for
+            cursor.execute(
+                "INSERT INTO campaign_summary (deal_id, advertiser, net_spend, impressions_sold, "
+                "impressions_delivered, clicks_delivered) VALUES (%s, 'Other Advertiser', 0, 0, 0, 0)",
+                [other_deal.id],
+            )
+
+        CampaignSummary.refresh([self.deal.id, other_deal.id])
+        self.assertEqual(
+            list(CampaignSummary.objects.values_list("deal_id", "net_spend")),
+            [(self.deal.id, 10000)],
+        )
+
+        CampaignSummary.objects.filter(deal_id=self.deal.id).delete()
+        CampaignSummary.refresh([self.deal.id])
+        CampaignSummary.refresh([self.deal.id])
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=self.deal.id).net_spend, 10000
+        )
+
 
 class DeliveredFlightTestCase(TestCase):
     """Test case for DeliveredFlight model operations."""
@@ -235,3 +485,68 @@ class FlightTestCase(TestCase):
         """Verify that the __str__ method returns the correct string representation."""
         expected_str = "Flight 54321"
         self.assertEqual(str(self.flight), expected_str)
+
+
+class DeliveredFlightRollupTestCase(TestCase):
+    """Test case for DeliveredFlightRollup model operations."""
+
+    def test_delivered_flight_changes_rebuild_rollup(self):
+        """Test that saving and deleting DeliveredFlights rebuilds their flight's rollup."""
+        first = DeliveredFlight.objects.create(
+            submission_date="2024-09-17",
+            campaign_id=1,
+            flight_id=100,
+            provider="kevel",
+            clicks_delivered=10,
+            impressions_delivered=100,
+        )
+        DeliveredFlight.objects.create(
+            submission_date="2024-09-18",
+            campaign_id=1,
+            flight_id=100,
+            provider="kevel",
+            clicks_delivered=20,
+            impressions_delivered=200,
+        )
+        rollup = DeliveredFlightRollup.objects.get(flight_id=100)
+        self.assertEqual(rollup.clicks_delivered, 30)
+        self.assertEqual(rollup.impressions_delivered, 300)
+        self.assertEqual(str(rollup.first_seen), "2024-09-17")
+        self.assertEqual(str(rollup.last_seen), "2024-09-18")
+
+        first.delete()
+        rollup = DeliveredFlightRollup.objects.get(flight_id=100)
+        self.assertEqual(rollup.clicks_delivered, 20)
+        self.assertEqual(str(rollup.first_seen), "2024-09-18")
+        self.assertEqual(str(rollup), "100 : 20 clicks and 200 impressions")
+
+
+class DataGenerationTestCase(TestCase):
+    """Test case for the DataGeneration counter."""
+
+    def test_bump(self):
+        """Test bumping the counter increments the generation and its timestamp."""
+        before = DataGeneration.current()
+
+        DataGeneration.bump()
+
+        after = DataGeneration.current()
+        self.assertEqual(after.generation, before.generation + 1)
+        self.assertGreater(after.updated_on, before.updated_on)
+
+    def test_saving_data_bumps(self):
+        """Test saving a deal bumps the counter."""
+        before = DataGeneration.current().generation
+
+        BoostrDeal.objects.create(
+            boostr_id=1,
+            name="Test Deal",
+            advertiser="Test Advertiser",
+            currency="$",
+            amount=10000,
+            sales_representatives="Rep1",
+            start_date="2024-01-01",
+            end_date="2024-12-31",
+        )
+
+        self.assertEqual(DataGeneration.current().generation, before + 1)
@@ -1,19 +1,27 @@
 """Unit tests for the preview page functionalities"""
 
+import threading
+import time
 from unittest import mock
 
+import requests
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 
 from consvc_shepherd.preview import (
+    COUNTRIES,
     DIRECT_SOLD_TILE_AD_TYPES,
     LOCALIZATIONS,
     SPOC_AD_TYPES,
+    Ads,
     Environment,
     FormFactor,
     Spoc,
     Tile,
     get_ads,
     get_amp_tiles,
+    get_grid,
+    get_session,
     get_spocs_and_direct_sold_tiles,
     get_unified,
 )
@@ -96,7 +104,7 @@ class TestGetAmpTiles(TestCase):
     def test_get_amp_tiles(self):
         """Test the Retrieval of Tiles from MARS."""
         with mock.patch(
-            "requests.get",
+            "requests.Session.get",
             side_effect=self.mock_amp_tiles_data,
         ) as mock_amp_tiles:
             tiles = get_amp_tiles(
@@ -126,7 +134,7 @@ class TestGetAmpTiles(TestCase):
     def test_get_amp_tiles_204(self):
         """Test a 204 response from /v1/tiles."""
         with mock.patch(
-            "requests.get",
+            "requests.Session.get",
             return_value=mock.Mock(status_code=204),
         ) as mock_amp_tiles:
             tiles = get_amp_tiles(
@@ -194,7 +202,7 @@ class TestGetSpocsAndDirectSoldTiles(TestCase):
         expected_site_id: int | None,
     ):
         with mock.patch(
-            "requests.post",
+            "requests.Session.post",
             side_effect=self.mock_spocs_data,
         ) as mock_spocs:
             tiles, spocs = get_spocs_and_direct_sold_tiles(
@@ -259,6 +267,10 @@ class TestGetSpocsAndDirectSoldTiles(TestCase):
 class TestGetAds(TestCase):
     """Test the fetching of various ads on the preview page"""
 
+    def setUp(self):
+        """Start every test with an empty cache"""
+        cache.clear()
+
     def mock_get_amp_tiles(self, *args) -> list[Tile]:
         """Mock out the function that wraps 'GET /v1/tiles' request within get_ads"""
         return [ACME_TILE, ZOMBOCOM_TILE]
@@ -320,7 +332,10 @@ class TestGetAds(TestCase):
 
     def test_get_ads_unified_env(self):
         """Test that when unified API environments are requested, the expected request wrapper functions are called"""
-        with mock.patch("consvc_shepherd.preview.get_unified") as mock_get_unified:
+        with mock.patch(
+            "consvc_shepherd.preview.get_unified",
+            return_value=Ads(tiles=[], spocs=[], rectangles=[], is_mobile=False),
+        ) as mock_get_unified:
             mockUnifiedEnv = Environment(
                 code="unified_mock",
                 name="Unified Mock",
@@ -336,6 +351,64 @@ class TestGetAds(TestCase):
                 mockUnifiedEnv, "US", DEFAULT_USER_AGENT.is_mobile
             )
 
+    MOCK_ENV = Environment(
+        code="mock",
+        name="Mock",
+        mars_url="https://mars.mock.if.you.are.connecting.to.this.the.test.broke.com",
+        spoc_site_id=1234567,
+        spoc_site_id_mobile=1234567,
+        spoc_zone_ids=[],
+        direct_sold_tile_zone_ids=[424242],
+    )
+
+    def test_get_ads_fetches_concurrently(self):
+        """Test that the AMP tiles and SPOCs requests are in flight at the same time"""
+        both_started = threading.Barrier(2, timeout=5)
+
+        def wait_for_other(result):
+            def fetch(*args):
+                both_started.wait()
+                return result
+
+            return fetch
+
+        with mock.patch(
+            "consvc_shepherd.preview.get_amp_tiles",
+            side_effect=wait_for_other([ACME_TILE]),
+        ), mock.patch(
+            "consvc_shepherd.preview.get_spocs_and_direct_sold_tiles",
+            side_effect=wait_for_other(([PROGRESS_QUEST_TILE], [SPOC])),
+        ):
+            ads = get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+
+        self.assertEqual(ads.tiles, [ACME_TILE, PROGRESS_QUEST_TILE])
+        self.assertEqual(ads.spocs, [SPOC])
+        self.assertEqual(ads.errors, [])
+
+    def test_get_ads_renders_when_one_request_fails(self):
+        """Test that a failed MARS request doesn't hide the ads from the other"""
+        with mock.patch(
+            "consvc_shepherd.preview.get_amp_tiles",
+            side_effect=requests.Timeout("read timed out"),
+        ), mock.patch(
+            "consvc_shepherd.preview.get_spocs_and_direct_sold_tiles",
+            side_effect=self.mock_get_spocs_and_direct_sold_tiles,
+        ), self.assertLogs(
+            "shepherd", level="ERROR"
+        ):
+            ads = get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+
+        self.assertEqual(ads.tiles, [PROGRESS_QUEST_TILE])
+        self.assertEqual(ads.spocs, [SPOC])
+        self.assertEqual(ads.errors, ["AMP tiles: read timed out"])
+
+    def test_get_session_reused_per_mars_url(self):
+        """Test that requests to the same MARS host share one pooled session"""
+        session = get_session(self.MOCK_ENV.mars_url)
+
+        self.assertIs(get_session(self.MOCK_ENV.mars_url), session)
+        self.assertIsNot(get_session("https://other.mars.example.com"), session)
+
 
 @override_settings(DEBUG=True)
 class TestGetUnified(TestCase):
@@ -387,7 +460,7 @@ class TestGetUnified(TestCase):
     def test_get_unified(self):
         """Test the Retrieval of Ads from MARS Unified API."""
         with mock.patch(
-            "requests.post",
+            "requests.Session.post",
             side_effect=self.mock_unified_data,
         ) as mock_unified:
             mockUnifiedEnv = Environment(
@@ -464,3 +537,282 @@ class TestGetUnified(TestCase):
             payload = kwargs["json"]
             self.assertIsInstance(payload["context_id"], str)
             self.assertEqual(len(payload["context_id"]), 36)
+
+
+@override_settings(DEBUG=True)
+class TestGetGrid(TestCase):
+    """Test the fetching of ads for the preview grid."""
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        cache.clear()
+
+    MOCK_ENV = TestGetAds.MOCK_ENV
+    MOBILE = FormFactor(
+        code="mobile",
+        name="Mobile",
+        is_mobile=True,
+        user_agent="Mozilla/5.0 (Android 11; Mobile; rv:92.0) Gecko/92.0 Firefox/92.0",
+    )
+
+    def mock_ads(self, env, country, region, form_factor, timeout=None, use_cache=True):
+        """Return ads tagged with the cell they were requested for."""
+        return Ads(
+            tiles=[
+                Tile(
+                    image_url="",
+                    name=f"{country} {form_factor.code}",
+                    sponsored="",
+                    url="",
+                )
+            ],
+            spocs=[],
+            rectangles=[],
+            is_mobile=form_factor.is_mobile,
+        )
+
+    def test_get_grid(self):
+        """Test that a row of cells is returned per country, with a cell per form factor"""
+        countries = [COUNTRIES[0], COUNTRIES[2]]
+        with mock.patch(
+            "consvc_shepherd.preview.get_ads", side_effect=self.mock_ads
+        ) as mock_get_ads:
+            grid = get_grid(self.MOCK_ENV, countries, [DEFAULT_USER_AGENT, self.MOBILE])
+
+        self.assertEqual(mock_get_ads.call_count, 4)
+        self.assertEqual(
+            [[cell.ads.tiles[0].name for cell in row] for row in grid],
+            [["US desktop", "US mobile"], ["DE desktop", "DE mobile"]],
+        )
+        for row in grid:
+            for cell in row:
+                self.assertIsNone(cell.error)
+                self.assertGreaterEqual(cell.latency_ms, 0)
+
+    def test_get_grid_nocache(self):
+        """Test that use_cache=False reaches the ads fetched for every cell"""
+        with mock.patch(
+            "consvc_shepherd.preview.get_ads", side_effect=self.mock_ads
+        ) as mock_get_ads:
+            get_grid(
+                self.MOCK_ENV,
+                [COUNTRIES[0]],
+                [DEFAULT_USER_AGENT, self.MOBILE],
+                cell_timeout=2,
+                use_cache=False,
+            )
+
+        self.assertCountEqual(
+            mock_get_ads.call_args_list,
+            [
+                mock.call(
+                    self.MOCK_ENV,
+                    "US",
+                    "",
+                    form_factor,
+                    timeout=2,
+                    use_cache=False,
+                )
+                for form_factor in [DEFAULT_USER_AGENT, self.MOBILE]
+            ],
+        )
+
+    def test_get_grid_caps_concurrency(self):
+        """Test that no more cells than the cap are fetched at the same time"""
+        lock = threading.Lock()
+        in_flight = []
+        peak = []
+
+        def track(*args, **kwargs):
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.pop()
+            return self.mock_ads(*args, **kwargs)
+
+        with mock.patch("consvc_shepherd.preview.get_ads", side_effect=track):
+            grid = get_grid(
+                self.MOCK_ENV,
+                COUNTRIES,
+                [DEFAULT_USER_AGENT, self.MOBILE],
+                max_concurrency=3,
+            )
+
+        self.assertEqual(sum(len(row) for row in grid), len(COUNTRIES) * 2)
+        self.assertLessEqual(max(peak), 3)
+
+    def test_get_grid_cell_timeout(self):
+        """Test that a cell whose MARS calls outlast the timeout reports the timeout"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def hang(*args):
+            release.wait(5)
+            return []
+
+        with mock.patch(
+            "consvc_shepherd.preview.get_amp_tiles", side_effect=hang
+        ), mock.patch(
+            "consvc_shepherd.preview.get_spocs_and_direct_sold_tiles",
+            side_effect=lambda *args: ([PROGRESS_QUEST_TILE], [SPOC]),
+        ), self.assertLogs(
+            "shepherd", level="ERROR"
+        ):
+            [[cell]] = get_grid(
+                self.MOCK_ENV, [COUNTRIES[0]], [DEFAULT_USER_AGENT], cell_timeout=0.05
+            )
+
+        self.assertLess(cell.latency_ms, 5000)
+        self.assertEqual(cell.ads.errors, ["AMP tiles: TimeoutError"])
+        self.assertEqual(cell.ads.tiles, [PROGRESS_QUEST_TILE])
+
+    def test_get_grid_cell_timeout_bounds_mars_requests(self):
+        """Test that a cell's MARS requests time out no later than the cell does"""
+        with mock.patch(
+            "consvc_shepherd.preview.get_amp_tiles", return_value=[]
+        ) as mock_get_amp_tiles, mock.patch(
+            "consvc_shepherd.preview.get_spocs_and_direct_sold_tiles",
+            return_value=([], []),
+        ) as mock_get_spocs_and_direct_sold_tiles:
+            get_grid(
+                self.MOCK_ENV, [COUNTRIES[0]], [DEFAULT_USER_AGENT], cell_timeout=2
+            )
+
+        mock_get_amp_tiles.assert_called_once_with(
+            self.MOCK_ENV, "US", "", DEFAULT_USER_AGENT.user_agent, 2
+        )
+        mock_get_spocs_and_direct_sold_tiles.assert_called_once_with(
+            self.MOCK_ENV, "US", "", DEFAULT_USER_AGENT.is_mobile, 2
+        )
+
+    def test_get_grid_cell_error(self):
+        """Test that a failed cell is reported without failing the grid"""
+        with mock.patch(
+            "consvc_shepherd.preview.get_ads",
+            side_effect=[
+                ValueError("boom"),
+                self.mock_ads(None, "DE", "", self.MOBILE),
+            ],
+        ), self.assertLogs("shepherd", level="ERROR"):
+            grid = get_grid(
+                self.MOCK_ENV, [COUNTRIES[0], COUNTRIES[2]], [self.MOBILE], 1
+            )
+
+        self.assertEqual(grid[0][0].error, "boom")
+        self.assertIsNone(grid[0][0].ads)
+        self.assertEqual(grid[1][0].ads.tiles[0].name, "DE mobile")
+
+
+@override_settings(DEBUG=True)
+class TestPreviewCache(TestCase):
+    """Test the caching of ads loaded from MARS for the preview page."""
+
+    MOCK_ENV = TestGetAds.MOCK_ENV
+
+    def setUp(self):
+        """Start every test with an empty cache and mocked MARS calls."""
+        cache.clear()
+        patchers = [
+            mock.patch(
+                "consvc_shepherd.preview.get_amp_tiles", return_value=[ACME_TILE]
+            ),
+            mock.patch(
+                "consvc_shepherd.preview.get_spocs_and_direct_sold_tiles",
+                return_value=([PROGRESS_QUEST_TILE], [SPOC]),
+            ),
+            mock.patch("consvc_shepherd.preview.metrics"),
+        ]
+        self.mock_get_amp_tiles, self.mock_get_spocs, self.metrics = [
+            patcher.start() for patcher in patchers
+        ]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def test_cache_hit(self):
+        """Test that MARS is only called on a cache miss, and that hits, misses and latency are reported"""
+        first = get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+        second = get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second.tiles, [ACME_TILE, PROGRESS_QUEST_TILE])
+        self.mock_get_amp_tiles.assert_called_once()
+        self.mock_get_spocs.assert_called_once()
+        self.assertCountEqual(
+            self.metrics.incr.call_args_list,
+            [
+                mock.call("preview.amp_tiles.cache.miss"),
+                mock.call("preview.spocs.cache.miss"),
+                mock.call("preview.amp_tiles.cache.hit"),
+                mock.call("preview.spocs.cache.hit"),
+            ],
+        )
+        self.assertCountEqual(
+            [call.args[0] for call in self.metrics.histogram.call_args_list],
+            ["preview.amp_tiles.mars.latency", "preview.spocs.mars.latency"],
+        )
+
+    def test_cache_keyed_by_request(self):
+        """Test that ads are cached separately per environment, country, region and form factor"""
+        get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+        get_ads(self.MOCK_ENV, "DE", "CA", DEFAULT_USER_AGENT)
+        get_ads(self.MOCK_ENV, "US", "NY", DEFAULT_USER_AGENT)
+        get_ads(self.MOCK_ENV, "US", "CA", TestGetGrid.MOBILE)
+
+        self.assertEqual(self.mock_get_amp_tiles.call_count, 4)
+
+    def test_nocache(self):
+        """Test that use_cache=False calls MARS and refreshes the cached ads"""
+        get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+        self.mock_get_amp_tiles.return_value = [ZOMBOCOM_TILE]
+
+        ads = get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT, use_cache=False)
+        self.assertEqual(ads.tiles, [ZOMBOCOM_TILE, PROGRESS_QUEST_TILE])
+
+        ads = get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+        self.assertEqual(ads.tiles, [ZOMBOCOM_TILE, PROGRESS_QUEST_TILE])
+        self.assertEqual(self.mock_get_amp_tiles.call_count, 2)
+
+    @override_settings(PREVIEW_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """Test that a zero timeout turns the cache off"""
+        get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+        get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT)
+
+        self.assertEqual(self.mock_get_amp_tiles.call_count, 2)
+        self.metrics.incr.assert_not_called()
+
+    def test_failures_not_cached(self):
+        """Test that a failed MARS call is retried on the next load"""
+        self.mock_get_amp_tiles.side_effect = [requests.ConnectionError("down"), []]
+
+        with self.assertLogs("shepherd", level="ERROR"):
+            self.assertEqual(
+                get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT).errors,
+                ["AMP tiles: down"],
+            )
+        self.assertEqual(
+            get_ads(self.MOCK_ENV, "US", "CA", DEFAULT_USER_AGENT).errors, []
+        )
+        self.mock_get_spocs.assert_called_once()
+
+    def test_unified_cached(self):
+        """Test that the unified API response is cached too"""
+        unified_env = Environment(
+            code="unified_mock",
+            name="Unified Mock",
+            mars_url="https://unified.mock.if.you.are.connecting.to.this.the.test.broke.com",
+            spoc_site_id=None,
+            spoc_site_id_mobile=None,
+            spoc_zone_ids=[],
+            direct_sold_tile_zone_ids=[],
+        )
+        ads = Ads(tiles=[ACME_TILE], spocs=[SPOC], rectangles=[], is_mobile=False)
+        with mock.patch(
+            "consvc_shepherd.preview.get_unified", return_value=ads
+        ) as mock_get_unified:
+            get_ads(unified_env, "US", "CA", DEFAULT_USER_AGENT)
+            self.assertEqual(get_ads(unified_env, "US", "CA", DEFAULT_USER_AGENT), ads)
+
+        mock_get_unified.assert_called_once()
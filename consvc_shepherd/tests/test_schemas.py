@@ -0,0 +1,71 @@
+"""Unit tests for the JSON schema registry."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+from jsonschema import exceptions
+
+from consvc_shepherd import schemas
+from consvc_shepherd.schemas import SchemaRegistry
+
+
+class SchemaRegistryTestCase(SimpleTestCase):
+    """Test case for the JSON schema registry."""
+
+    def setUp(self):
+        """Write a schema into a temporary directory and point a registry at it."""
+        self.schema_dir = Path(tempfile.mkdtemp())
+        self.schema_path = self.schema_dir / "doc.schema.json"
+        self.write_schema({"type": "object", "required": ["name"]})
+        self.registry = SchemaRegistry(self.schema_dir, {"doc": "doc.schema.json"})
+
+    def tearDown(self):
+        """Remove the temporary schema."""
+        self.schema_path.unlink()
+        self.schema_dir.rmdir()
+
+    def write_schema(self, schema, mtime_ns=None):
+        """Write the given schema, with the given mtime if there is one."""
+        self.schema_path.write_text(
+            json.dumps(
+                {"$schema": "https://json-schema.org/draft/2020-12/schema", **schema}
+            )
+        )
+        if mtime_ns is not None:
+            os.utime(self.schema_path, ns=(mtime_ns, mtime_ns))
+
+    def test_validator_is_cached(self):
+        """Test the schema is only compiled once while its file is unchanged."""
+        validator = self.registry.get_validator("doc")
+
+        self.assertIs(self.registry.get_validator("doc"), validator)
+        self.registry.validate("doc", {"name": "Shepherd"})
+        with self.assertRaises(exceptions.ValidationError):
+            self.registry.validate("doc", {})
+
+    def test_reload_on_mtime_change(self):
+        """Test the schema is reloaded when its file's mtime changes."""
+        self.registry.validate("doc", {"name": "Shepherd"})
+        mtime_ns = os.stat(self.schema_path).st_mtime_ns
+
+        self.write_schema(
+            {"type": "object", "required": ["id"]}, mtime_ns + 1_000_000_000
+        )
+
+        with self.assertRaises(exceptions.ValidationError):
+            self.registry.validate("doc", {"name": "Shepherd"})
+        self.registry.validate("doc", {"id": 1})
+
+    def test_unknown_kind(self):
+        """Test validating against a schema that isn't registered is an error."""
+        with self.assertRaises(ValueError):
+            self.registry.validate("unknown", {})
+
+    def test_repo_schemas(self):
+        """Test the repo's schemas are registered and reject invalid documents."""
+        for kind in schemas.SCHEMA_FILES:
+            with self.subTest(kind=kind), self.assertRaises(exceptions.ValidationError):
+                schemas.validate(kind, [])
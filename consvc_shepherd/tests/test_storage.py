@@ -0,0 +1,73 @@
+"""Unit tests for publishing settings to storage."""
+
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from consvc_shepherd import storage
+from consvc_shepherd.storage import FileSystemPublisher, GCSPublisher
+
+
+class FileSystemPublisherTestCase(SimpleTestCase):
+    """Test case for the local filesystem stand-in publisher."""
+
+    def setUp(self):
+        """Publish to a temporary directory."""
+        self.publish_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.publish_dir)
+
+    def test_send_to_storage(self):
+        """Test the content is published gzipped as a timestamped and a latest file."""
+        with override_settings(
+            SNAPSHOT_PUBLISHER={
+                "BACKEND": "consvc_shepherd.storage.FileSystemPublisher",
+                "OPTIONS": {"location": self.publish_dir},
+            }
+        ), mock.patch.object(storage, "metrics") as metrics:
+            storage.send_to_storage('{"name": "test"}', "settings")
+
+        file_names = sorted(os.listdir(self.publish_dir))
+        self.assertEqual(len(file_names), 2)
+        self.assertRegex(file_names[0], r"^settings_\d{14}\.json$")
+        self.assertEqual(file_names[1], "settings_latest.json")
+        for file_name in file_names:
+            with gzip.open(os.path.join(self.publish_dir, file_name), "rt") as f:
+                self.assertEqual(f.read(), '{"name": "test"}')
+        self.assertEqual(
+            [histogram.args[0] for histogram in metrics.histogram.call_args_list],
+            ["storage.upload.latency", "storage.copy.latency"],
+        )
+
+    def test_uncompressed(self):
+        """Test the content is published as is when compression is off."""
+        FileSystemPublisher(self.publish_dir, compress=False).publish("{}", "settings")
+
+        with open(os.path.join(self.publish_dir, "settings_latest.json")) as f:
+            self.assertEqual(f.read(), "{}")
+
+
+class GCSPublisherTestCase(SimpleTestCase):
+    """Test case for the GCS publisher."""
+
+    @mock.patch("consvc_shepherd.storage.default_storage")
+    def test_publish(self, default_storage):
+        """Test the content is uploaded once and copied to the latest blob on the server side."""
+        bucket = default_storage.bucket
+        blobs = {}
+        bucket.blob.side_effect = lambda name: blobs.setdefault(name, mock.Mock())
+
+        GCSPublisher().publish("{}", "settings")
+
+        date_blob_name, date_blob = next(iter(blobs.items()))
+        self.assertRegex(date_blob_name, r"^settings_\d{14}\.json$")
+        self.assertEqual(date_blob.content_encoding, "gzip")
+        date_blob.upload_from_string.assert_called_once_with(
+            gzip.compress(b"{}"), content_type="application/json"
+        )
+        bucket.copy_blob.assert_called_once_with(
+            date_blob, bucket, "settings_latest.json"
+        )
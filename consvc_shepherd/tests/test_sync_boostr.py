@@ -1,6 +1,8 @@
 """Unit tests for the sync_boostr_data command"""
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 from django.core.management import call_command
@@ -12,15 +14,24 @@ from consvc_shepherd.management.commands.sync_boostr_data import (
     BoostrApiError,
     BoostrApiMaxRetriesError,
     BoostrDeal,
+    BoostrDealProduct,
     BoostrLoader,
     BoostrProduct,
+    Campaign,
+    CampaignSummary,
+    RateLimiter,
     get_campaign_type,
 )
+from consvc_shepherd.models import DataGeneration
+from consvc_shepherd.tests.test_sync_boostr_mock_responses import (
+    MOCK_DEALS_RESPONSE,
+    MOCK_PRODUCTS_RESPONSE,
+)
 from consvc_shepherd.tests.test_sync_boostr_mocks import (
+    MockResponse,
     mock_get_fail,
     mock_get_fail_500,
     mock_get_latest_boostr_sync_status,
-    mock_get_product,
     mock_get_success,
     mock_get_success_empty_response,
     mock_get_success_response,
@@ -28,8 +39,6 @@ from consvc_shepherd.tests.test_sync_boostr_mocks import (
     mock_post_token_fail,
     mock_request_exception,
     mock_too_many_requests_response,
-    mock_update_or_create_advertiser,
-    mock_update_or_create_deal,
     mock_upsert_deals_exception,
 )
 
@@ -143,6 +152,7 @@ class TestSyncBoostrData(TestCase):
     @mock.patch("consvc_shepherd.models.BoostrProduct.objects.update_or_create")
     def test_upsert_products(self, mock_update_or_create, mock_get, mock_post):
         """Test function that calls boostr API for product data and saves to our DB"""
+        mock_update_or_create.return_value = (mock.MagicMock(), True)
         loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
         loader.upsert_products()
         calls = [
@@ -165,6 +175,61 @@ class TestSyncBoostrData(TestCase):
         ]
         mock_update_or_create.assert_has_calls(calls)
 
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    def test_upsert_products_loads_product_ids(self, mock_get, mock_post):
+        """Test that upserting products leaves a map of every product's boostr_id to its DB id"""
+        existing_product = BoostrProduct.objects.create(
+            boostr_id=204410,
+            full_name="Firefox New Tab FR (CPM)",
+            country="FR",
+            campaign_type=BoostrProduct.CampaignType.CPM,
+        )
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        loader.upsert_products()
+        self.assertEqual(
+            loader.product_ids,
+            {
+                204410: existing_product.pk,
+                212592: BoostrProduct.objects.get(boostr_id=212592).pk,
+                28256: BoostrProduct.objects.get(boostr_id=28256).pk,
+            },
+        )
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    def test_get_product_id_looks_up_missing_products_once(self, mock_post):
+        """Test that a product missing from product_ids is read from the DB once, then resolved from memory"""
+        product = BoostrProduct.objects.create(
+            boostr_id=28256,
+            full_name="Firefox New Tab US (CPC)",
+            country="US",
+            campaign_type=BoostrProduct.CampaignType.CPC,
+        )
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        with self.assertNumQueries(1):
+            self.assertEqual(loader.get_product_id(28256), product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(loader.get_product_id(28256), product.pk)
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get")
+    def test_get_product_id_fetches_unknown_products_from_boostr(
+        self, mock_get, mock_post
+    ):
+        """Test that a product we've never stored is fetched from Boostr and saved instead of failing the sync"""
+        mock_get.return_value = MockResponse(MOCK_PRODUCTS_RESPONSE[1], 200)
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        product_id = loader.get_product_id(28256)
+
+        mock_get.assert_called_once_with(
+            f"{BASE_URL}/products/28256", params={}, headers={}, timeout=15
+        )
+        product = BoostrProduct.objects.get(boostr_id=28256)
+        self.assertEqual(product_id, product.pk)
+        self.assertEqual(product.full_name, "Firefox New Tab US (CPC)")
+        self.assertEqual(loader.get_product_id(28256), product.pk)
+        mock_get.assert_called_once()
+
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_fail)
     def test_upsert_products_fail(self, mock_get, mock_post):
@@ -175,22 +240,12 @@ class TestSyncBoostrData(TestCase):
 
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_success)
-    @mock.patch(
-        "consvc_shepherd.models.BoostrDeal.objects.update_or_create",
-        side_effect=mock_update_or_create_deal,
-    )
     @mock.patch.object(BoostrLoader, "upsert_deal_products")
-    @mock.patch(
-        "consvc_shepherd.models.Advertiser.objects.update_or_create",
-        side_effect=mock_update_or_create_advertiser,
-    )
     @mock.patch.object(BoostrLoader, "create_campaign")
     def test_upsert_deals(
         self,
         mock_create_campaign,
-        mock_update_or_create_advertiser,
         mock_upsert_deal_products,
-        mock_update_or_create,
         mock_get,
         mock_post,
     ):
@@ -198,65 +253,141 @@ class TestSyncBoostrData(TestCase):
         loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD, {"max_deal_pages": 2})
         loader.upsert_deals()
 
-        advertiser_calls = [
-            mock.call(
-                name="Neutron",
-            ),
-            mock.call(
-                name="HiProduce",
-            ),
+        self.assertEqual(
+            sorted(Advertiser.objects.values_list("name", flat=True)),
+            ["HiProduce", "Neutron"],
+        )
+        self.assertEqual(BoostrDeal.objects.count(), 2)
+
+        neutron_deal = BoostrDeal.objects.get(boostr_id=1498421)
+        self.assertEqual(neutron_deal.name, "Neutron: Neutron US, DE, FR")
+        self.assertEqual(neutron_deal.advertiser, "Neutron")
+        self.assertEqual(neutron_deal.advertiser_id.name, "Neutron")
+        self.assertEqual(neutron_deal.currency, "$")
+        self.assertEqual(neutron_deal.amount, 50000)
+        self.assertEqual(neutron_deal.stage, BoostrDeal.Stages.VERBAL)
+        self.assertEqual(
+            neutron_deal.sales_representatives,
+            "ksales@mozilla.com,lsales@mozilla.com",
+        )
+        self.assertEqual(str(neutron_deal.start_date), "2024-04-01")
+        self.assertEqual(str(neutron_deal.end_date), "2024-06-30")
+
+        hiproduce_deal = BoostrDeal.objects.get(boostr_id=1482241)
+        self.assertEqual(hiproduce_deal.name, "HiProduce: CA Tiles May 2024")
+        self.assertEqual(hiproduce_deal.advertiser_id.name, "HiProduce")
+        self.assertEqual(hiproduce_deal.amount, 10000)
+        self.assertEqual(hiproduce_deal.stage, BoostrDeal.Stages.CLOSED_WON)
+        self.assertEqual(hiproduce_deal.sales_representatives, "jsales@mozilla.com")
+
+        # Campaigns are only created on the first page, when the deals and advertisers are new
+        self.assertEqual(mock_create_campaign.call_count, 2)
+        self.assertEqual(mock_upsert_deal_products.call_count, 4)
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    @mock.patch.object(BoostrLoader, "upsert_deal_products")
+    @mock.patch.object(BoostrLoader, "create_campaign")
+    def test_upsert_deals_updates_existing_deals(
+        self,
+        mock_create_campaign,
+        mock_upsert_deal_products,
+        mock_get,
+        mock_post,
+    ):
+        """Test that deals already in our DB are updated in place and don't get a new campaign"""
+        advertiser = Advertiser.objects.create(name="Neutron")
+        old_deal = BoostrDeal.objects.create(
+            boostr_id=1498421,
+            name="Old deal name",
+            advertiser="Old Neutron",
+            advertiser_id=advertiser,
+            currency="$",
+            amount=1,
+            stage=BoostrDeal.Stages.CLOSED_WON,
+            sales_representatives="",
+            start_date="2024-01-01",
+            end_date="2024-01-31",
+        )
+        Campaign.objects.create(
+            net_spend=1,
+            impressions_sold=0,
+            seller="",
+            deal=old_deal,
+            start_date="2024-01-01",
+            end_date="2024-01-31",
+        )
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD, {"max_deal_pages": 1})
+        loader.upsert_deals()
+
+        self.assertEqual(BoostrDeal.objects.count(), 2)
+        self.assertEqual(Advertiser.objects.count(), 2)
+        neutron_deal = BoostrDeal.objects.get(boostr_id=1498421)
+        self.assertEqual(neutron_deal.name, "Neutron: Neutron US, DE, FR")
+        self.assertEqual(neutron_deal.amount, 50000)
+        self.assertEqual(neutron_deal.advertiser_id, advertiser)
+        # The bulk upsert doesn't send signals, the loader refreshes the page's summaries itself
+        self.assertEqual(
+            CampaignSummary.objects.get(deal_id=neutron_deal.id).advertiser, "Neutron"
+        )
+        mock_create_campaign.assert_called_once_with(
+            BoostrDeal.objects.get(boostr_id=1482241)
+        )
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch.object(BoostrLoader, "fetch_deal_products", return_value=[])
+    @mock.patch.object(BoostrLoader, "upsert_deal_products")
+    @mock.patch.object(BoostrLoader, "create_campaign")
+    def test_upsert_deal_page_campaign_for_first_deal_of_new_advertiser(
+        self,
+        mock_create_campaign,
+        mock_upsert_deal_products,
+        mock_fetch_deal_products,
+        mock_post,
+    ):
+        """Test that only the first deal of a new advertiser gets a campaign, even when the advertiser has
+        several new deals on the page
+        """
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        deals = [
+            dict(MOCK_DEALS_RESPONSE[0], id=3, advertiser_name="New Advertiser"),
+            dict(MOCK_DEALS_RESPONSE[0], id=2, advertiser_name="New Advertiser"),
+            dict(MOCK_DEALS_RESPONSE[0], id=1, advertiser_name="Other Advertiser"),
         ]
-        mock_update_or_create_advertiser.assert_has_calls(advertiser_calls)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            loader.upsert_deal_page(1, deals, executor)
 
-        calls = [
-            mock.call(
-                boostr_id=1498421,
-                defaults={
-                    "name": "Neutron: Neutron US, DE, FR",
-                    "advertiser": "Neutron",
-                    "advertiser_id": Advertiser(
-                        id=1,
-                        name="Netron",
-                    ),
-                    "currency": "$",
-                    "amount": 50000,
-                    "stage": BoostrDeal.Stages.VERBAL,
-                    "sales_representatives": "ksales@mozilla.com,lsales@mozilla.com",
-                    "start_date": "2024-04-01",
-                    "end_date": "2024-06-30",
-                },
-            ),
-            mock.call(
-                boostr_id=1482241,
-                defaults={
-                    "name": "HiProduce: CA Tiles May 2024",
-                    "advertiser": "HiProduce",
-                    "advertiser_id": Advertiser(
-                        id=1,
-                        name="HiProduce",
-                    ),
-                    "currency": "$",
-                    "amount": 10000,
-                    "stage": BoostrDeal.Stages.CLOSED_WON,
-                    "sales_representatives": "jsales@mozilla.com",
-                    "start_date": "2024-05-01",
-                    "end_date": "2024-05-31",
-                },
+        self.assertEqual(
+            sorted(
+                call.args[0].boostr_id for call in mock_create_campaign.call_args_list
             ),
+            [1, 3],
+        )
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    def test_bulk_upsert_deals_query_count(self, mock_post):
+        """Test that a page of deals is written with a fixed number of queries regardless of its size"""
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        deals = [
+            dict(MOCK_DEALS_RESPONSE[i % 2], id=i, advertiser_name=f"Advertiser {i}")
+            for i in range(50)
         ]
-        mock_update_or_create.assert_has_calls(calls)
+        with self.assertNumQueries(3):
+            advertisers, created_advertisers = loader.upsert_advertisers(deals)
+        with self.assertNumQueries(3):
+            boostr_deals, created_deal_ids = loader.bulk_upsert_deals(
+                deals, advertisers
+            )
+        self.assertEqual(len(created_advertisers), 50)
+        self.assertEqual(len(boostr_deals), 50)
+        self.assertEqual(created_deal_ids, set(range(50)))
 
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_success_empty_response)
-    @mock.patch(
-        "consvc_shepherd.models.BoostrDeal.objects.update_or_create",
-        side_effect=mock_update_or_create_deal,
-    )
     @mock.patch.object(BoostrLoader, "upsert_deal_products")
     def test_upsert_deals_called_with_empty_response(
         self,
         mock_upsert_deal_products,
-        mock_update_or_create,
         mock_get,
         mock_post,
     ):
@@ -264,7 +395,100 @@ class TestSyncBoostrData(TestCase):
         loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
         loader.upsert_deals()
 
-        mock_update_or_create.assert_not_called()
+        self.assertFalse(BoostrDeal.objects.exists())
+        mock_upsert_deal_products.assert_not_called()
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    @mock.patch.object(BoostrLoader, "fetch_deal_products")
+    @mock.patch.object(BoostrLoader, "create_campaign")
+    def test_upsert_deals_fetches_deal_products_concurrently(
+        self,
+        mock_create_campaign,
+        mock_fetch_deal_products,
+        mock_get,
+        mock_post,
+    ):
+        """Test that the deal_products for a page of deals are fetched by parallel workers"""
+        # Each fetch waits for the other one, so this only completes if both run at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fetch_deal_products(deal):
+            barrier.wait()
+            return []
+
+        mock_fetch_deal_products.side_effect = fetch_deal_products
+        loader = BoostrLoader(
+            BASE_URL, EMAIL, PASSWORD, {"max_deal_pages": 1, "concurrency": 2}
+        )
+        loader.upsert_deals()
+        self.assertEqual(mock_fetch_deal_products.call_count, 2)
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get")
+    @mock.patch.object(BoostrLoader, "upsert_deal_page")
+    def test_upsert_deals_stops_fetching_at_first_empty_page(
+        self, mock_upsert_deal_page, mock_get, mock_post
+    ):
+        """Test that the page fetcher doesn't request any pages past the first empty one"""
+        mock_get.side_effect = [
+            MockResponse(MOCK_DEALS_RESPONSE, 200),
+            MockResponse(MOCK_DEALS_RESPONSE, 200),
+            MockResponse([], 200),
+            MockResponse(MOCK_DEALS_RESPONSE, 200),
+        ]
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        loader.upsert_deals()
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(
+            [c.args[0] for c in mock_upsert_deal_page.call_args_list], [1, 2]
+        )
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get")
+    @mock.patch.object(BoostrLoader, "upsert_deal_page")
+    def test_upsert_deals_prefetches_next_page(
+        self, mock_upsert_deal_page, mock_get, mock_post
+    ):
+        """Test that the next page of deals is fetched while the current page is being written"""
+        second_page_fetched = threading.Event()
+
+        def get_deals(url, params, **kwargs):
+            if params["page"] == "2":
+                second_page_fetched.set()
+            return MockResponse(
+                MOCK_DEALS_RESPONSE if params["page"] < "3" else [], 200
+            )
+
+        def upsert_deal_page(page, deals, executor):
+            if page == 1:
+                self.assertTrue(second_page_fetched.wait(timeout=5))
+
+        mock_get.side_effect = get_deals
+        mock_upsert_deal_page.side_effect = upsert_deal_page
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        loader.upsert_deals()
+        self.assertEqual(mock_upsert_deal_page.call_count, 2)
+
+    @mock.patch("time.sleep", return_value=None)
+    @mock.patch("time.monotonic", return_value=100.0)
+    def test_rate_limiter_spaces_requests_after_burst(self, mock_monotonic, mock_sleep):
+        """Test that the rate limiter lets a burst through, then waits for tokens to refill"""
+        limiter = RateLimiter(rate=2, burst=2)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(0.5), mock.call(1.0)])
+
+    def test_rate_limiter_pause_blocks_other_callers(self):
+        """Test that no caller can acquire the rate limiter while another caller has paused it"""
+        limiter = RateLimiter()
+        worker = threading.Thread(target=limiter.acquire)
+        with limiter.pause():
+            worker.start()
+            worker.join(timeout=0.1)
+            self.assertTrue(worker.is_alive())
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive())
 
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_fail)
@@ -276,17 +500,14 @@ class TestSyncBoostrData(TestCase):
 
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_success)
-    @mock.patch(
-        "consvc_shepherd.models.BoostrDeal.objects.update_or_create",
-        side_effect=mock_update_or_create_deal,
-    )
+    @mock.patch.object(BoostrLoader, "fetch_deal_products", return_value=[])
     @mock.patch.object(BoostrLoader, "upsert_deal_products")
     @mock.patch.object(BoostrLoader, "create_campaign")
     def test_upsert_deals_respects_max_deal_pages_limit(
         self,
-        mock_upsert_deal_products,
         mock_create_campaign,
-        mock_update_or_create,
+        mock_upsert_deal_products,
+        mock_fetch_deal_products,
         mock_get,
         mock_post,
     ):
@@ -296,21 +517,20 @@ class TestSyncBoostrData(TestCase):
         assert 3 == mock_get.call_count
         mock_create_campaign.assert_called()
 
+    @mock.patch("time.sleep", return_value=None)
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_success)
-    @mock.patch(
-        "consvc_shepherd.models.BoostrDeal.objects.update_or_create",
-        side_effect=mock_update_or_create_deal,
-    )
+    @mock.patch.object(BoostrLoader, "fetch_deal_products", return_value=[])
     @mock.patch.object(BoostrLoader, "upsert_deal_products")
     @mock.patch.object(BoostrLoader, "create_campaign")
     def test_upsert_deals_respects_default_max_deal_pages_limit(
         self,
-        mock_upsert_deal_products,
         mock_create_campaign,
-        mock_update_or_create,
+        mock_upsert_deal_products,
+        mock_fetch_deal_products,
         mock_get,
         mock_post,
+        mock_sleep,
     ):
         """Test that upsert_deals respects the default max_deal_pages limit"""
         loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
@@ -318,67 +538,133 @@ class TestSyncBoostrData(TestCase):
         assert 50 == mock_get.call_count
         mock_create_campaign.assert_called()
 
-    @mock.patch("requests.Session.post", side_effect=mock_post_success)
-    @mock.patch("requests.Session.get", side_effect=mock_get_success)
-    @mock.patch(
-        "consvc_shepherd.models.BoostrProduct.objects.get", side_effect=mock_get_product
-    )
-    @mock.patch("consvc_shepherd.models.BoostrDealProduct.objects.update_or_create")
-    def test_upsert_deal_products(
-        self, mock_update_or_create, mock_get_product, mock_get, mock_post
-    ):
-        """Test function that fetches the products per month and their budget for a particular deal"""
-        deal = BoostrDeal(
+    def create_deal_and_products(
+        self,
+    ) -> tuple[BoostrDeal, BoostrProduct, BoostrProduct]:
+        """Save the deal and products referenced by MOCK_DEAL_PRODUCTS_RESPONSE"""
+        deal = BoostrDeal.objects.create(
             boostr_id=1498421,
             name="Deal with Customer",
             advertiser="Customer, Inc",
             currency="$",
             amount=5000,
+            stage=BoostrDeal.Stages.CLOSED_WON,
             sales_representatives="asales@mozilla.com",
             start_date="2024-02-01",
             end_date="2024-05-31",
         )
+        fr_product = BoostrProduct.objects.create(
+            boostr_id=204410,
+            full_name="Firefox New Tab FR (CPM)",
+            country="FR",
+            campaign_type=BoostrProduct.CampaignType.CPM,
+        )
+        us_product = BoostrProduct.objects.create(
+            boostr_id=28256,
+            full_name="Firefox New Tab US (CPC)",
+            country="US",
+            campaign_type=BoostrProduct.CampaignType.CPC,
+        )
+        return deal, fr_product, us_product
+
+    def get_budgets(self, deal: BoostrDeal) -> set[tuple[int, str, int]]:
+        """Return the deal's (product boostr_id, month, budget) rows"""
+        return set(
+            BoostrDealProduct.objects.filter(boostr_deal=deal).values_list(
+                "boostr_product__boostr_id", "month", "budget"
+            )
+        )
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    def test_upsert_deal_products(self, mock_get, mock_post):
+        """Test function that fetches the products per month and their budget for a particular deal"""
+        deal, fr_product, us_product = self.create_deal_and_products()
         loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
         loader.upsert_deal_products(deal)
-        calls = [
-            mock.call(
-                boostr_deal=deal,
-                boostr_product=mock_get_product(boostr_id=204410),
-                month="2024-04",
-                budget=10000.0,
-            ),
-            mock.call(
-                boostr_deal=deal,
-                boostr_product=mock_get_product(boostr_id=204410),
-                month="2024-05",
-                budget=0.0,
-            ),
-            mock.call(
-                boostr_deal=deal,
-                boostr_product=mock_get_product(boostr_id=204410),
-                month="2024-06",
-                budget=0.0,
-            ),
-            mock.call(
-                boostr_deal=deal,
-                boostr_product=mock_get_product(boostr_id=28256),
-                month="2024-04",
-                budget=10000.0,
-            ),
-            mock.call(
-                boostr_deal=deal,
-                boostr_product=mock_get_product(boostr_id=28256),
-                month="2024-05",
-                budget=10000.0,
-            ),
-            mock.call(
-                boostr_deal=deal,
-                boostr_product=mock_get_product(boostr_id=28256),
-                month="2024-06",
-                budget=10000.0,
-            ),
-        ]
-        mock_update_or_create.assert_has_calls(calls)
+        self.assertEqual(
+            self.get_budgets(deal),
+            {
+                (204410, "2024-04", 10000),
+                (204410, "2024-05", 0),
+                (204410, "2024-06", 0),
+                (28256, "2024-04", 10000),
+                (28256, "2024-05", 10000),
+                (28256, "2024-06", 10000),
+            },
+        )
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    def test_upsert_deal_products_reconciles_existing_budgets(
+        self, mock_get, mock_post
+    ):
+        """Test that changed budgets are updated in place and months that are gone from Boostr are deleted"""
+        deal, fr_product, us_product = self.create_deal_and_products()
+        BoostrDealProduct.objects.bulk_create(
+            [
+                BoostrDealProduct(
+                    boostr_deal=deal,
+                    boostr_product=fr_product,
+                    month="2024-04",
+                    budget=1,
+                ),
+                BoostrDealProduct(
+                    boostr_deal=deal,
+                    boostr_product=fr_product,
+                    month="2024-05",
+                    budget=0,
+                ),
+                BoostrDealProduct(
+                    boostr_deal=deal,
+                    boostr_product=us_product,
+                    month="2024-03",
+                    budget=5,
+                ),
+            ]
+        )
+        unchanged_id = BoostrDealProduct.objects.get(month="2024-05").pk
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        loader.product_ids = {204410: fr_product.pk, 28256: us_product.pk}
+        deal_products = loader.fetch_deal_products(deal)
+
+        # One read, then a delete, an update and an insert inside a transaction
+        with self.assertNumQueries(6):
+            loader.upsert_deal_products(deal, deal_products)
+        self.assertEqual(
+            self.get_budgets(deal),
+            {
+                (204410, "2024-04", 10000),
+                (204410, "2024-05", 0),
+                (204410, "2024-06", 0),
+                (28256, "2024-04", 10000),
+                (28256, "2024-05", 10000),
+                (28256, "2024-06", 10000),
+            },
+        )
+        self.assertTrue(BoostrDealProduct.objects.filter(pk=unchanged_id).exists())
+
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    def test_upsert_deal_products_incremental_sync_keeps_other_products(
+        self, mock_get, mock_post
+    ):
+        """Test that an incremental sync only reconciles the products Boostr returned as changed"""
+        deal, fr_product, us_product = self.create_deal_and_products()
+        other_product = BoostrProduct.objects.create(
+            boostr_id=212592,
+            full_name="Firefox 2nd Tile CA (CPM)",
+            country="CA",
+            campaign_type=BoostrProduct.CampaignType.CPM,
+        )
+        BoostrDealProduct.objects.create(
+            boostr_deal=deal, boostr_product=other_product, month="2024-04", budget=7
+        )
+        loader = BoostrLoader(BASE_URL, EMAIL, PASSWORD)
+        loader.latest_synced_on = "2024-09-22 16:52:34.369769+00:00"
+        loader.upsert_deal_products(deal)
+        self.assertIn((212592, "2024-04", 7), self.get_budgets(deal))
+        self.assertEqual(len(self.get_budgets(deal)), 7)
 
     @mock.patch("requests.Session.post", side_effect=mock_post_success)
     @mock.patch("requests.Session.get", side_effect=mock_get_fail)
@@ -518,6 +804,26 @@ class TestSyncBoostrData(TestCase):
         ]
         mock_create.assert_has_calls(calls)
 
+    @mock.patch(
+        "consvc_shepherd.management.commands.sync_boostr_data.BoostrLoader.upsert_deals"
+    )
+    @mock.patch("requests.Session.post", side_effect=mock_post_success)
+    @mock.patch("requests.Session.get", side_effect=mock_get_success)
+    def test_load_bumps_data_generation_once(
+        self, mock_get, mock_post, mock_upsert_deals
+    ):
+        """Test a sync bumps the DataGeneration once when it finishes, rather than for every product it saves"""
+        generation = DataGeneration.current().generation
+
+        with mock.patch.object(
+            DataGeneration, "bump", wraps=DataGeneration.bump
+        ) as bump:
+            BoostrLoader(BASE_URL, EMAIL, PASSWORD).load()
+
+        self.assertEqual(BoostrProduct.objects.count(), 2)
+        bump.assert_called_once_with()
+        self.assertEqual(DataGeneration.current().generation, generation + 1)
+
     @mock.patch(
         "consvc_shepherd.management.commands.sync_boostr_data.BoostrLoader.upsert_deals",
         side_effect=mock_upsert_deals_exception,
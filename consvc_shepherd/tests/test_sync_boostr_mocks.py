@@ -2,13 +2,7 @@
 
 import requests
 
-from consvc_shepherd.models import (
-    Advertiser,
-    BoostrDeal,
-    BoostrDealProduct,
-    BoostrProduct,
-    BoostrSyncStatus,
-)
+from consvc_shepherd.models import BoostrDealProduct, BoostrProduct, BoostrSyncStatus
 from consvc_shepherd.tests.test_sync_boostr_mock_responses import (
     MOCK_DEAL_PRODUCTS_RESPONSE,
     MOCK_DEALS_RESPONSE,
@@ -119,56 +113,6 @@ def mock_get_success_response(*args, **kwargs) -> MockResponse:
     return MockResponse({"data": "success"}, 200)
 
 
-def mock_update_or_create_deal(*args, **kwargs) -> tuple[BoostrDeal, bool]:
-    """Mock out the DB for saving deals"""
-    return (
-        BoostrDeal(
-            boostr_id=kwargs["boostr_id"],
-            name=kwargs["defaults"]["name"],
-            advertiser=kwargs["defaults"]["advertiser"],
-            currency=kwargs["defaults"]["currency"],
-            amount=kwargs["defaults"]["amount"],
-            stage=kwargs["defaults"]["stage"],
-            sales_representatives=kwargs["defaults"]["sales_representatives"],
-            start_date=kwargs["defaults"]["start_date"],
-            end_date=kwargs["defaults"]["end_date"],
-        ),
-        True,
-    )
-
-
-def mock_update_or_create_advertiser(*args, **kwargs) -> tuple[Advertiser, bool]:
-    """Mock out the DB for saving Advertiser"""
-    return (
-        Advertiser(
-            id=1,
-            name=kwargs["name"],
-        ),
-        True,
-    )
-
-
-BOOSTR_PRODUCTS = {
-    28256: BoostrProduct(
-        boostr_id=28256,
-        full_name="Firefox New Tab US (CPC)",
-        country="US",
-        campaign_type=BoostrProduct.CampaignType.CPC,
-    ),
-    212592: BoostrProduct(
-        boostr_id=212592,
-        full_name="Firefox 2nd Tile CA (CPM)",
-        country="CA",
-        campaign_type=BoostrProduct.CampaignType.CPM,
-    ),
-    204410: BoostrProduct(
-        boostr_id=204410,
-        full_name="Firefox New Tab FR (CPM)",
-        country="SP",
-        campaign_type=BoostrProduct.CampaignType.CPM,
-    ),
-}
-
 BOOSTR_SYNC_STATUSES = {
     1: BoostrSyncStatus(
         id=1,
@@ -191,11 +135,6 @@ BOOSTR_SYNC_STATUSES = {
 }
 
 
-def mock_get_product(*args, **kwargs) -> BoostrProduct:
-    """Mock out retrieving a product from the DB"""
-    return BOOSTR_PRODUCTS[kwargs["boostr_id"]]
-
-
 def mock_get_latest_boostr_sync_status(*args, **kwargs) -> BoostrSyncStatus:
     """Mock out retrieving the latest boostr sync status from the DB"""
     return BOOSTR_SYNC_STATUSES[1]
@@ -1,28 +1,91 @@
 """Unit tests for the sync_bq_data command"""
 
 import os
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import MagicMock, patch
 
-import pandas as pd
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.test import TestCase
 
-from consvc_shepherd.management.commands.sync_bq_data import DeliveredFlight
+from consvc_shepherd.management.commands.sync_bq_data import BQSyncer, DeliveredFlight
+from consvc_shepherd.models import (
+    BoostrDeal,
+    BQSyncStatus,
+    Campaign,
+    CampaignSummary,
+    DeliveredFlightRollup,
+    Flight,
+)
 
 DEFAULT_PROJECT_ID = "moz-fx-ads-prod"
 DEFAULT_DATE = datetime.today().strftime("%Y-%m-%d")
 
 
+class FakeRowIterator:
+    """Stand-in for a BigQuery RowIterator that serves the given pages of rows"""
+
+    def __init__(self, pages: list[list[dict]]):
+        self._pages = pages
+        self.total_rows = sum(len(page) for page in pages)
+
+    @property
+    def pages(self):
+        """Yield each page of rows, like RowIterator.pages"""
+        yield from self._pages
+
+
+def make_row(
+    flight_id: int = 100,
+    clicks: int = 10,
+    impressions: int = 100,
+    submission_date: date = date(2024, 9, 18),
+    campaign_id: int = 1,
+    campaign_name: str | None = "Campaign 1",
+    flight_name: str | None = "Flight 1",
+    provider: str | None = "Provider 1",
+) -> dict:
+    """Build a row shaped like the ones returned by BQSyncer's query"""
+    return {
+        "submission_date": submission_date,
+        "campaign_id": campaign_id,
+        "campaign_name": campaign_name,
+        "flight_id": flight_id,
+        "flight_name": flight_name,
+        "provider": provider,
+        "clicks": clicks,
+        "impressions": impressions,
+    }
+
+
+def mock_query_results(mock_bigquery_client, pages: list[list[dict]]) -> None:
+    """Have the mocked BigQuery client return the given pages of rows for any query"""
+    mock_query_job = MagicMock()
+    mock_query_job.result.return_value = FakeRowIterator(pages)
+    mock_bigquery_client.return_value.query.return_value = mock_query_job
+
+
+def mock_query_results_by_date(
+    mock_bigquery_client, pages_by_date: dict[str, list[list[dict]]]
+) -> None:
+    """Have the mocked BigQuery client return the pages of rows for the queried submission_date"""
+
+    def query(_query, job_config):
+        submission_date = str(job_config.query_parameters[0].value)
+        mock_query_job = MagicMock()
+        mock_query_job.result.return_value = FakeRowIterator(
+            pages_by_date.get(submission_date, [])
+        )
+        return mock_query_job
+
+    mock_bigquery_client.return_value.query.side_effect = query
+
+
 class TestBQSyncerData(TestCase):
     """Unit tests for functions that fetch from BigQuery and store in our DB"""
 
     @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
-    @patch(
-        "consvc_shepherd.management.commands.sync_bq_data.DeliveredFlight.objects.update_or_create"
-    )
-    @patch("consvc_shepherd.management.commands.sync_bq_data.BQSyncer.query_bq")
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
     @patch(
         "consvc_shepherd.management.commands.sync_bq_data.BQSyncer.update_sync_status"
@@ -31,52 +94,29 @@ class TestBQSyncerData(TestCase):
         self,
         mock_update_sync_status,
         mock_bigquery_client,
-        mock_query_bq,
-        mock_update_or_create,
     ):
         """Test that sync_data inserts data into DB when BQ query is successful"""
-        mock_query_job = MagicMock()
-        mock_query_job.result.return_value.total_rows = 1
-        mock_query_job.result.return_value.to_dataframe.return_value = pd.DataFrame(
-            {
-                "submission_date": ["2024-09-18"],
-                "campaign_id": [1],
-                "campaign_name": ["Campaign 1"],
-                "flight_id": [100],
-                "flight_name": ["Flight 1"],
-                "provider": ["Provider 1"],
-                "clicks": [10],
-                "impressions": [100],
-            }
-        )
-
-        mock_query_bq.return_value = mock_query_job.result.return_value.to_dataframe()
-        mock_bigquery_client.return_value.query.return_value = mock_query_job
-        mock_update_or_create.return_value = (MagicMock(), True)
+        mock_query_results(mock_bigquery_client, [[make_row()]])
 
         with self.assertLogs("sync_bigquery_ads_data", level="INFO") as log:
             call_command("sync_bq_data", date="2024-09-18")
 
-        mock_query_bq.assert_called_once()
-
-        mock_update_or_create.assert_called_once_with(
-            submission_date="2024-09-18",
-            campaign_id=1,
-            flight_id=100,
-            provider="Provider 1",
-            defaults={
-                "campaign_name": "Campaign 1",
-                "flight_name": "Flight 1",
-                "clicks_delivered": 10,
-                "impressions_delivered": 100,
-            },
-        )
-
-        self.assertIn("Created new DeliveredFlight", log.output[0])
+        flight = DeliveredFlight.objects.get()
+        self.assertEqual(flight.submission_date, date(2024, 9, 18))
+        self.assertEqual(flight.campaign_id, 1)
+        self.assertEqual(flight.campaign_name, "Campaign 1")
+        self.assertEqual(flight.flight_id, 100)
+        self.assertEqual(flight.flight_name, "Flight 1")
+        self.assertEqual(flight.provider, "Provider 1")
+        self.assertEqual(flight.clicks_delivered, 10)
+        self.assertEqual(flight.impressions_delivered, 100)
 
+        self.assertIn(
+            "Upserted page 1 of DeliveredFlights: 1 created, 0 updated", log.output[1]
+        )
         self.assertIn(
             "BigQuery sync process has completed successfully. Updating sync_status",
-            log.output[1],
+            log.output[-1],
         )
 
         mock_update_sync_status.assert_called_once_with(
@@ -84,14 +124,9 @@ class TestBQSyncerData(TestCase):
         )
 
     @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
-    @patch(
-        "consvc_shepherd.management.commands.sync_bq_data.DeliveredFlight.objects.update_or_create"
-    )
     @patch("consvc_shepherd.management.commands.sync_bq_data.BQSyncer.sync_data")
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
-    def test_sync_data_failure(
-        self, mock_bigquery_client, mock_sync_data, mock_update_or_create
-    ):
+    def test_sync_data_failure(self, mock_bigquery_client, mock_sync_data):
         """Test that sync_data logs errors and doesn't try to upsert into shepherd DB if BQ query fails"""
         mock_sync_data.side_effect = Exception(
             "An error occurred while querying BigQuery"
@@ -107,96 +142,37 @@ class TestBQSyncerData(TestCase):
             str(context.exception),
         )
 
-        mock_update_or_create.assert_not_called()
+        self.assertFalse(DeliveredFlight.objects.exists())
 
     @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
-    @patch(
-        "consvc_shepherd.management.commands.sync_bq_data.DeliveredFlight.objects.update_or_create"
-    )
-    @patch("consvc_shepherd.management.commands.sync_bq_data.BQSyncer.query_bq")
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
-    def test_sync_same_flight_updates_clicks_impressions(
-        self, mock_bigquery_client, mock_query_bq, mock_update_or_create
-    ):
+    def test_sync_same_flight_updates_clicks_impressions(self, mock_bigquery_client):
         """Test that adding two exact flights will update number of clicks and impressions"""
-        mock_query_job = MagicMock()
-        mock_query_job.result.return_value.to_dataframe.return_value = pd.DataFrame(
-            {
-                "submission_date": ["2024-09-18", "2024-09-18"],
-                "campaign_id": [1, 1],
-                "campaign_name": ["Campaign 1", "Campaign 1"],
-                "flight_id": [100, 100],
-                "flight_name": ["Flight 1", "Flight 1"],
-                "provider": ["Provider 1", "Provider 1"],
-                "clicks": [10, 15],
-                "impressions": [100, 120],
-            }
-        )
-
-        mock_query_bq.return_value = mock_query_job.result.return_value.to_dataframe()
-        mock_bigquery_client.return_value.query.return_value = mock_query_job
-
-        mock_flight_instance = MagicMock(spec=DeliveredFlight)
-        mock_flight_instance.clicks_delivered = 10
-        mock_flight_instance.impressions_delivered = 100
-
-        # Simulate the side effect of the `update_or_create` calls
-        def mock_update_or_create_effect(*args, **kwargs):
-            if kwargs["defaults"]["clicks_delivered"] == 10:
-                return (mock_flight_instance, True)
-            elif kwargs["defaults"]["clicks_delivered"] == 15:
-                mock_flight_instance.clicks_delivered = 15
-                mock_flight_instance.impressions_delivered = 120
-                return (mock_flight_instance, False)
-
-        mock_update_or_create.side_effect = mock_update_or_create_effect
+        mock_query_results(
+            mock_bigquery_client,
+            [
+                [make_row(clicks=10, impressions=100)],
+                [make_row(clicks=15, impressions=120)],
+            ],
+        )
 
         with self.assertLogs("sync_bigquery_ads_data", level="INFO") as log:
             call_command("sync_bq_data", date="2024-09-18")
 
-        self.assertEqual(mock_update_or_create.call_count, 2)
-
-        mock_update_or_create.assert_any_call(
-            submission_date="2024-09-18",
-            campaign_id=1,
-            flight_id=100,
-            provider="Provider 1",
-            defaults={
-                "campaign_name": "Campaign 1",
-                "flight_name": "Flight 1",
-                "clicks_delivered": 10,
-                "impressions_delivered": 100,
-            },
-        )
-
-        mock_update_or_create.assert_any_call(
-            submission_date="2024-09-18",
-            campaign_id=1,
-            flight_id=100,
-            provider="Provider 1",
-            defaults={
-                "campaign_name": "Campaign 1",
-                "flight_name": "Flight 1",
-                "clicks_delivered": 15,
-                "impressions_delivered": 120,
-            },
-        )
-
-        self.assertEqual(mock_flight_instance.clicks_delivered, 15)
-        self.assertEqual(mock_flight_instance.impressions_delivered, 120)
+        flight = DeliveredFlight.objects.get()
+        self.assertEqual(flight.clicks_delivered, 15)
+        self.assertEqual(flight.impressions_delivered, 120)
 
         self.assertIn(
-            "INFO:sync_bigquery_ads_data:Created new DeliveredFlight", log.output[0]
+            "INFO:sync_bigquery_ads_data:Upserted page 1 of DeliveredFlights: 1 created, 0 updated",
+            log.output[1],
         )
         self.assertIn(
-            "INFO:sync_bigquery_ads_data:Updated DeliveredFlight", log.output[1]
+            "INFO:sync_bigquery_ads_data:Upserted page 2 of DeliveredFlights: 0 created, 1 updated",
+            log.output[2],
         )
 
     @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
-    @patch(
-        "consvc_shepherd.management.commands.sync_bq_data.DeliveredFlight.objects.update_or_create"
-    )
-    @patch("consvc_shepherd.management.commands.sync_bq_data.BQSyncer.query_bq")
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
     @patch(
         "consvc_shepherd.management.commands.sync_bq_data.BQSyncer.update_sync_status"
@@ -205,43 +181,40 @@ class TestBQSyncerData(TestCase):
         self,
         mock_update_sync_status,
         mock_bigquery_client,
-        mock_query_bq,
-        mock_update_or_create,
     ):
         """Test that sync_data processes multiple rows returned from BigQuery"""
-        mock_query_job = MagicMock()
-        mock_query_job.result.return_value.total_rows = 2
-        mock_query_job.result.return_value.to_dataframe.return_value = pd.DataFrame(
-            {
-                "submission_date": ["2024-09-18", "2024-09-18"],
-                "campaign_id": [1, 2],
-                "campaign_name": ["Campaign 1", "Campaign 2"],
-                "flight_id": [100, 101],
-                "flight_name": ["Flight 1", "Flight 2"],
-                "provider": ["Provider 1", "Provider 2"],
-                "clicks": [10, 20],
-                "impressions": [100, 200],
-            }
+        mock_query_results(
+            mock_bigquery_client,
+            [
+                [
+                    make_row(flight_id=100, campaign_id=1, provider="Provider 1"),
+                    make_row(
+                        flight_id=101,
+                        campaign_id=2,
+                        campaign_name="Campaign 2",
+                        flight_name="Flight 2",
+                        provider="Provider 2",
+                        clicks=20,
+                        impressions=200,
+                    ),
+                ]
+            ],
         )
 
-        mock_query_bq.return_value = mock_query_job.result.return_value.to_dataframe()
-        mock_bigquery_client.return_value.query.return_value = mock_query_job
-
-        mock_update_or_create.return_value = (MagicMock(), True)
-
         with self.assertLogs("sync_bigquery_ads_data", level="INFO") as log:
             call_command("sync_bq_data", date="2024-09-18")
 
-        mock_query_bq.assert_called_once()
-
-        self.assertEqual(mock_update_or_create.call_count, 2)
-
-        self.assertIn("Created new DeliveredFlight", log.output[0])
-
-        self.assertIn("Created new DeliveredFlight", log.output[1])
+        self.assertEqual(
+            list(
+                DeliveredFlight.objects.order_by("flight_id").values_list(
+                    "flight_id", "provider", "clicks_delivered", "impressions_delivered"
+                )
+            ),
+            [(100, "Provider 1", 10, 100), (101, "Provider 2", 20, 200)],
+        )
 
         self.assertIn(
-            "BigQuery sync process has completed successfully. Updating sync_status",
+            "Upserted DeliveredFlights for date 2024-09-18: 2 created, 0 updated",
             log.output[2],
         )
 
@@ -250,71 +223,89 @@ class TestBQSyncerData(TestCase):
         )
 
     @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
-    @patch("consvc_shepherd.management.commands.sync_bq_data.BQSyncer.query_bq")
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
-    @patch(
-        "consvc_shepherd.management.commands.sync_bq_data.DeliveredFlight.objects.update_or_create"
-    )
-    def test_sync_data_default_arguments(
-        self, mock_update_or_create, mock_bigquery_client, mock_query_bq
-    ):
+    def test_sync_data_default_arguments(self, mock_bigquery_client):
         """Test the sync_bq_data command without arguments defaults to today's date"""
-        mock_query_job = MagicMock()
-        mock_query_job.result.return_value.total_rows = 1
-        mock_query_job.result.return_value.to_dataframe.return_value = pd.DataFrame(
-            {
-                "submission_date": [DEFAULT_DATE],
-                "campaign_id": [1],
-                "campaign_name": ["Campaign 1"],
-                "flight_id": [100],
-                "flight_name": ["Flight 1"],
-                "provider": ["Provider 1"],
-                "clicks": [10],
-                "impressions": [100],
-            }
+        mock_query_results(
+            mock_bigquery_client,
+            [[make_row(submission_date=date.fromisoformat(DEFAULT_DATE))]],
         )
 
-        mock_query_bq.return_value = mock_query_job.result.return_value.to_dataframe()
-        mock_bigquery_client.return_value.query.return_value = mock_query_job
-        mock_update_or_create.return_value = (MagicMock(), True)
-
         call_command("sync_bq_data")
 
-        mock_query_bq.assert_called_once()
-
-        mock_update_or_create.assert_called_once_with(
-            submission_date=DEFAULT_DATE,
-            campaign_id=1,
-            flight_id=100,
-            provider="Provider 1",
-            defaults={
-                "campaign_name": "Campaign 1",
-                "flight_name": "Flight 1",
-                "clicks_delivered": 10,
-                "impressions_delivered": 100,
-            },
+        job_config = mock_bigquery_client.return_value.query.call_args.kwargs[
+            "job_config"
+        ]
+        self.assertEqual(str(job_config.query_parameters[0].value), DEFAULT_DATE)
+        self.assertEqual(
+            str(DeliveredFlight.objects.get().submission_date), DEFAULT_DATE
         )
 
     @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
-    @patch(
-        "consvc_shepherd.management.commands.sync_bq_data.DeliveredFlight.objects.update_or_create"
-    )
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
-    def test_no_data_returned_for_date(
-        self, mock_bigquery_client, mock_update_or_create
-    ):
+    def test_no_data_returned_for_date(self, mock_bigquery_client):
         """Test the command raises an error if BigQuery doesn't return data for a given date"""
-        mock_query_job = MagicMock()
-        mock_query_job.result.return_value.total_rows = 0
-        mock_query_job.result.return_value.to_dataframe.return_value = pd.DataFrame()
-
-        mock_bigquery_client.return_value.query.return_value = mock_query_job
+        mock_query_results(mock_bigquery_client, [])
 
         with self.assertRaises(CommandError) as context:
             call_command("sync_bq_data", date="2024-09-18")
 
         self.assertIn("No data returned for date 2024-09-18", str(context.exception))
-        mock_update_or_create.assert_not_called()
+        self.assertFalse(DeliveredFlight.objects.exists())
+
+    def test_upsert_data_keeps_names_when_missing(self):
+        """Test that a row without campaign or flight names doesn't blank out the names we already have"""
+        syncer = BQSyncer("test-project", "2024-09-18")
+        syncer.upsert_data(FakeRowIterator([[make_row()]]))
+        syncer.upsert_data(
+            FakeRowIterator([[make_row(clicks=30, campaign_name=None, flight_name="")]])
+        )
+
+        flight = DeliveredFlight.objects.get()
+        self.assertEqual(flight.campaign_name, "Campaign 1")
+        self.assertEqual(flight.flight_name, "Flight 1")
+        self.assertEqual(flight.clicks_delivered, 30)
+
+    def test_upsert_data_updates_flights_without_provider(self):
+        """Test that re-syncing a flight without a provider updates it instead of adding a duplicate"""
+        syncer = BQSyncer("test-project", "2024-09-18")
+        syncer.upsert_data(FakeRowIterator([[make_row(provider=None)]]))
+        syncer.upsert_data(FakeRowIterator([[make_row(provider=None, clicks=25)]]))
+
+        flight = DeliveredFlight.objects.get()
+        self.assertIsNone(flight.provider)
+        self.assertEqual(flight.clicks_delivered, 25)
+
+    def test_upsert_data_query_count(self):
+        """Test that each page of rows is written with a fixed number of queries regardless of its size"""
+        syncer = BQSyncer("test-project", "2024-09-18")
+        pages = [
+            [make_row(flight_id=page * 100 + i) for i in range(100)]
+            for page in range(3)
+        ]
+        # Per page: a savepoint, locking the submission_date and the previous rows, the INSERT, the rollup update
+        # and the savepoint release
+        with self.assertNumQueries(18):
+            syncer.upsert_data(FakeRowIterator(pages))
+        self.assertEqual(DeliveredFlight.objects.count(), 300)
+        self.assertEqual(DeliveredFlightRollup.objects.count(), 300)
+
+    def test_upsert_data_locks_submission_dates(self):
+        """Test that a sync holds a lock on the dates it upserted until it commits, so that an overlapping sync
+        of the same date waits instead of adding the same new rows to the rollups again
+        """
+        BQSyncer("test-project", "2024-09-18").upsert_data(
+            FakeRowIterator([[make_row(submission_date=date(2024, 9, 18))]])
+        )
+
+        other_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(other_connection.close)
+        with other_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_lock(hashtext(%s)), pg_try_advisory_lock(hashtext(%s))",
+                ["sync_bq_data.2024-09-18", "sync_bq_data.2024-09-17"],
+            )
+            self.assertEqual(cursor.fetchone(), (False, True))
 
     @patch.dict(os.environ, {"PROJECT_ID": "invalid_project_id"})
     @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
@@ -336,3 +327,211 @@ class TestBQSyncerData(TestCase):
         self.assertIn(
             "Invalid date format. Please use YYYY-MM-DD", str(context.exception)
         )
+
+    @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
+    @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
+    def test_sync_date_range(self, mock_bigquery_client):
+        """Test that a date range is synced day by day through one BigQuery client, with a sync status per day"""
+        dates = ["2024-09-16", "2024-09-17", "2024-09-18"]
+        mock_query_results_by_date(
+            mock_bigquery_client,
+            {
+                day: [[make_row(submission_date=date.fromisoformat(day), clicks=index)]]
+                for index, day in enumerate(dates)
+            },
+        )
+
+        call_command(
+            "sync_bq_data",
+            start_date="2024-09-16",
+            end_date="2024-09-18",
+            concurrency=2,
+        )
+
+        mock_bigquery_client.assert_called_once_with(project="test-project")
+        self.assertEqual(mock_bigquery_client.return_value.query.call_count, 3)
+        self.assertEqual(
+            [
+                (str(submission_date), clicks)
+                for submission_date, clicks in DeliveredFlight.objects.order_by(
+                    "submission_date"
+                ).values_list("submission_date", "clicks_delivered")
+            ],
+            [(day, index) for index, day in enumerate(dates)],
+        )
+        self.assertEqual(
+            [
+                (query_date.strftime("%Y-%m-%d"), status)
+                for query_date, status in BQSyncStatus.objects.order_by(
+                    "query_date"
+                ).values_list("query_date", "status")
+            ],
+            [(day, "success") for day in dates],
+        )
+
+    @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
+    @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
+    def test_sync_date_range_continues_past_failed_dates(self, mock_bigquery_client):
+        """Test that a day without data is recorded as a failure without stopping the rest of the range"""
+        mock_query_results_by_date(
+            mock_bigquery_client,
+            {
+                "2024-09-16": [[make_row(submission_date=date(2024, 9, 16))]],
+                "2024-09-18": [[make_row(submission_date=date(2024, 9, 18))]],
+            },
+        )
+
+        with self.assertRaises(CommandError) as context:
+            call_command("sync_bq_data", start_date="2024-09-16", end_date="2024-09-18")
+
+        self.assertIn(
+            "BigQuery sync failed for dates: 2024-09-17", str(context.exception)
+        )
+        self.assertEqual(DeliveredFlight.objects.count(), 2)
+        self.assertEqual(
+            [
+                (query_date.strftime("%Y-%m-%d"), status, message)
+                for query_date, status, message in BQSyncStatus.objects.order_by(
+                    "query_date"
+                ).values_list("query_date", "status", "message")
+            ],
+            [
+                ("2024-09-16", "success", "BigQuery sync success"),
+                ("2024-09-17", "failure", "No data returned for date 2024-09-17"),
+                ("2024-09-18", "success", "BigQuery sync success"),
+            ],
+        )
+
+    @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
+    def test_invalid_date_range(self):
+        """Test that the command raises CommandError for incomplete or reversed date ranges"""
+        with self.assertRaises(CommandError) as context:
+            call_command("sync_bq_data", start_date="2024-09-16")
+        self.assertIn(
+            "--start-date and --end-date must be used together", str(context.exception)
+        )
+
+        with self.assertRaises(CommandError) as context:
+            call_command("sync_bq_data", start_date="2024-09-18", end_date="2024-09-16")
+        self.assertIn(
+            "--start-date must not be after --end-date", str(context.exception)
+        )
+
+    @patch.dict(os.environ, {"PROJECT_ID": "test-project"})
+    @patch("consvc_shepherd.management.commands.sync_bq_data.bigquery.Client")
+    def test_sync_refreshes_campaign_summaries(self, mock_bigquery_client):
+        """Test that a sync refreshes the CampaignSummaries of the deals whose flights were delivered"""
+        deal_ids = []
+        for flight_id in [100, 200]:
+            deal = BoostrDeal.objects.create(
+                boostr_id=flight_id,
+                name=f"Deal {flight_id}",
+                advertiser=f"Advertiser {flight_id}",
+                currency="$",
+                amount=10000,
+                sales_representatives="Rep1",
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+            )
+            campaign = Campaign.objects.create(
+                net_spend=10000,
+                impressions_sold=6000,
+                seller="Seller",
+                deal=deal,
+                start_date="2024-01-01",
+                end_date="2024-12-31",
+            )
+            Flight.objects.create(campaign=campaign, kevel_flight_id=flight_id)
+            deal_ids.append(deal.id)
+        # A delivery written in bulk, so without signals, that the sync doesn't touch either. The second
+        # deal's summary stays stale.
+        DeliveredFlight.objects.bulk_create(
+            [
+                DeliveredFlight(
+                    submission_date="2024-09-17",
+                    campaign_id=2,
+                    flight_id=200,
+                    provider="Provider 1",
+                    clicks_delivered=1,
+                    impressions_delivered=5,
+                )
+            ]
+        )
+        mock_query_results(
+            mock_bigquery_client, [[make_row(flight_id=100, impressions=100)]]
+        )
+
+        call_command("sync_bq_data", date="2024-09-18")
+
+        self.assertEqual(
+            list(
+                CampaignSummary.objects.order_by("deal_id").values_list(
+                    "deal_id", "impressions_delivered"
+                )
+            ),
+            [(deal_ids[0], 100), (deal_ids[1], 0)],
+        )
+
+    def test_upsert_data_updates_rollups(self):
+        """Test that upserting DeliveredFlights adds the change in their clicks and impressions to the rollups"""
+        syncer = BQSyncer("test-project", "2024-09-18")
+        syncer.upsert_data(
+            FakeRowIterator(
+                [
+                    [
+                        make_row(submission_date=date(2024, 9, 17), clicks=5),
+                        make_row(
+                            submission_date=date(2024, 9, 17),
+                            provider="Provider 2",
+                            clicks=1,
+                            impressions=50,
+                        ),
+                        make_row(flight_id=200, provider=None, clicks=3),
+                    ]
+                ]
+            )
+        )
+        syncer.upsert_data(
+            FakeRowIterator(
+                [
+                    [
+                        make_row(submission_date=date(2024, 9, 18), clicks=10),
+                        make_row(submission_date=date(2024, 9, 17), clicks=7),
+                        make_row(flight_id=200, provider=None, clicks=4),
+                    ]
+                ]
+            )
+        )
+
+        self.assertEqual(
+            list(
+                DeliveredFlightRollup.objects.order_by("flight_id").values_list(
+                    "flight_id",
+                    "clicks_delivered",
+                    "impressions_delivered",
+                    "first_seen",
+                    "last_seen",
+                )
+            ),
+            [
+                (100, 7 + 1 + 10, 100 + 50 + 100, date(2024, 9, 17), date(2024, 9, 18)),
+                (200, 4, 100, date(2024, 9, 18), date(2024, 9, 18)),
+            ],
+        )
+        self.assertEqual(DeliveredFlight.objects.filter(provider=None).count(), 1)
+
+        # The incremental totals match rebuilding the rollups from scratch
+        incremental = list(DeliveredFlightRollup.objects.order_by("flight_id").values())
+        DeliveredFlightRollup.rebuild()
+        self.assertEqual(
+            [
+                {key: value for key, value in rollup.items() if key != "id"}
+                for rollup in incremental
+            ],
+            [
+                {key: value for key, value in rollup.items() if key != "id"}
+                for rollup in DeliveredFlightRollup.objects.order_by(
+                    "flight_id"
+                ).values()
+            ],
+        )
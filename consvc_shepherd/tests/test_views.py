@@ -10,7 +10,7 @@ from consvc_shepherd.models import (
     PartnerAllocation,
     SettingsSnapshot,
 )
-from consvc_shepherd.preview import Ads, Rectangle, Spoc, Tile
+from consvc_shepherd.preview import FORM_FACTORS, Ads, Rectangle, Spoc, Tile
 from contile.models import Partner
 
 
@@ -267,3 +267,83 @@ class TestPreviewView(TestCase):
             # Check the Rectangles section
             self.assertContains(response, "https://picsum.photos/300/250")
             self.assertContains(response, "example4.com")
+
+    def test_preview_view_partial_failure(self):
+        """Test that the preview view shows the ads it got along with the failed request"""
+        ads = self.createMockAds()
+        ads.errors.append("AMP tiles: read timed out")
+        with mock.patch("consvc_shepherd.preview.get_ads", return_value=ads):
+            response = self.client.get("/preview")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Play Anvil of the Ages Now for Free")
+        self.assertContains(response, "AMP tiles: read timed out")
+        self.assertNotContains(response, "&#x2705;ok")
+
+    def test_preview_view_nocache(self):
+        """Test that ?nocache=1 makes the preview view skip the cached ads"""
+        with mock.patch(
+            "consvc_shepherd.preview.get_ads", return_value=self.createMockAds()
+        ) as mock_get_ads:
+            self.client.get("/preview")
+            response = self.client.get("/preview", {"nocache": "1"})
+
+        self.assertEqual(
+            [call.kwargs["use_cache"] for call in mock_get_ads.call_args_list],
+            [True, False],
+        )
+        self.assertContains(response, 'name="nocache" value="1" checked')
+
+
+@override_settings(DEBUG=True)
+class TestPreviewGridView(TestCase):
+    """Test of PreviewGridView."""
+
+    def test_preview_grid_view(self):
+        """Test that the grid view renders a cell per selected country and form factor"""
+        ads = TestPreviewView().createMockAds()
+        with mock.patch(
+            "consvc_shepherd.preview.get_ads", return_value=ads
+        ) as mock_get_ads:
+            response = self.client.get(
+                "/preview/grid",
+                {"env": "production", "country": ["US", "DE"], "form_factor": "mobile"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_ads.call_count, 2)
+        self.assertEqual(
+            [
+                [cell.country["code"] for cell in row]
+                for row in response.context["grid"]
+            ],
+            [["US"], ["DE"]],
+        )
+        self.assertContains(response, "<h1>MARS Ads Preview Grid</h1>")
+        self.assertContains(response, "<th>Mobile</th>")
+        self.assertContains(response, "<th>Germany</th>")
+        self.assertContains(response, "Play Anvil of the Ages Now for Free", count=2)
+        self.assertContains(response, " ms</div>", count=2)
+
+    def test_preview_grid_view_without_countries(self):
+        """Test that only the form is rendered, without requesting any ads, until a country is selected"""
+        with mock.patch("consvc_shepherd.preview.get_ads") as mock_get_ads:
+            response = self.client.get("/preview/grid")
+
+        self.assertEqual(response.status_code, 200)
+        mock_get_ads.assert_not_called()
+        self.assertEqual(response.context["grid"], [])
+        self.assertContains(response, 'name="country" value="US"/>')
+        self.assertContains(response, "Select at least one country to preview its ads.")
+        self.assertNotContains(response, "preview-grid")
+
+    def test_preview_grid_view_defaults_to_all_form_factors(self):
+        """Test that the grid covers every form factor when none are selected"""
+        with mock.patch(
+            "consvc_shepherd.preview.get_ads",
+            return_value=TestPreviewView().createMockAds(),
+        ) as mock_get_ads:
+            response = self.client.get("/preview/grid", {"country": "US"})
+
+        self.assertEqual(len(response.context["grid"]), 1)
+        self.assertEqual(mock_get_ads.call_count, len(FORM_FACTORS))
@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import include, path
 
 from consvc_shepherd.models import AllocationSetting
-from consvc_shepherd.preview import PreviewView
+from consvc_shepherd.preview import PreviewGridView, PreviewView
 from consvc_shepherd.views import (
     AllocationCreateView,
     AllocationSettingList,
@@ -40,6 +40,7 @@ urlpatterns = [
     ),
     path("allocation/<int:pk>/", AllocationUpdateView.as_view()),
     path("preview", PreviewView.as_view()),
+    path("preview/grid", PreviewGridView.as_view()),
     path("", TableOverview.as_view()),
     path("api/v1/", include("consvc_shepherd.api.urls")),
 ]
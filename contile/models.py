@@ -15,6 +15,15 @@ INVALID_PREFIX_PATH_ERROR: str = (
     "Prefix paths can't be just '/' but needs to end with '/' "
 )
 INVALID_PATH_ERROR: str = "All paths need to start '/'"
+# The columns advertisers_to_dict groups, in the order they're sorted on
+AD_URL_COLUMNS: tuple[str, ...] = (
+    "pk",
+    "name",
+    "ad_urls__geo",
+    "ad_urls__domain",
+    "ad_urls__path",
+    "ad_urls__matching",
+)
 
 
 class Partner(models.Model):
@@ -33,8 +42,8 @@ class Partner(models.Model):
     def to_dict(self) -> dict[str, Any]:
         """Convert Advertiser instances into a single dictionary object.
 
-        A partner dictionary of all advertiser instances is created by calling
-        each Advertiser model's to_dict() method iteratively.  The result is a
+        A partner dictionary of all advertiser instances is created from one
+        query over the advertisers and their urls.  The result is a
         dictionary of dictionaries, each mapping to individual advertisers. See
         the  Advertiser.to_dict() method for additional context.
 
@@ -43,11 +52,7 @@ class Partner(models.Model):
         dict
             a dictionary mapping of adm_advertisers to each advertiser dictionary object.
         """
-        partner_dict = {}
-        for advertiser in self.advertisers.all():  # type: ignore [attr-defined]
-            partner_dict.update(advertiser.to_dict())
-
-        return {"adm_advertisers": partner_dict}
+        return {"adm_advertisers": advertisers_to_dict(self.advertisers.all())}  # type: ignore [attr-defined]
 
     def __str__(self):
         """Return string representation of Partner model."""
@@ -89,30 +94,7 @@ class Advertiser(models.Model):
         dict
             a dictionary mapping of the advertiser name to a dictionary object of attributes.
         """
-        result: dict = {}
-        geo_domain_combos = (
-            self.ad_urls.all()  # type: ignore [attr-defined]
-            .values_list("geo", "domain")
-            .distinct()
-            .order_by("geo", "domain")
-        )
-
-        for geo, domain in geo_domain_combos:
-            ad_urls = self.ad_urls.filter(geo=geo, domain=domain).order_by(  # type: ignore [attr-defined]
-                "path"
-            )
-            paths = [
-                {
-                    "value": ad_url.path,
-                    "matching": ad_url.get_matching_display(),
-                }
-                for ad_url in ad_urls
-            ]
-            if geo not in result:
-                result[geo] = []
-            result[geo].append({"host": domain, "paths": paths})
-
-        return {self.name: result}
+        return advertisers_to_dict(Advertiser.objects.filter(pk=self.pk))
 
     def __str__(self):
         """Return string representation of Advertiser model."""
@@ -217,3 +199,38 @@ def is_valid_host(host: str) -> None:
         raise ValidationError(
             f"{host}: hostnames should have the structure <leaf-domain>.<second-level-domain>.<top-domain(s)>"
         )
+
+
+def advertisers_to_dict(advertisers: models.QuerySet) -> dict[str, Any]:
+    """Map the names of the advertisers to their urls, grouped by geo and then domain, from a single query.
+
+    Parameters
+    ----------
+    advertisers : QuerySet
+        The advertisers to convert
+
+    Returns
+    -------
+    dict
+        a dictionary mapping of advertiser names to their geos, each a list of
+        hosts with their paths, all sorted like Advertiser.to_dict() describes.
+    """
+    matching_display = dict(MATCHING_CHOICES)
+    result: dict = {}
+    rows = advertisers.order_by(*AD_URL_COLUMNS).values_list(*AD_URL_COLUMNS)
+    advertiser_pk = None
+    for pk, name, geo, domain, path, matching in rows:
+        if pk != advertiser_pk:
+            advertiser_pk = pk
+            # Advertisers with the same name replace each other, keeping the first one's position
+            geos = result[name] = {}
+        if geo is None:
+            # An advertiser without any urls
+            continue
+        hosts = geos.setdefault(geo, [])
+        if not hosts or hosts[-1]["host"] != domain:
+            hosts.append({"host": domain, "paths": []})
+        hosts[-1]["paths"].append(
+            {"value": path, "matching": matching_display[matching]}
+        )
+    return result
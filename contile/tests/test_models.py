@@ -6,6 +6,8 @@ Models:
 - Partner
 """
 
+import json
+
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
@@ -101,6 +103,47 @@ class TestPartnerModel(TestCase):
 
         self.assertEqual(partner.to_dict(), expected_result)
 
+    def test_to_dict_single_query(self):
+        """Verifies the Partner dictionary is built from one query and is ordered like before."""
+        partner = Partner.objects.create(name="Partner Advertiser")
+        advertiser1 = Advertiser.objects.create(name="Pocket", partner=partner)
+        Advertiser.objects.create(name="Empty", partner=partner)
+        advertiser3 = Advertiser.objects.create(name="Firefox", partner=partner)
+        for advertiser in [advertiser1, advertiser3]:
+            for geo in ["US", "CA"]:
+                for domain in ["b.example.com", "a.example.com"]:
+                    for path in ["/z/", "/a/"]:
+                        AdvertiserUrl.objects.create(
+                            advertiser=advertiser,
+                            path=path,
+                            matching=False,
+                            domain=domain,
+                            geo=geo,
+                        )
+        geos = {
+            geo: [
+                {
+                    "host": domain,
+                    "paths": [
+                        {"value": "/a/", "matching": "prefix"},
+                        {"value": "/z/", "matching": "prefix"},
+                    ],
+                }
+                for domain in ["a.example.com", "b.example.com"]
+            ]
+            for geo in ["CA", "US"]
+        }
+        expected_result = {
+            "adm_advertisers": {"Pocket": geos, "Empty": {}, "Firefox": geos}
+        }
+
+        with self.assertNumQueries(1):
+            result = partner.to_dict()
+
+        # Compare the serialized JSON, so the order of the keys is checked too
+        self.assertEqual(json.dumps(result), json.dumps(expected_result))
+        self.assertEqual(advertiser1.to_dict(), {"Pocket": geos})
+
 
 class TestAdvertiserUrlModel(TestCase):
     """Test class for Contile AdvertiserUrl Model. Extends Django TestCase.
@@ -1,28 +1,30 @@
 """OpenIDC authentication middleware module for the consvc_shepherd service."""
 
+import copy
 import logging
+import threading
+import time
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.http import HttpResponse
-from google.auth.transport import requests
-from google.oauth2 import id_token
+
+from openidc.verifier import iap_verifier
 
 logger = logging.getLogger("shepherd")
+User = get_user_model()
 
 
 def validate_iap_jwt(request):
     """Validate IAP JWT."""
     iap_jwt = request.META.get(settings.OPENIDC_HEADER)
     try:
-        decoded_jwt = id_token.verify_token(
-            iap_jwt,
-            requests.Request(),
-            audience=settings.IAP_AUDIENCE,
-            certs_url="https://www.gstatic.com/iap/verify/public_key",
-        )
-        return decoded_jwt["email"]
+        return iap_verifier.verify(iap_jwt, audience=settings.IAP_AUDIENCE)
     except Exception as e:
         logger.error(f"IAP JWT validation error: {e}")
 
@@ -34,6 +36,75 @@ def validate_openidc_header(request):
     return openidc_header_value.split(settings.OPENIDC_HEADER_PREFIX)[-1]
 
 
+class UserCache:
+    """In-process TTL cache of users keyed by their verified email.
+
+    Requests get their own copy of a cached user, so state one request caches on its user, like the
+    permissions in _perm_cache, isn't shared with the other requests and threads.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users: dict[str, tuple[AbstractBaseUser, float]] = {}
+
+    def get(self, email: str) -> AbstractBaseUser | None:
+        """Return the cached user for an email, or None if absent or expired."""
+        with self._lock:
+            cached = self._users.get(email)
+            if cached is None:
+                return None
+            user, expire_at = cached
+            if expire_at <= time.monotonic():
+                del self._users[email]
+                return None
+            return copy.copy(user)
+
+    def set(self, email: str, user: AbstractBaseUser) -> None:
+        """Cache a user once the transaction that loaded it has committed.
+
+        This keeps users whose rows could still be rolled back out of the cache.
+        """
+        user = copy.copy(user)
+
+        def set_user() -> None:
+            with self._lock:
+                self._users[email] = (
+                    user,
+                    time.monotonic() + settings.OPENIDC_USER_CACHE_TTL,
+                )
+
+        transaction.on_commit(set_user)
+
+    def invalidate(self, email: str) -> None:
+        """Drop the cached user for an email."""
+        with self._lock:
+            self._users.pop(email, None)
+
+    def clear(self) -> None:
+        """Drop every cached user."""
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop users from the cache when they're saved, deleted or regrouped."""
+    if isinstance(instance, User):
+        user_cache.invalidate(instance.username)
+    else:
+        # A group or permission changed, which any number of users may hold
+        user_cache.clear()
+
+
+post_save.connect(invalidate_cached_user, sender=User)
+post_delete.connect(invalidate_cached_user, sender=User)
+m2m_changed.connect(invalidate_cached_user, sender=User.groups.through)
+m2m_changed.connect(invalidate_cached_user, sender=User.user_permissions.through)
+m2m_changed.connect(invalidate_cached_user, sender=Group.permissions.through)
+
+
 class OpenIDCAuthMiddleware(AuthenticationMiddleware):
     """An authentication middleware that depends on a header being set in the
     request. This header will be populated by nginx configured to authenticate
@@ -58,14 +129,18 @@ class OpenIDCAuthMiddleware(AuthenticationMiddleware):
             # is set then we reject the request entirely
             return HttpResponse("Please login using OpenID Connect", status=401)
 
-        try:
-            user = self.User.objects.get(username=openidc_email)
-        except self.User.DoesNotExist:
-            user = self.User(username=openidc_email, email=openidc_email)
-            if user.email == settings.DEV_USER_EMAIL and settings.DEBUG:
-                user.is_superuser = True
-                user.is_staff = True
-            user.save()
+        user = user_cache.get(openidc_email)
+        if user is None:
+            is_dev_user = openidc_email == settings.DEV_USER_EMAIL and settings.DEBUG
+            user, _ = self.User.objects.get_or_create(
+                username=openidc_email,
+                defaults={
+                    "email": openidc_email,
+                    "is_superuser": is_dev_user,
+                    "is_staff": is_dev_user,
+                },
+            )
+            user_cache.set(openidc_email, user)
 
         request.user = user
 
@@ -3,9 +3,11 @@
 import mock
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models import QuerySet
 from django.test import TestCase, override_settings
 
-from openidc.middleware import OpenIDCAuthMiddleware
+from openidc.middleware import OpenIDCAuthMiddleware, user_cache
 
 
 class OpenIDCAuthMiddlewareTests(TestCase):
@@ -20,10 +22,10 @@ class OpenIDCAuthMiddlewareTests(TestCase):
         self.mock_resolve = mock_resolve_patcher.start()
         self.addCleanup(mock_resolve_patcher.stop)
 
-        mock_verify_token_patcher = mock.patch("google.oauth2.id_token.verify_token")
+        mock_verify_token_patcher = mock.patch("openidc.middleware.iap_verifier.verify")
 
         self.mock_verify_token = mock_verify_token_patcher.start()
-        self.mock_verify_token.return_value = {"email": "non-dev@example.com"}
+        self.mock_verify_token.return_value = "non-dev@example.com"
         self.addCleanup(mock_verify_token_patcher.stop)
 
     @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:", DEBUG=True)
@@ -75,3 +77,110 @@ class OpenIDCAuthMiddlewareTests(TestCase):
         self.assertEqual(response, self.response)
         self.assertEqual(User.objects.all().count(), 1)
         self.assertEqual("non-dev@example.com", request.user.email)
+
+
+@override_settings(DEBUG=True)
+class OpenIDCUserCacheTests(TestCase):
+    """Test class for the user cache in OpenIDCAuthMiddleware."""
+
+    def setUp(self):
+        """Set up a middleware with an empty user cache."""
+        self.middleware = OpenIDCAuthMiddleware(lambda request: request.user)
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    def login(self, email="user@example.com"):
+        """Run a request for an email through the middleware."""
+        request = mock.Mock()
+        request.META = {settings.OPENIDC_HEADER: f"accounts.google.com:{email}"}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.middleware(request)
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_cached_user_needs_no_queries(self):
+        """Test steady-state requests are authenticated without SQL."""
+        user = self.login()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.login(), user)
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_cached_user_not_shared_between_requests(self):
+        """Test each request gets its own user, so per-request state like _perm_cache isn't shared."""
+        first_user = self.login()
+        first_user._perm_cache = {"consvc_shepherd.view_campaign"}
+        second_user = self.login()
+        second_user._perm_cache = {"consvc_shepherd.change_campaign"}
+
+        third_user = self.login()
+        self.assertEqual(third_user, first_user)
+        self.assertIsNot(third_user, first_user)
+        self.assertIsNot(third_user, second_user)
+        self.assertFalse(hasattr(third_user, "_perm_cache"))
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_user_not_cached_until_committed(self):
+        """Test a user isn't cached while its transaction could still roll back."""
+        request = mock.Mock()
+        request.META = {settings.OPENIDC_HEADER: "accounts.google.com:a@example.com"}
+        self.middleware(request)
+
+        self.assertIsNone(user_cache.get("a@example.com"))
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_cached_user_expires(self):
+        """Test the user is loaded again once the TTL runs out."""
+        with override_settings(OPENIDC_USER_CACHE_TTL=0):
+            self.login()
+
+            with self.assertNumQueries(1):
+                self.login()
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_user_save_invalidates_cache(self):
+        """Test saving a user drops it from the cache."""
+        user = self.login()
+        user.is_staff = True
+        user.save()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.login().is_staff)
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_user_delete_invalidates_cache(self):
+        """Test deleting a user drops it from the cache."""
+        user = self.login()
+        user.delete()
+
+        self.assertNotEqual(self.login().pk, user.pk)
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_group_change_invalidates_cache(self):
+        """Test adding a user to a group drops it from the cache."""
+        user = self.login()
+        Group.objects.create(name="shepherd").user_set.add(user)
+
+        self.assertIsNone(user_cache.get("user@example.com"))
+
+    @override_settings(OPENIDC_HEADER_PREFIX="accounts.google.com:")
+    def test_concurrent_first_login(self):
+        """Test a user created by a concurrent first request is fetched, not duplicated."""
+        User = get_user_model()
+        get = QuerySet.get
+        lookups = []
+
+        def get_after_concurrent_create(queryset, *args, **kwargs):
+            if not lookups:
+                # Another request creates the user just after our lookup misses
+                lookups.append(kwargs)
+                User.objects.create(
+                    username="user@example.com", email="user@example.com"
+                )
+                raise User.DoesNotExist
+            return get(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "get", get_after_concurrent_create):
+            user = self.login()
+
+        self.assertEqual(User.objects.filter(username="user@example.com").count(), 1)
+        self.assertEqual(user, User.objects.get(username="user@example.com"))
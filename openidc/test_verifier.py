@@ -0,0 +1,225 @@
+"""Tests related to the verification of IAP JWTs by IAPVerifier."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mock
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.test import SimpleTestCase
+from google.auth import crypt, jwt
+
+from openidc.verifier import IAPVerifier
+
+AUDIENCE = "/projects/1/global/backendServices/2"
+
+
+def generate_key(key_id):
+    """Return an ES256 signer and the PEM of its public key."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return crypt.ES256Signer.from_string(private_pem, key_id), public_pem.decode()
+
+
+class FakeKeyServer(ThreadingHTTPServer):
+    """A local stand-in for the IAP public key endpoint."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeKeyHandler)
+        self.keys = {}
+        self.max_age = 3600
+        self.requests = 0
+
+    @property
+    def url(self):
+        """Return the URL the keys are served at."""
+        host, port = self.server_address
+        return f"http://{host}:{port}/public_key"
+
+
+class FakeKeyHandler(BaseHTTPRequestHandler):
+    """Serve the fake server's keys with a Cache-Control max-age."""
+
+    def do_GET(self):
+        """Respond with the keys as JSON."""
+        self.server.requests += 1
+        body = json.dumps(self.server.keys).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", f"public, max-age={self.server.max_age}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep the test output quiet."""
+
+
+class IAPVerifierTests(SimpleTestCase):
+    """Test class for IAPVerifier."""
+
+    def setUp(self):
+        """Start a fake key server and point a verifier at it."""
+        self.server = FakeKeyServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.signer, public_pem = generate_key("key-1")
+        self.server.keys = {"key-1": public_pem}
+        self.verifier = IAPVerifier(certs_url=self.server.url)
+        self.addCleanup(self.verifier.session.close)
+
+    def make_token(self, signer=None, email="user@example.com", **claims):
+        """Return a signed token for the test audience."""
+        now = int(time.time())
+        payload = {
+            "aud": AUDIENCE,
+            "email": email,
+            "iat": now,
+            "exp": now + 600,
+            **claims,
+        }
+        return jwt.encode(signer or self.signer, payload)
+
+    def test_verify_returns_email(self):
+        """Test the email is returned from a valid token."""
+        self.assertEqual(
+            self.verifier.verify(self.make_token(), AUDIENCE), "user@example.com"
+        )
+
+    def test_keys_fetched_once_within_max_age(self):
+        """Test the keys are reused across tokens while within their max-age."""
+        self.verifier.verify(self.make_token(email="a@example.com"), AUDIENCE)
+        self.verifier.verify(self.make_token(email="b@example.com"), AUDIENCE)
+
+        self.assertEqual(self.server.requests, 1)
+
+    def test_keys_refetched_after_max_age(self):
+        """Test the keys are fetched again once their max-age runs out."""
+        self.server.max_age = 0
+
+        self.verifier.verify(self.make_token(email="a@example.com"), AUDIENCE)
+        self.verifier.verify(self.make_token(email="b@example.com"), AUDIENCE)
+
+        self.assertEqual(self.server.requests, 2)
+
+    def test_keys_refetched_for_unknown_key_id(self):
+        """Test a token signed by a rotated-in key triggers a refetch."""
+        self.verifier.verify(self.make_token(), AUDIENCE)
+        self.verifier._certs_fetched_at = 0.0
+
+        signer, public_pem = generate_key("key-2")
+        self.server.keys["key-2"] = public_pem
+
+        self.assertEqual(
+            self.verifier.verify(self.make_token(signer=signer), AUDIENCE),
+            "user@example.com",
+        )
+        self.assertEqual(self.server.requests, 2)
+
+    def test_verified_token_not_blocked_by_refetch(self):
+        """Test a cached token is verified while another request is refetching the keys."""
+        token = self.make_token()
+        self.verifier.verify(token, AUDIENCE)
+        self.verifier._certs_expire_at = 0.0
+        fetching = threading.Event()
+        fetched = threading.Event()
+        fetch_certs = self.verifier._fetch_certs
+
+        def slow_fetch_certs():
+            fetching.set()
+            fetched.wait(5)
+            return fetch_certs()
+
+        with mock.patch.object(self.verifier, "_fetch_certs", slow_fetch_certs):
+            refetch = threading.Thread(
+                target=self.verifier.verify,
+                args=(self.make_token(email="b@example.com"), AUDIENCE),
+            )
+            refetch.start()
+            fetching.wait(5)
+            cached = threading.Thread(
+                target=self.verifier.verify, args=(token, AUDIENCE)
+            )
+            cached.start()
+            cached.join(1)
+            cached_blocked = cached.is_alive()
+            fetched.set()
+            refetch.join()
+            cached.join()
+
+        self.assertFalse(cached_blocked)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_verified_token_skips_signature_check(self):
+        """Test a token that was verified already is answered from the cache."""
+        token = self.make_token()
+        self.verifier.verify(token, AUDIENCE)
+        self.server.keys = {}
+        self.verifier._certs = {}
+
+        self.assertEqual(self.verifier.verify(token, AUDIENCE), "user@example.com")
+
+    def test_verified_token_expires_after_ttl(self):
+        """Test a cached token is verified again once the cache TTL runs out."""
+        token = self.make_token()
+        now = time.time()
+        self.verifier.verify(token, AUDIENCE)
+
+        with mock.patch("openidc.verifier.jwt.decode", wraps=jwt.decode) as decode:
+            with mock.patch("openidc.verifier.time.time", return_value=now + 30):
+                self.verifier.verify(token, AUDIENCE)
+            self.assertEqual(decode.call_count, 0)
+            with mock.patch("openidc.verifier.time.time", return_value=now + 61):
+                self.verifier.verify(token, AUDIENCE)
+            self.assertEqual(decode.call_count, 1)
+
+    def test_verified_token_bounded_by_exp(self):
+        """Test a cached token is not trusted past its own exp."""
+        verifier = IAPVerifier(certs_url=self.server.url, verified_token_ttl=3600)
+        self.addCleanup(verifier.session.close)
+        now = int(time.time())
+        token = self.make_token(exp=now + 5)
+        verifier.verify(token, AUDIENCE)
+
+        with mock.patch("openidc.verifier.jwt.decode", wraps=jwt.decode) as decode:
+            with mock.patch("openidc.verifier.time.time", return_value=now + 6):
+                verifier.verify(token, AUDIENCE)
+            self.assertEqual(decode.call_count, 1)
+
+    def test_verified_tokens_bounded(self):
+        """Test the least recently used tokens are evicted past the max size."""
+        verifier = IAPVerifier(certs_url=self.server.url, verified_token_max_size=2)
+        self.addCleanup(verifier.session.close)
+        for email in ["a@example.com", "b@example.com", "c@example.com"]:
+            verifier.verify(self.make_token(email=email), AUDIENCE)
+
+        self.assertEqual(
+            [email for email, _ in verifier._verified_tokens.values()],
+            ["b@example.com", "c@example.com"],
+        )
+
+    def test_invalid_signature_rejected(self):
+        """Test a token signed by an unknown key is rejected and not cached."""
+        signer, _ = generate_key("key-1")
+
+        with self.assertRaises(ValueError):
+            self.verifier.verify(self.make_token(signer=signer), AUDIENCE)
+        self.assertEqual(len(self.verifier._verified_tokens), 0)
+
+    def test_wrong_audience_rejected(self):
+        """Test a token for another audience is rejected."""
+        with self.assertRaises(ValueError):
+            self.verifier.verify(self.make_token(aud="someone-else"), AUDIENCE)
@@ -0,0 +1,143 @@
+"""Cached verification of the JWTs that IAP attaches to each request."""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+
+import requests
+from google.auth import exceptions, jwt
+
+IAP_CERTS_URL = "https://www.gstatic.com/iap/verify/public_key"
+
+# Used when the key server does not send a Cache-Control max-age
+DEFAULT_CERTS_MAX_AGE = 300
+CERTS_FETCH_TIMEOUT = 5
+# Least time between refetches triggered by a key id we don't know
+CERTS_MIN_REFETCH_INTERVAL = 30
+VERIFIED_TOKEN_TTL = 60
+VERIFIED_TOKEN_MAX_SIZE = 1024
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class IAPVerifier:
+    """Verify IAP JWTs against a process-level cache of the IAP public keys.
+
+    The keys are refetched over one HTTP session once the max-age sent by the
+    key server runs out, or when a token is signed by a key we haven't seen.
+    Tokens that have already been verified are remembered by hash, until the
+    earlier of their exp and VERIFIED_TOKEN_TTL, so that the signature check
+    is not repeated on every request.
+    """
+
+    def __init__(
+        self,
+        certs_url: str = IAP_CERTS_URL,
+        verified_token_ttl: float = VERIFIED_TOKEN_TTL,
+        verified_token_max_size: int = VERIFIED_TOKEN_MAX_SIZE,
+    ) -> None:
+        self.certs_url = certs_url
+        self.verified_token_ttl = verified_token_ttl
+        self.verified_token_max_size = verified_token_max_size
+        self.session = requests.Session()
+        # Guards the keys and the verified tokens, and is never held across a fetch
+        self._lock = threading.Lock()
+        # Held while fetching the keys, so that only one caller fetches them at a time
+        self._certs_lock = threading.Lock()
+        self._certs: dict[str, str] = {}
+        self._certs_fetched_at = 0.0
+        self._certs_expire_at = 0.0
+        self._verified_tokens: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def verify(self, token: str | bytes, audience: str) -> str:
+        """Return the email carried by a valid token, raising if it's invalid."""
+        if isinstance(token, str):
+            token = token.encode("utf-8")
+        token_hash = hashlib.sha256(token + str(audience).encode("utf-8")).hexdigest()
+
+        email = self._get_verified_token(token_hash)
+        if email is not None:
+            return email
+
+        kid = jwt.decode_header(token).get("kid")  # type: ignore [no-untyped-call]
+        certs = self._get_certs(kid)
+        claims = jwt.decode(token, certs=certs, audience=audience)  # type: ignore [no-untyped-call]
+
+        verified_email: str = claims["email"]
+        expire_at = min(claims["exp"], time.time() + self.verified_token_ttl)
+        self._set_verified_token(token_hash, verified_email, expire_at)
+        return verified_email
+
+    def clear(self) -> None:
+        """Drop the cached public keys and verified tokens."""
+        with self._lock:
+            self._certs = {}
+            self._certs_fetched_at = 0.0
+            self._certs_expire_at = 0.0
+            self._verified_tokens.clear()
+
+    def _get_verified_token(self, token_hash: str) -> str | None:
+        with self._lock:
+            cached = self._verified_tokens.get(token_hash)
+            if cached is None:
+                return None
+            email, expire_at = cached
+            if expire_at <= time.time():
+                del self._verified_tokens[token_hash]
+                return None
+            self._verified_tokens.move_to_end(token_hash)
+            return email
+
+    def _set_verified_token(
+        self, token_hash: str, email: str, expire_at: float
+    ) -> None:
+        with self._lock:
+            self._verified_tokens[token_hash] = (email, expire_at)
+            self._verified_tokens.move_to_end(token_hash)
+            while len(self._verified_tokens) > self.verified_token_max_size:
+                self._verified_tokens.popitem(last=False)
+
+    def _get_certs(self, kid: str | None) -> dict[str, str]:
+        certs = self._get_cached_certs(kid)
+        if certs is not None:
+            return certs
+        with self._certs_lock:
+            # Another caller may have fetched the keys while this one waited for the lock
+            certs = self._get_cached_certs(kid)
+            if certs is not None:
+                return certs
+            now = time.time()
+            certs, max_age = self._fetch_certs()
+            with self._lock:
+                self._certs = certs
+                self._certs_fetched_at = now
+                self._certs_expire_at = now + max_age
+            return certs
+
+    def _get_cached_certs(self, kid: str | None) -> dict[str, str] | None:
+        with self._lock:
+            now = time.time()
+            if self._certs_expire_at > now and (
+                kid in self._certs
+                or self._certs_fetched_at + CERTS_MIN_REFETCH_INTERVAL > now
+            ):
+                return self._certs
+            return None
+
+    def _fetch_certs(self) -> tuple[dict[str, str], int]:
+        response = self.session.get(self.certs_url, timeout=CERTS_FETCH_TIMEOUT)
+        if response.status_code != HTTPStatus.OK:
+            raise exceptions.TransportError(  # type: ignore [no-untyped-call]
+                f"Could not fetch certificates at {self.certs_url}"
+            )
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+        certs: dict[str, str] = json.loads(response.content)
+        return certs, max_age
+
+
+iap_verifier = IAPVerifier()